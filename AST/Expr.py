@@ -1,5 +1,5 @@
 #
-# This file was automatically generated by GenerateAST.py on 17/05/2023 at 19:48:56
+# This file was automatically generated by GenerateAST.py on 19/10/2026 at 13:55:58
 #
 
 from __future__ import annotations
@@ -12,6 +12,9 @@ from Token import Token, LiteralType
 #
 
 class Expr:
+    # Set by the parser on expressions nested too deeply to evaluate recursively
+    deep = False
+
     def accept(self, visitor: ExprVisitor):
         raise NotImplementedError("Tried calling a virtual method")
 
@@ -26,12 +29,39 @@ class ExprVisitor:
     def visit_binary_expr(self, expr: BinaryExpr):
         raise NotImplementedError("Tried calling a virtual method visit_binary_expr")
 
+    def visit_call_expr(self, expr: CallExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_call_expr")
+
+    def visit_get_expr(self, expr: GetExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_get_expr")
+
     def visit_grouping_expr(self, expr: GroupingExpr):
         raise NotImplementedError("Tried calling a virtual method visit_grouping_expr")
 
+    def visit_index_expr(self, expr: IndexExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_index_expr")
+
+    def visit_list_expr(self, expr: ListExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_list_expr")
+
     def visit_literal_expr(self, expr: LiteralExpr):
         raise NotImplementedError("Tried calling a virtual method visit_literal_expr")
 
+    def visit_logical_expr(self, expr: LogicalExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_logical_expr")
+
+    def visit_set_expr(self, expr: SetExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_set_expr")
+
+    def visit_set_index_expr(self, expr: SetIndexExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_set_index_expr")
+
+    def visit_super_expr(self, expr: SuperExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_super_expr")
+
+    def visit_this_expr(self, expr: ThisExpr):
+        raise NotImplementedError("Tried calling a virtual method visit_this_expr")
+
     def visit_unary_expr(self, expr: UnaryExpr):
         raise NotImplementedError("Tried calling a virtual method visit_unary_expr")
 
@@ -43,7 +73,7 @@ class ExprVisitor:
 # Concrete elements
 #
 
-@dataclass
+@dataclass(eq=False)
 class AssignExpr(Expr):
     name: Token
     value: Expr
@@ -51,8 +81,11 @@ class AssignExpr(Expr):
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_assign_expr(self)
 
+    def __reduce__(self):
+        return AssignExpr, (self.name, self.value,), {"deep": True} if self.deep else None
+
 
-@dataclass
+@dataclass(eq=False)
 class BinaryExpr(Expr):
     left: Expr
     operator: Token
@@ -61,24 +94,146 @@ class BinaryExpr(Expr):
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_binary_expr(self)
 
+    def __reduce__(self):
+        return BinaryExpr, (self.left, self.operator, self.right,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class CallExpr(Expr):
+    callee: Expr
+    paren: Token
+    arguments: list[Expr]
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_call_expr(self)
+
+    def __reduce__(self):
+        return CallExpr, (self.callee, self.paren, self.arguments,), {"deep": True} if self.deep else None
+
 
-@dataclass
+@dataclass(eq=False)
+class GetExpr(Expr):
+    object: Expr
+    name: Token
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_get_expr(self)
+
+    def __reduce__(self):
+        return GetExpr, (self.object, self.name,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
 class GroupingExpr(Expr):
     expression: Expr
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_grouping_expr(self)
 
+    def __reduce__(self):
+        return GroupingExpr, (self.expression,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class IndexExpr(Expr):
+    object: Expr
+    bracket: Token
+    index: Expr
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_index_expr(self)
+
+    def __reduce__(self):
+        return IndexExpr, (self.object, self.bracket, self.index,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class ListExpr(Expr):
+    bracket: Token
+    elements: list[Expr]
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_list_expr(self)
+
+    def __reduce__(self):
+        return ListExpr, (self.bracket, self.elements,), {"deep": True} if self.deep else None
+
 
-@dataclass
+@dataclass(eq=False)
 class LiteralExpr(Expr):
     value: LiteralType
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_literal_expr(self)
 
+    def __reduce__(self):
+        return LiteralExpr, (self.value,), {"deep": True} if self.deep else None
 
-@dataclass
+
+@dataclass(eq=False)
+class LogicalExpr(Expr):
+    left: Expr
+    operator: Token
+    right: Expr
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_logical_expr(self)
+
+    def __reduce__(self):
+        return LogicalExpr, (self.left, self.operator, self.right,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class SetExpr(Expr):
+    object: Expr
+    name: Token
+    value: Expr
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_set_expr(self)
+
+    def __reduce__(self):
+        return SetExpr, (self.object, self.name, self.value,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class SetIndexExpr(Expr):
+    object: Expr
+    bracket: Token
+    index: Expr
+    value: Expr
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_set_index_expr(self)
+
+    def __reduce__(self):
+        return SetIndexExpr, (self.object, self.bracket, self.index, self.value,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class SuperExpr(Expr):
+    keyword: Token
+    method: Token
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_super_expr(self)
+
+    def __reduce__(self):
+        return SuperExpr, (self.keyword, self.method,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
+class ThisExpr(Expr):
+    keyword: Token
+
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_this_expr(self)
+
+    def __reduce__(self):
+        return ThisExpr, (self.keyword,), {"deep": True} if self.deep else None
+
+
+@dataclass(eq=False)
 class UnaryExpr(Expr):
     operator: Token
     right: Expr
@@ -86,10 +241,16 @@ class UnaryExpr(Expr):
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_unary_expr(self)
 
+    def __reduce__(self):
+        return UnaryExpr, (self.operator, self.right,), {"deep": True} if self.deep else None
 
-@dataclass
+
+@dataclass(eq=False)
 class VariableExpr(Expr):
     name: Token
 
     def accept(self, visitor: ExprVisitor):
         return visitor.visit_variable_expr(self)
+
+    def __reduce__(self):
+        return VariableExpr, (self.name,), {"deep": True} if self.deep else None
@@ -1,10 +1,10 @@
 #
-# This file was automatically generated by GenerateAST.py on 17/05/2023 at 19:48:56
+# This file was automatically generated by GenerateAST.py on 19/10/2026 at 13:21:30
 #
 
 from __future__ import annotations
 from dataclasses import dataclass
-from AST.Expr import Expr
+from AST.Expr import Expr, VariableExpr
 from Token import Token
          
 
@@ -13,6 +13,10 @@ from Token import Token
 #
 
 class Stmt:
+    # Set by the parser when the statement uses shared expression nodes with their tokens on other lines
+    # than the nodes' own. Pairs each with the lines of its tokens here, so runtime errors report those.
+    uses = None
+
     def accept(self, visitor: StmtVisitor):
         raise NotImplementedError("Tried calling a virtual method")
 
@@ -24,48 +28,183 @@ class StmtVisitor:
     def visit_block_stmt(self, stmt: BlockStmt):
         raise NotImplementedError("Tried calling a virtual method visit_block_stmt")
 
+    def visit_break_stmt(self, stmt: BreakStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_break_stmt")
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_class_stmt")
+
     def visit_expression_stmt(self, stmt: ExpressionStmt):
         raise NotImplementedError("Tried calling a virtual method visit_expression_stmt")
 
+    def visit_for_in_stmt(self, stmt: ForInStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_for_in_stmt")
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_function_stmt")
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_if_stmt")
+
+    def visit_import_stmt(self, stmt: ImportStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_import_stmt")
+
     def visit_print_stmt(self, stmt: PrintStmt):
         raise NotImplementedError("Tried calling a virtual method visit_print_stmt")
 
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_return_stmt")
+
     def visit_variable_stmt(self, stmt: VariableStmt):
         raise NotImplementedError("Tried calling a virtual method visit_variable_stmt")
 
+    def visit_while_stmt(self, stmt: WhileStmt):
+        raise NotImplementedError("Tried calling a virtual method visit_while_stmt")
+
 
 #
 # Concrete elements
 #
 
-@dataclass
+@dataclass(eq=False)
 class BlockStmt(Stmt):
     statements: list[Stmt]
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_block_stmt(self)
 
+    def __reduce__(self):
+        return BlockStmt, (self.statements,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
+class BreakStmt(Stmt):
+    keyword: Token
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_break_stmt(self)
+
+    def __reduce__(self):
+        return BreakStmt, (self.keyword,), {"uses": self.uses} if self.uses else None
 
-@dataclass
+
+@dataclass(eq=False)
+class ClassStmt(Stmt):
+    name: Token
+    superclass: VariableExpr
+    methods: list[FunctionStmt]
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_class_stmt(self)
+
+    def __reduce__(self):
+        return ClassStmt, (self.name, self.superclass, self.methods,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
 class ExpressionStmt(Stmt):
     expression: Expr
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_expression_stmt(self)
 
+    def __reduce__(self):
+        return ExpressionStmt, (self.expression,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
+class ForInStmt(Stmt):
+    name: Token
+    iterable: Expr
+    body: Stmt
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_for_in_stmt(self)
+
+    def __reduce__(self):
+        return ForInStmt, (self.name, self.iterable, self.body,), {"uses": self.uses} if self.uses else None
+
 
-@dataclass
+@dataclass(eq=False)
+class FunctionStmt(Stmt):
+    name: Token
+    params: list[Token]
+    body: list[Stmt]
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_function_stmt(self)
+
+    def __reduce__(self):
+        return FunctionStmt, (self.name, self.params, self.body,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
+class IfStmt(Stmt):
+    condition: Expr
+    then_branch: Stmt
+    else_branch: Stmt
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_if_stmt(self)
+
+    def __reduce__(self):
+        return IfStmt, (self.condition, self.then_branch, self.else_branch,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
+class ImportStmt(Stmt):
+    keyword: Token
+    path: Token
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_import_stmt(self)
+
+    def __reduce__(self):
+        return ImportStmt, (self.keyword, self.path,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
 class PrintStmt(Stmt):
     expression: Expr
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_print_stmt(self)
 
+    def __reduce__(self):
+        return PrintStmt, (self.expression,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
+class ReturnStmt(Stmt):
+    keyword: Token
+    value: Expr
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_return_stmt(self)
+
+    def __reduce__(self):
+        return ReturnStmt, (self.keyword, self.value,), {"uses": self.uses} if self.uses else None
 
-@dataclass
+
+@dataclass(eq=False)
 class VariableStmt(Stmt):
     name: Token
     initializer: Expr
 
     def accept(self, visitor: StmtVisitor):
         return visitor.visit_variable_stmt(self)
+
+    def __reduce__(self):
+        return VariableStmt, (self.name, self.initializer,), {"uses": self.uses} if self.uses else None
+
+
+@dataclass(eq=False)
+class WhileStmt(Stmt):
+    condition: Expr
+    body: Stmt
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_while_stmt(self)
+
+    def __reduce__(self):
+        return WhileStmt, (self.condition, self.body,), {"uses": self.uses} if self.uses else None
@@ -0,0 +1,367 @@
+import asyncio
+import math
+import time
+from typing import Callable
+
+from Environment import Environment
+from LineReader import LineReader
+from LoxList import LoxList
+from LoxMap import LoxMap
+from NativeFunction import AsyncNativeFunction, NativeFunction, NativeError
+from Parallel import parallel_map as run_parallel_map
+from Stringify import stringify
+
+# Every native function available to Lox scripts, keyed by the global name it is installed under.
+NATIVES: dict[str, NativeFunction] = {}
+
+
+def native(name: str, arity: int) -> Callable:
+    """
+    Registers the decorated Python function as a Lox native taking exactly `arity` arguments
+    :param name: the global name the native is defined under
+    :param arity: the number of arguments the native must be called with
+    :return:
+    """
+
+    def register(function: Callable) -> Callable:
+        NATIVES[name] = NativeFunction(name, arity, function)
+        return function
+
+    return register
+
+
+def async_native(name: str, arity: int, blocking: Callable) -> Callable:
+    """
+    Registers the decorated coroutine function as a Lox native that async execution can await
+    :param name: the global name the native is defined under
+    :param arity: the number of arguments the native must be called with
+    :param blocking: the equivalent blocking function, used when the native is called synchronously
+    :return:
+    """
+
+    def register(coroutine: Callable) -> Callable:
+        NATIVES[name] = AsyncNativeFunction(name, arity, blocking, coroutine)
+        return coroutine
+
+    return register
+
+
+def define_natives(environment: Environment) -> None:
+    # Globals restored from a snapshot may already hold natives, or scripts' own definitions under the same names
+    for name, function in NATIVES.items():
+        if name not in environment.values:
+            environment.define(name, function)
+
+
+def check_number(name: str, value: any) -> float:
+    if type(value) == float:
+        return value
+
+    raise NativeError(f"{name}() expects a number argument.")
+
+
+def check_string(name: str, value: any) -> str:
+    if type(value) == str:
+        return value
+
+    raise NativeError(f"{name}() expects a string argument.")
+
+
+def check_list(name: str, value: any) -> LoxList:
+    if isinstance(value, LoxList):
+        return value
+
+    raise NativeError(f"{name}() expects a list argument.")
+
+
+def check_map(name: str, value: any) -> LoxMap:
+    if isinstance(value, LoxMap):
+        return value
+
+    raise NativeError(f"{name}() expects a map argument.")
+
+
+def check_key(name: str, value: any) -> any:
+    try:
+        return LoxMap.key(value)
+    except TypeError:
+        raise NativeError(f"{name}() can't use a list or map as a key.")
+
+
+def check_reader(name: str, value: any) -> LineReader:
+    if isinstance(value, LineReader):
+        return value
+
+    raise NativeError(f"{name}() expects a file opened by open_lines().")
+
+
+def check_integer(name: str, value: any) -> int:
+    if type(value) == float and value.is_integer():
+        return int(value)
+
+    raise NativeError(f"{name}() expects an integer argument.")
+
+
+#
+# Time
+#
+
+@native("clock", 0)
+def clock() -> float:
+    return time.perf_counter()
+
+
+def sleep_blocking(seconds: any) -> None:
+    time.sleep(check_duration(seconds))
+
+
+@async_native("sleep", 1, sleep_blocking)
+async def sleep(seconds: any) -> None:
+    await asyncio.sleep(check_duration(seconds))
+
+
+def check_duration(seconds: any) -> float:
+    if check_number("sleep", seconds) < 0:
+        raise NativeError("sleep() expects a non-negative number of seconds.")
+
+    return seconds
+
+
+#
+# Math
+#
+
+def math_native(name: str, function: Callable[..., float], arity: int = 1) -> None:
+    def wrapper(*arguments: any) -> float:
+        numbers = [check_number(name, argument) for argument in arguments]
+
+        try:
+            return float(function(*numbers))
+        except (ValueError, OverflowError):
+            raise NativeError(f"{name}() argument out of range.")
+
+    NATIVES[name] = NativeFunction(name, arity, wrapper)
+
+
+math_native("sqrt", math.sqrt)
+math_native("floor", math.floor)
+math_native("ceil", math.ceil)
+math_native("abs", math.fabs)
+math_native("round", round)
+math_native("sin", math.sin)
+math_native("cos", math.cos)
+math_native("tan", math.tan)
+math_native("exp", math.exp)
+math_native("log", math.log)
+math_native("pow", math.pow, 2)
+math_native("atan2", math.atan2, 2)
+math_native("min", min, 2)
+math_native("max", max, 2)
+
+
+#
+# Strings
+#
+
+@native("len", 1)
+def length(value: any) -> float:
+    if isinstance(value, LoxList):
+        return float(len(value.elements))
+
+    if isinstance(value, LoxMap):
+        return float(len(value.entries))
+
+    return float(len(check_string("len", value)))
+
+
+@native("substring", 3)
+def substring(value: any, start: any, end: any) -> str:
+    text = check_string("substring", value)
+    first = check_integer("substring", start)
+    last = check_integer("substring", end)
+
+    if not 0 <= first <= last <= len(text):
+        raise NativeError("substring() range out of bounds.")
+
+    return text[first:last]
+
+
+@native("find", 2)
+def find(value: any, needle: any) -> float:
+    return float(check_string("find", value).find(check_string("find", needle)))
+
+
+@native("upper", 1)
+def upper(value: any) -> str:
+    return check_string("upper", value).upper()
+
+
+@native("lower", 1)
+def lower(value: any) -> str:
+    return check_string("lower", value).lower()
+
+
+#
+# Conversions and formatting
+#
+
+@native("str", 1)
+def to_string(value: any) -> str:
+    return stringify(value)
+
+
+@native("num", 1)
+def to_number(value: any) -> float | None:
+    try:
+        return float(check_string("num", value))
+    except ValueError:
+        return None
+
+
+@native("format", 2)
+def format_number(value: any, digits: any) -> str:
+    number = check_number("format", value)
+    places = check_integer("format", digits)
+
+    if places < 0:
+        raise NativeError("format() expects a non-negative number of digits.")
+
+    return f"{number:.{places}f}"
+
+
+#
+# Files
+#
+
+def read_file_blocking(path: any) -> str:
+    try:
+        with open(check_string("read_file", path), "r") as file:
+            return file.read()
+    except OSError as error:
+        raise NativeError(f"read_file() could not read '{path}': {error.strerror}.")
+
+
+@async_native("read_file", 1, read_file_blocking)
+async def read_file(path: any) -> str:
+    # There is no non-blocking file I/O in asyncio, so the read happens on the default executor
+    return await asyncio.to_thread(read_file_blocking, path)
+
+
+@native("open_lines", 1)
+def open_lines(path: any) -> LineReader:
+    """
+    :return: a reader for the file's lines, which scripts loop over with for-in or read one at a time with read_line()
+    """
+
+    try:
+        return LineReader(check_string("open_lines", path))
+    except OSError as error:
+        raise NativeError(f"open_lines() could not open '{path}': {error.strerror}.")
+
+
+@native("read_line", 1)
+def read_line(reader: any) -> str | None:
+    """
+    :return: the next line, or nil at the end of the file
+    """
+
+    return check_reader("read_line", reader).next_line()
+
+
+@native("close", 1)
+def close(reader: any) -> None:
+    check_reader("close", reader).close()
+
+
+#
+# Lists
+#
+
+@native("list", 0)
+def new_list() -> LoxList:
+    return LoxList()
+
+
+@native("push", 2)
+def push(target: any, value: any) -> None:
+    check_list("push", target).elements.append(value)
+
+
+@native("get", 2)
+def get(target: any, index: any) -> any:
+    elements = check_list("get", target).elements
+    position = check_integer("get", index)
+
+    if not 0 <= position < len(elements):
+        raise NativeError("get() index out of bounds.")
+
+    return elements[position]
+
+
+@native("pop", 1)
+def pop(target: any) -> any:
+    elements = check_list("pop", target).elements
+
+    if not elements:
+        raise NativeError("pop() called on an empty list.")
+
+    return elements.pop()
+
+
+@native("extend", 2)
+def extend(target: any, values: any) -> None:
+    check_list("extend", target).elements.extend(check_list("extend", values).elements)
+
+
+@native("slice", 3)
+def slice_list(target: any, start: any, end: any) -> LoxList:
+    elements = check_list("slice", target).elements
+    first = check_integer("slice", start)
+    last = check_integer("slice", end)
+
+    if not 0 <= first <= last <= len(elements):
+        raise NativeError("slice() range out of bounds.")
+
+    return LoxList(elements[first:last])
+
+
+#
+# Maps
+#
+
+@native("map", 0)
+def new_map() -> LoxMap:
+    return LoxMap()
+
+
+@native("has", 2)
+def has(target: any, key: any) -> bool:
+    return check_key("has", key) in check_map("has", target).entries
+
+
+@native("remove", 2)
+def remove(target: any, key: any) -> any:
+    """
+    :return: the value that was removed, or nil if the key wasn't in the map
+    """
+
+    return check_map("remove", target).entries.pop(check_key("remove", key), None)
+
+
+@native("keys", 1)
+def keys(target: any) -> LoxList:
+    return LoxList(check_map("keys", target).keys())
+
+
+@native("values", 1)
+def values(target: any) -> LoxList:
+    return LoxList(list(check_map("values", target).entries.values()))
+
+
+#
+# Parallelism
+#
+
+@native("parallel_map", 2)
+def parallel_map(function: any, inputs: any) -> LoxList:
+    return run_parallel_map(function, check_list("parallel_map", inputs))
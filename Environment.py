@@ -1,31 +1,130 @@
 from __future__ import annotations
 from dataclasses import *
 from RuntimeError import *
+from Resolver import FreeNames
+
+
+class Cell:
+    """
+    A variable captured by a closure. The scope that declared it and every closure that captured it hold the same
+    cell in place of the value, so they see each other's assignments.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: any) -> None:
+        self.value = value
 
 
 @dataclass
 class Environment:
     enclosing: Environment | None = None
     values: dict[str, any] = field(default_factory=dict)
+    # modules imported in this scope, created on the first import so other scopes don't pay for a list
+    imports: list[Module] | None = None
+
+    # set once a closure has captured a variable from this scope, so only then does define need to look for a cell
+    captured = False
 
     def define(self, name: str, value: any):
+        if self.captured:
+            cell = self.values.get(name)
+            if type(cell) is Cell:
+                cell.value = value
+                return
+
         self.values[name] = value
 
+    def import_module(self, module: Module):
+        if self.imports is None:
+            self.imports = []
+
+        self.imports.append(module)
+
     def get(self, name: Token):
-        if name.lexeme in self.values:
-            return self.values[name.lexeme]
+        environment = self
+        while environment is not None:
+            if name.lexeme in environment.values:
+                value = environment.values[name.lexeme]
+                return value.value if type(value) is Cell else value
 
-        if self.enclosing is not None:
-            return self.enclosing.get(name)
+            environment = environment.enclosing
 
-        raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        return self.imported(name).values[name.lexeme]
 
     def assign(self, name: Token, value: any):
-        if name.lexeme in self.values:
-            self.values[name.lexeme] = value
-            return
+        environment = self
+        while environment is not None:
+            if name.lexeme in environment.values:
+                cell = environment.values[name.lexeme]
+
+                if type(cell) is Cell:
+                    cell.value = value
+                else:
+                    environment.values[name.lexeme] = value
+
+                return
+
+            environment = environment.enclosing
+
+        # A module's globals are shared by every script in the process that imports it, so importers can only read them
+        self.imported(name)
+        raise LoxRuntimeError(name, f"Can't assign to imported variable '{name.lexeme}'.")
 
-        if self.enclosing is not None:
-            return self.enclosing.assign(name, value)
+    def imported(self, name: Token) -> Environment:
+        # Imports are only consulted once a name isn't defined anywhere in scope, so modules load on first use
+        environment = self
+        while environment is not None:
+            for module in environment.imports or ():
+                exports = module.load()
+                if name.lexeme in exports.values:
+                    return exports
+
+            environment = environment.enclosing
 
         raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+
+    def capture(self, free: FreeNames | None) -> Environment:
+        """
+        Makes the closure for a function declared in this scope, holding cells for only the variables of the local
+        scopes it refers to and enclosed directly by the globals, so the rest of those scopes can be freed once they
+        finish. Falls back to the whole scope chain when that can't be done safely.
+        :param free: the free names of the function, or None if they aren't known
+        :return: the closure
+        """
+
+        if free is None or self.enclosing is None:
+            return self
+
+        found: dict[str, Environment] = {}
+        environment = self
+
+        while environment.enclosing is not None:
+            # Names could come from a module imported into a local scope, which the closure would lose
+            if environment.imports:
+                return self
+
+            for name in free.names & environment.values.keys():
+                found.setdefault(name, environment)
+
+            environment = environment.enclosing
+
+        # A name defined nowhere yet may be declared later in a local scope, like a function calling another one
+        # declared after it
+        if not free.required <= found.keys() | environment.values.keys():
+            return self
+
+        cells: dict[str, Cell] = {}
+
+        for name, scope in found.items():
+            cell = scope.values[name]
+
+            if type(cell) is not Cell:
+                cell = scope.values[name] = Cell(cell)
+                scope.captured = True
+
+            cells[name] = cell
+
+        closure = Environment(environment, cells)
+        closure.captured = True
+        return closure
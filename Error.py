@@ -1,17 +1,23 @@
+from typing import TextIO
+
 from Token import Token
 from TokenType import *
 
 
-def report(line: int, where: str, message: str) -> None:
-    print(f"[line {line}] Error {where}: {message}")
+def report(line: int, where: str, message: str, file: TextIO | None = None) -> None:
+    print(f"[line {line}] Error {where}: {message}", file=file)
 
 
-def error(line: int, message: str) -> None:
-    report(line, "", message)
+def error(line: int, message: str, file: TextIO | None = None) -> None:
+    report(line, "", message, file)
 
 
-def parse_error(token: Token, message: str):
+def parse_error(token: Token, message: str, file: TextIO | None = None):
     if token.type == TokenType.EOF:
-        report(token.line, "at end", message)
+        report(token.line, "at end", message, file)
     else:
-        report(token.line, "at '" + token.lexeme + "'", message)
+        report(token.line, "at '" + token.lexeme + "'", message, file)
+
+
+def warning(token: Token, message: str) -> None:
+    print(f"[line {token.line}] Warning at '{token.lexeme}': {message}")
@@ -1,4 +1,5 @@
 import os
+import re
 import sys
 from collections import abc
 from datetime import datetime
@@ -7,17 +8,34 @@ from typing import TextIO
 EXPR = {
     "Assign": ["Token name", "Expr value"],
     "Binary": ["Expr left", "Token operator", "Expr right"],
+    "Call": ["Expr callee", "Token paren", "list[Expr] arguments"],
+    "Get": ["Expr object", "Token name"],
     "Grouping": ["Expr expression"],
+    "Index": ["Expr object", "Token bracket", "Expr index"],
+    "List": ["Token bracket", "list[Expr] elements"],
     "Literal": ["LiteralType value"],
+    "Logical": ["Expr left", "Token operator", "Expr right"],
+    "Set": ["Expr object", "Token name", "Expr value"],
+    "SetIndex": ["Expr object", "Token bracket", "Expr index", "Expr value"],
+    "Super": ["Token keyword", "Token method"],
+    "This": ["Token keyword"],
     "Unary": ["Token operator", "Expr right"],
     "Variable": ["Token name"],
 }
 
 STMT = {
     "Block": ["list[Stmt] statements"],
+    "Break": ["Token keyword"],
+    "Class": ["Token name", "VariableExpr superclass", "list[FunctionStmt] methods"],
     "Expression": ["Expr expression"],
+    "ForIn": ["Token name", "Expr iterable", "Stmt body"],
+    "Function": ["Token name", "list[Token] params", "list[Stmt] body"],
+    "If": ["Expr condition", "Stmt then_branch", "Stmt else_branch"],
+    "Import": ["Token keyword", "Token path"],
     "Print": ["Expr expression"],
+    "Return": ["Token keyword", "Expr value"],
     "Variable": ["Token name", "Expr initializer"],
+    "While": ["Expr condition", "Stmt body"],
 }
 
 TYPE = dict[str, list[str]]
@@ -36,14 +54,42 @@ def main() -> None:
     except FileExistsError:
         pass
 
-    define_ast(args[0], "Expr", EXPR, ["from Token import Token, LiteralType"])
-    define_ast(args[0], "Stmt", STMT, ["from AST.Expr import Expr", "from Token import Token"])
-
-
-def define_ast(output_dir: str, base_name: str, types: TYPE, extra_imports=None) -> None:
+    define_ast(
+        args[0],
+        "Expr",
+        EXPR,
+        ["from Token import Token, LiteralType"],
+        ["# Set by the parser on expressions nested too deeply to evaluate recursively", "deep = False"],
+        '{"deep": True} if self.deep else None',
+    )
+    define_ast(
+        args[0],
+        "Stmt",
+        STMT,
+        ["from AST.Expr import Expr, VariableExpr", "from Token import Token"],
+        [
+            "# Set by the parser when the statement uses shared expression nodes with their tokens on other lines",
+            "# than the nodes' own. Pairs each with the lines of its tokens here, so runtime errors report those.",
+            "uses = None",
+        ],
+        '{"uses": self.uses} if self.uses else None',
+    )
+
+
+def define_ast(
+        output_dir: str,
+        base_name: str,
+        types: TYPE,
+        extra_imports=None,
+        base_attributes=None,
+        reduce_state=None,
+) -> None:
     if extra_imports is None:
         extra_imports = []
 
+    if base_attributes is None:
+        base_attributes = []
+
     bn_lower = base_name.lower()
 
     with open(os.path.join(output_dir, base_name + ".py"), "w") as file:
@@ -68,7 +114,17 @@ from dataclasses import dataclass
 #
 
 class {base_name}:
-    def accept(self, visitor: {base_name}Visitor):
+"""
+        )
+
+        for attribute in base_attributes:
+            file.write(f"    {attribute}\n")
+
+        if base_attributes:
+            file.write("\n")
+
+        file.write(
+            f"""    def accept(self, visitor: {base_name}Visitor):
         raise NotImplementedError("Tried calling a virtual method")"""
         )
 
@@ -86,19 +142,37 @@ class {base_name}:
 #""")
 
         for class_name, fields in types.items():
-            file.write(f"""\n\n@dataclass\nclass {class_name}{base_name}({base_name}):\n""")
+            # Nodes compare by identity, like jlox's Java objects, so they can key side tables
+            file.write(f"""\n\n@dataclass(eq=False)\nclass {class_name}{base_name}({base_name}):\n""")
 
+            field_names = []
             for field in fields:
                 field_type, field_name = field.split(" ")
+                field_names.append(field_name)
                 file.write(f"""    {field_name}: {field_type}\n""")
 
             visitor_parameter = f"visitor: {base_name}Visitor"
-            method_name = f"visit_{class_name.lower()}_{bn_lower}"
+            method_name = f"visit_{snake_case(class_name)}_{bn_lower}"
             file.write(
                 f"""\n    def accept(self, {visitor_parameter}):
         return visitor.{method_name}(self)\n"""
             )
 
+            # Pickle nodes as a constructor call rather than a __dict__ so shipping an AST to another process is cheap
+            reduce_arguments = "".join(f"self.{field_name}, " for field_name in field_names)
+            reduce_value = f"{class_name}{base_name}, ({reduce_arguments.rstrip()})"
+            if reduce_state is not None:
+                reduce_value += f", {reduce_state}"
+
+            file.write(
+                f"""\n    def __reduce__(self):
+        return {reduce_value}\n"""
+            )
+
+
+def snake_case(name: str) -> str:
+    return re.sub(r"(?<!^)([A-Z])", r"_\1", name).lower()
+
 
 def define_visitor(file: TextIO, base_name: str, types: abc.KeysView):
     file.write(f"class {base_name}Visitor:\n")
@@ -106,7 +180,7 @@ def define_visitor(file: TextIO, base_name: str, types: abc.KeysView):
     bn_lower = base_name.lower()
     for t in types:
         expression_parameter = f"{bn_lower}: {t}{base_name}"
-        method_name = f"visit_{t.lower()}_{bn_lower}"
+        method_name = f"visit_{snake_case(t)}_{bn_lower}"
         file.write(
             f"""    def {method_name}(self, {expression_parameter}):
         raise NotImplementedError("Tried calling a virtual method {method_name}")\n\n"""
@@ -0,0 +1,249 @@
+from bisect import bisect_right
+from dataclasses import *
+
+from AST.Stmt import Stmt
+from Error import error, parse_error
+from Parser import Parser, ParseError
+from Scanner import Scanner
+from Token import Token
+from TokenType import TokenType
+
+
+class RegionScanner(Scanner):
+    """
+    A scanner that remembers where each token starts and holds on to its errors, so a region can be rescanned
+    speculatively and its errors only reported once the result is kept.
+    """
+
+    def __init__(self, source: str, line: int) -> None:
+        super().__init__(source, [], line=line)
+        self.offsets: list[int] = []
+        self.start_lines: list[int] = []
+        self.errors: list[tuple[int, str]] = []
+        self.start_line = line
+
+    def scan_token(self) -> None:
+        # Strings can span lines, so a token's line is where it ends and the line it starts on is kept separately
+        self.start_line = self.line
+        super().scan_token()
+
+    def add_token(self, token_type: TokenType, literal: any = None) -> None:
+        self.offsets.append(self.start)
+        self.start_lines.append(self.start_line)
+        super().add_token(token_type, literal)
+
+    def error(self, message: str) -> None:
+        self.errors.append((self.line, message))
+
+
+class RegionParser(Parser):
+    def __init__(self, tokens: list[Token], share: bool = False) -> None:
+        super().__init__(tokens, share=share)
+        self.errors: list[tuple[Token, str]] = []
+        # the statements parsed so far with uses, whose lines have to be shifted along with their tokens
+        self.using: list[Stmt] = []
+
+    def error(self, token: Token, message: str) -> ParseError:
+        self.errors.append((token, message))
+        return ParseError()
+
+    def used(self, statement: Stmt, uses: tuple | None) -> Stmt:
+        if uses is not None:
+            self.using.append(statement)
+
+        return super().used(statement, uses)
+
+
+@dataclass
+class Segment:
+    """
+    The source text, tokens and statement of one top-level declaration.
+    A segment runs from its first token up to the next segment's first token, so it owns any trailing whitespace and
+    comments. The first segment always starts at the beginning of the source.
+    """
+
+    start: int
+    line: int
+    tokens: list[Token]
+    # where each token starts, relative to the start of the segment
+    offsets: list[int]
+    statement: Stmt | None
+    # the statements within statement that have uses
+    using: list[Stmt]
+
+
+@dataclass
+class Region:
+    segments: list[Segment]
+    scan_errors: list[tuple[int, str]]
+    parse_errors: list[tuple[Token, str]]
+    # the line the scan finished on, which is where the following segment now starts
+    end_line: int
+
+    def report(self) -> None:
+        for line, message in self.scan_errors:
+            error(line, message)
+
+        for token, message in self.parse_errors:
+            parse_error(token, message)
+
+
+class IncrementalFrontEnd:
+    """
+    Keeps the tokens and top-level statements of a source file up to date as it is edited.
+
+    An edit only rescans and reparses the top-level declarations it touches, extending the region while the new text
+    doesn't line up with the following declaration (an opened string or block, or a comment that swallowed the next
+    token). Statements outside the region are reused as they are, with their token lines shifted if the edit changed
+    the number of lines.
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+
+        region = self.scan_region(0, len(source), 1)
+        region.report()
+        self.segments = region.segments
+
+    @property
+    def statements(self) -> list[Stmt]:
+        return [segment.statement for segment in self.segments if segment.statement is not None]
+
+    @property
+    def tokens(self) -> list[Token]:
+        tokens = [token for segment in self.segments for token in segment.tokens]
+        last = self.segments[-1]
+        tokens.append(Token(TokenType.EOF, "", None, last.line + self.source.count("\n", last.start)))
+
+        return tokens
+
+    def edit(self, offset: int, removed: int, inserted: str) -> list[Stmt]:
+        """
+        Applies a text edit and brings the tokens and statements up to date
+        :param offset: where the edit starts in the current source
+        :param removed: how many characters were removed from offset onwards
+        :param inserted: the text inserted at offset
+        :return: the updated top-level statements
+        """
+
+        if offset < 0 or removed < 0 or offset + removed > len(self.source):
+            raise ValueError(f"Edit at {offset} removing {removed} characters is outside the source.")
+
+        self.source = self.source[:offset] + inserted + self.source[offset + removed:]
+        delta = len(inserted) - removed
+
+        first = bisect_right(self.segments, offset, key=lambda segment: segment.start) - 1
+        last = bisect_right(self.segments, offset + removed, key=lambda segment: segment.start) - 1
+
+        # Editing the first token of a declaration can join it onto the previous one (turning it into an else, say),
+        # and a declaration that failed to parse may have skipped ahead into the edited one while synchronising.
+        if first > 0:
+            first -= 1
+
+        while True:
+            # A declaration that failed to parse might now belong to the edited one, like an else after an if
+            while last + 1 < len(self.segments) and self.segments[last + 1].statement is None:
+                last += 1
+
+            following = self.segments[last + 1] if last + 1 < len(self.segments) else None
+            start = self.segments[first].start
+            end = following.start + delta if following is not None else len(self.source)
+
+            region = self.scan_region(start, end, self.segments[first].line, following)
+            if region is not None:
+                break
+
+            # Grow geometrically so an edit that swallows the rest of the file stays linear overall
+            last = min(len(self.segments) - 1, last + (last - first + 1))
+
+        region.report()
+        self.segments[first:last + 1] = region.segments
+
+        if following is not None:
+            self.shift(first + len(region.segments), delta, region.end_line - following.line)
+
+        return self.statements
+
+    def scan_region(self, start: int, end: int, line: int, following: Segment | None = None) -> Region | None:
+        """
+        Scans and parses source[start:end] into segments
+        :param following: the segment after the region, whose first token has to come out of the scan unchanged
+        :return: the region, or None if its text doesn't end cleanly where the following segment begins
+        """
+
+        lookahead = len(following.tokens[0].lexeme) if following is not None else 0
+        scanner = RegionScanner(self.source[start:end + lookahead], line)
+        tokens = scanner.scan_tokens()
+        end_line = scanner.line
+
+        if following is not None:
+            next_token = following.tokens[0]
+            scanned = tokens[-2] if len(tokens) > 1 else None
+
+            if (
+                scanned is None
+                or scanner.offsets[-1] != end - start
+                or scanned.type != next_token.type
+                or scanned.lexeme != next_token.lexeme
+            ):
+                return None
+
+            end_line = scanner.start_lines[-1]
+            tokens = tokens[:-2] + [Token(TokenType.EOF, "", None, end_line)]
+
+        parser = RegionParser(tokens, share=True)
+        segments = []
+
+        while not parser.at_end():
+            first = parser.current
+            # Nodes are only shared within a declaration, so the lines of every token a segment's statement holds
+            # are shifted along with the segment
+            parser.nodes = {}
+            parser.using = []
+            statement = parser.declaration()
+            # The first segment keeps any whitespace before its first token
+            offset = scanner.offsets[first] if segments else 0
+
+            segments.append(
+                Segment(
+                    start + offset,
+                    scanner.start_lines[first] if segments else line,
+                    tokens[first:parser.current],
+                    [token_offset - offset for token_offset in scanner.offsets[first:parser.current]],
+                    statement,
+                    parser.using,
+                )
+            )
+
+        if len(segments) == 0 and start == 0:
+            segments.append(Segment(start, line, [], [], None, []))
+
+        if following is not None:
+            # The parser ran out of tokens partway through a declaration, which carries on into the following segment
+            if any(token.type == TokenType.EOF for token, _ in parser.errors):
+                return None
+
+            # Recovering from a parse error skips ahead to the next statement keyword, which may be past the region
+            if segments and segments[-1].statement is None:
+                return None
+
+        return Region(segments, scanner.errors, parser.errors, end_line)
+
+    def shift(self, first: int, delta: int, line_delta: int) -> None:
+        for segment in self.segments[first:]:
+            segment.start += delta
+
+        if line_delta == 0:
+            return
+
+        # Reused statements share their tokens with the segments, so this also fixes up the lines in their ASTs
+        for segment in self.segments[first:]:
+            segment.line += line_delta
+
+            for token in segment.tokens:
+                token.line += line_delta
+
+            for statement in segment.using:
+                statement.uses = tuple(
+                    (expr, tuple(line + line_delta for line in lines)) for expr, lines in statement.uses
+                )
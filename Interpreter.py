@@ -1,39 +1,266 @@
+import asyncio
+import sys
+import time
+import weakref
+from typing import Iterable, TextIO
+
 from AST.Expr import *
 from AST.Stmt import *
 from TokenType import *
 from Environment import *
 from RuntimeError import *
+from LoxCallable import LoxCallable
+from LoxClass import LoxClass
+from LoxFunction import LoxFunction, THIS
+from LoxInstance import LoxInstance
+from LoxList import LoxList
+from LoxMap import LoxMap
+from LineReader import LineReader
+from Shape import InlineCache
+from Return import BREAK, Break, Return
+from Stringify import stringify
+from NativeFunction import AsyncNativeFunction, NativeError
+from Builtins import define_natives
+from Specialized import *
+from Module import find_module
+from LazyBlock import LazyBlockStmt
+from Resolver import FreeCache, free_names, method_names
+from Optimizer import first_token
 from dataclasses import *
 
+# How many calls can be in progress at once before a script is stopped with a stack overflow. Each call takes a dozen or
+# so Python frames, so the recursion limit is raised to leave room for them, and a RecursionError from a call nested
+# in very deep expressions stops only the script that made it.
+MAX_CALL_DEPTH = 512
+RECURSION_LIMIT = 16_000
+
+# Whether an expression has a call anywhere in it, by node, which can be cached since the AST doesn't change once parsed
+CallCache = weakref.WeakKeyDictionary[Expr, bool]
+
 
 @dataclass
 class Interpreter(ExprVisitor, StmtVisitor):
-    environment: Environment = field(default_factory=lambda: Environment())
+    globals: Environment = field(default_factory=lambda: Environment())
+    environment: Environment | None = None
+    # Let operator sites rewrite themselves into nodes specialized for the operand types they see
+    specialize: bool = False
+    specializations: Specializations = field(default_factory=Specializations)
+    # where the running script is, which imports are resolved against
+    directory: str = ""
+    # statements left to run and seconds each call to interpret may take, or None for no limit
+    fuel: int | None = None
+    time_limit: float | None = None
+    # statements async execution runs before giving other programs a turn
+    slice_size: int = 1
+    # where print statements and runtime errors are written, or None for standard output
+    output: TextIO | None = None
+    deadline: float | None = field(default=None, init=False)
+    # what has been worked out about the nodes run so far, kept per interpreter so threads sharing a program don't
+    # write to the same tables
+    free_cache: FreeCache = field(default_factory=weakref.WeakKeyDictionary, init=False, repr=False)
+    call_cache: CallCache = field(default_factory=weakref.WeakKeyDictionary, init=False, repr=False)
+    limited: bool = field(default=False, init=False)
+    # calls in progress
+    depth: int = field(default=0, init=False)
+    slice_left: int = field(default=0, init=False)
+    caches: weakref.WeakKeyDictionary[Expr, InlineCache] = field(default_factory=weakref.WeakKeyDictionary, init=False)
+    # the runtime error that stopped the last program run, if one did
+    error: LoxRuntimeError | None = field(default=None, init=False)
+
+    def __post_init__(self):
+        define_natives(self.globals)
+
+        if self.environment is None:
+            self.environment = self.globals
 
     def interpret(self, statements: list[Stmt]) -> bool:
+        self.start(statements)
+
         try:
             for statement in statements:
                 self.execute(statement)
 
             return False
         except LoxRuntimeError as error:
-            runtime_error(error)
-            return True
+            return self.stop(error)
+        except RecursionError:
+            return self.stop(LoxRuntimeError(self.statement_token(statement), "Stack overflow."))
+
+    def stop(self, error: LoxRuntimeError) -> bool:
+        self.error = error
+        runtime_error(error, self.output)
+        return True
+
+    def start(self, statements: list[Stmt]) -> None:
+        if self.specialize:
+            prepare(statements)
+
+        if self.time_limit is not None:
+            self.deadline = time.monotonic() + self.time_limit
+
+        self.limited = self.fuel is not None or self.deadline is not None
+
+        if sys.getrecursionlimit() < RECURSION_LIMIT:
+            sys.setrecursionlimit(RECURSION_LIMIT)
+
+    def execute(self, statement: Stmt) -> Return | Break | None:
+        """
+        :return: how the statement completed, if it was by a return or break
+        """
+
+        try:
+            if self.limited:
+                self.check_limits(statement)
+
+            return statement.accept(self)
+        except LoxRuntimeError as error:
+            if not error.located:
+                error.locate(statement.uses)
+            raise
+
+    def check_limits(self, statement: Stmt) -> None:
+        if self.fuel is not None:
+            if self.fuel <= 0:
+                raise LoxRuntimeError(self.statement_token(statement), "Out of fuel.")
+
+            self.fuel -= 1
+
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise LoxRuntimeError(self.statement_token(statement), "Time limit exceeded.")
 
-    def execute(self, statement: Stmt):
-        statement.accept(self)
+    @staticmethod
+    def statement_token(statement: Stmt) -> Token:
+        # Only an empty block has no token of its own
+        return first_token(statement) or Token(TokenType.EOF, "", None, 0)
 
     def evaluate(self, expr: Expr) -> any:
+        # A node is at least as deep as its subexpressions, so only the roots evaluated from statements need checking.
+        # The expression visitors call accept on their subexpressions directly.
+        if expr.deep:
+            return self.evaluate_iterative(expr)
+
         return expr.accept(self)
 
+    def evaluate_iterative(self, expr: Expr) -> any:
+        """
+        Evaluates an expression using explicit work and value stacks instead of Python recursion, for trees nested too
+        deeply for the recursive visitor (like long generated operator chains). Only calls into function bodies recurse.
+        :param expr: the expression to evaluate
+        :return: the value of the expression
+        """
+
+        values = []
+        # each entry is a node and how many of its operands have been evaluated so far
+        work: list[tuple[Expr, int]] = [(expr, 0)]
+
+        while work:
+            node, done = work.pop()
+
+            if isinstance(node, GroupingExpr):
+                work.append((node.expression, 0))
+
+            elif isinstance(node, BinaryExpr):
+                if done < 2:
+                    work.append((node, done + 1))
+                    work.append((node.right if done else node.left, 0))
+                else:
+                    right = values.pop()
+                    values.append(self.apply_binary(node.operator, values.pop(), right))
+
+            elif isinstance(node, UnaryExpr):
+                if done == 0:
+                    work.append((node, 1))
+                    work.append((node.right, 0))
+                else:
+                    values.append(self.apply_unary(node.operator, values.pop()))
+
+            elif isinstance(node, LogicalExpr):
+                if done == 0:
+                    work.append((node, 1))
+                    work.append((node.left, 0))
+                elif self.is_truthy(values[-1]) != (node.operator.type == TokenType.OR):
+                    # The left operand didn't decide the result, so the right one replaces it
+                    values.pop()
+                    work.append((node.right, 0))
+
+            elif isinstance(node, AssignExpr):
+                if done == 0:
+                    work.append((node, 1))
+                    work.append((node.value, 0))
+                else:
+                    self.environment.assign(node.name, values[-1])
+
+            elif isinstance(node, GetExpr):
+                if done == 0:
+                    work.append((node, 1))
+                    work.append((node.object, 0))
+                else:
+                    values.append(self.get_property(node, values.pop()))
+
+            elif isinstance(node, SetExpr):
+                if done == 0:
+                    work.append((node, 1))
+                    work.append((node.object, 0))
+                elif done == 1:
+                    if type(values[-1]) is not LoxInstance:
+                        raise LoxRuntimeError(node.name, "Only instances have fields.")
+
+                    work.append((node, 2))
+                    work.append((node.value, 0))
+                else:
+                    value = values.pop()
+                    self.set_property(node, values.pop(), value)
+                    values.append(value)
+
+            elif isinstance(node, CallExpr):
+                if done <= len(node.arguments):
+                    work.append((node, done + 1))
+                    work.append((node.arguments[done - 1] if done else node.callee, 0))
+                else:
+                    arguments = values[len(values) - len(node.arguments):]
+                    del values[len(values) - len(node.arguments):]
+                    values.append(self.call(node, values.pop(), arguments))
+
+            elif isinstance(node, IndexExpr):
+                if done < 2:
+                    work.append((node, done + 1))
+                    work.append((node.index if done else node.object, 0))
+                else:
+                    index = values.pop()
+                    values.append(self.get_index(node, values.pop(), index))
+
+            elif isinstance(node, SetIndexExpr):
+                if done < 3:
+                    work.append((node, done + 1))
+                    work.append(((node.object, node.index, node.value)[done], 0))
+                else:
+                    value = values.pop()
+                    index = values.pop()
+                    self.set_index(node, values.pop(), index, value)
+                    values.append(value)
+
+            elif isinstance(node, ListExpr):
+                if done < len(node.elements):
+                    work.append((node, done + 1))
+                    work.append((node.elements[done], 0))
+                else:
+                    elements = values[len(values) - len(node.elements):]
+                    del values[len(values) - len(node.elements):]
+                    values.append(LoxList(elements))
+
+            else:
+                values.append(node.accept(self))
+
+        return values.pop()
+
     def visit_literal_expr(self, expr: LiteralExpr) -> LiteralType:
         return expr.value
 
     def visit_grouping_expr(self, expr: GroupingExpr) -> any:
-        return self.evaluate(expr.expression)
+        return expr.expression.accept(self)
 
     def visit_unary_expr(self, expr: UnaryExpr) -> any:
-        right = self.evaluate(expr.right)
+        right = expr.right.accept(self)
 
         if expr.operator.type == TokenType.MINUS:
             self.check_number_operand(expr.operator, right)
@@ -44,12 +271,11 @@ class Interpreter(ExprVisitor, StmtVisitor):
         raise Exception(f"Operator: {expr.operator.type}")
 
     @staticmethod
-    def is_truthy(expr: Expr) -> bool:
-        if isinstance(expr, LiteralExpr):
-            if expr.value is None:
-                return False
-            if type(expr.value) == bool:
-                return expr.value
+    def is_truthy(value: any) -> bool:
+        if value is None:
+            return False
+        if type(value) == bool:
+            return value
 
         return True
 
@@ -68,8 +294,8 @@ class Interpreter(ExprVisitor, StmtVisitor):
         raise LoxRuntimeError(operator, "Operands must be a numbers.")
 
     def visit_binary_expr(self, expr: BinaryExpr):
-        left = self.evaluate(expr.left)
-        right = self.evaluate(expr.right)
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
 
         if expr.operator.type == TokenType.PLUS:
             if type(left) == float and type(right) == float:
@@ -124,16 +350,484 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def is_equal(left: any, right: any) -> bool:
         return left == right
 
+    #
+    # Specialized operators
+    #
+
+    def visit_unspecialized_binary_expr(self, expr: BinaryExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        self.specializations.specialize_binary(expr, left, right)
+        return self.apply_binary(expr.operator, left, right)
+
+    def visit_unspecialized_unary_expr(self, expr: UnaryExpr):
+        right = expr.right.accept(self)
+
+        self.specializations.specialize_unary(expr, right)
+        return self.apply_unary(expr.operator, right)
+
+    def despecialize_binary(self, expr: BinaryExpr, left: any, right: any) -> any:
+        self.specializations.despecialize(expr, BinaryExpr)
+        return self.apply_binary(expr.operator, left, right)
+
+    def visit_number_add_expr(self, expr: NumberAddExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left + right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_subtract_expr(self, expr: NumberSubtractExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left - right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_multiply_expr(self, expr: NumberMultiplyExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left * right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_divide_expr(self, expr: NumberDivideExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            if right == 0.0:
+                raise LoxRuntimeError(expr.operator, "Divide by zero error.")
+
+            return left / right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_greater_expr(self, expr: NumberGreaterExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left > right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_greater_equal_expr(self, expr: NumberGreaterEqualExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left >= right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_less_expr(self, expr: NumberLessExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left < right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_number_less_equal_expr(self, expr: NumberLessEqualExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is float and type(right) is float:
+            return left <= right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_string_concat_expr(self, expr: StringConcatExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if type(left) is str and type(right) is str:
+            return left + right
+
+        return self.despecialize_binary(expr, left, right)
+
+    def visit_equal_expr(self, expr: EqualExpr):
+        return self.is_equal(expr.left.accept(self), expr.right.accept(self))
+
+    def visit_not_equal_expr(self, expr: NotEqualExpr):
+        return not self.is_equal(expr.left.accept(self), expr.right.accept(self))
+
+    def visit_number_negate_expr(self, expr: NumberNegateExpr):
+        right = expr.right.accept(self)
+
+        if type(right) is float:
+            return -right
+
+        self.specializations.despecialize(expr, UnaryExpr)
+        return self.apply_unary(expr.operator, right)
+
+    def visit_not_expr(self, expr: NotExpr):
+        return not self.is_truthy(expr.right.accept(self))
+
+    def visit_known_number_add_expr(self, expr: KnownNumberAddExpr):
+        return expr.left.accept(self) + expr.right.accept(self)
+
+    def visit_known_number_subtract_expr(self, expr: KnownNumberSubtractExpr):
+        return expr.left.accept(self) - expr.right.accept(self)
+
+    def visit_known_number_multiply_expr(self, expr: KnownNumberMultiplyExpr):
+        return expr.left.accept(self) * expr.right.accept(self)
+
+    def visit_known_number_divide_expr(self, expr: KnownNumberDivideExpr):
+        left = expr.left.accept(self)
+        right = expr.right.accept(self)
+
+        if right == 0.0:
+            raise LoxRuntimeError(expr.operator, "Divide by zero error.")
+
+        return left / right
+
+    def visit_known_number_greater_expr(self, expr: KnownNumberGreaterExpr):
+        return expr.left.accept(self) > expr.right.accept(self)
+
+    def visit_known_number_greater_equal_expr(self, expr: KnownNumberGreaterEqualExpr):
+        return expr.left.accept(self) >= expr.right.accept(self)
+
+    def visit_known_number_less_expr(self, expr: KnownNumberLessExpr):
+        return expr.left.accept(self) < expr.right.accept(self)
+
+    def visit_known_number_less_equal_expr(self, expr: KnownNumberLessEqualExpr):
+        return expr.left.accept(self) <= expr.right.accept(self)
+
+    def visit_known_string_concat_expr(self, expr: KnownStringConcatExpr):
+        return expr.left.accept(self) + expr.right.accept(self)
+
+    def visit_known_number_negate_expr(self, expr: KnownNumberNegateExpr):
+        return -expr.right.accept(self)
+
+    # The visitors apply operators to subexpressions they evaluate themselves. The async and iterative evaluators
+    # already have the operand values, so they hand them to the visitors as literals to share one definition of each
+    # operator.
+
+    def apply_unary(self, operator: Token, right: any) -> any:
+        return self.visit_unary_expr(UnaryExpr(operator, LiteralExpr(right)))
+
+    def apply_binary(self, operator: Token, left: any, right: any) -> any:
+        return self.visit_binary_expr(BinaryExpr(LiteralExpr(left), operator, LiteralExpr(right)))
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        left = expr.left.accept(self)
+
+        # Short circuit, returning the operand that decided the result rather than a bool
+        if expr.operator.type == TokenType.OR:
+            if self.is_truthy(left):
+                return left
+        elif not self.is_truthy(left):
+            return left
+
+        return expr.right.accept(self)
+
+    def visit_call_expr(self, expr: CallExpr):
+        if type(expr.callee) is GetExpr:
+            instance = expr.callee.object.accept(self)
+            method = self.get_method(expr.callee, instance)
+
+            if method is not None:
+                arguments = [argument.accept(self) for argument in expr.arguments]
+                self.check_call(expr, method, arguments)
+                return method.call_method(self, instance, arguments)
+
+            callee = instance.fields[self.caches[expr.callee].slot]
+        else:
+            callee = expr.callee.accept(self)
+
+        arguments = [argument.accept(self) for argument in expr.arguments]
+
+        return self.call(expr, callee, arguments)
+
+    def call(self, expr: CallExpr, callee: any, arguments: list[any]) -> any:
+        self.check_call(expr, callee, arguments)
+
+        try:
+            return callee.call(self, arguments)
+        except NativeError as error:
+            raise LoxRuntimeError(expr.paren, error.args[0])
+
+    def check_call(self, expr: CallExpr, callee: any, arguments: list[any]) -> None:
+        if self.depth >= MAX_CALL_DEPTH:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.")
+
+        if not isinstance(callee, LoxCallable):
+            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
+
+        if len(arguments) != callee.arity():
+            raise LoxRuntimeError(expr.paren, f"Expected {callee.arity()} arguments but got {len(arguments)}.")
+
+    #
+    # Classes
+    #
+    # Property accesses and assignments look up where a name lives in an instance's shape through an inline cache for
+    # their node, so a site that keeps seeing instances laid out the same way skips the lookup. The caches belong to
+    # the interpreter rather than the nodes, so a program can be shared by interpreters on several threads, and are
+# dropped along with their nodes.
+    #
+
+    def visit_get_expr(self, expr: GetExpr):
+        return self.get_property(expr, expr.object.accept(self))
+
+    def get_property(self, expr: GetExpr, instance: any) -> any:
+        if type(instance) is not LoxInstance:
+            raise LoxRuntimeError(expr.name, "Only instances have properties.")
+
+        cache = self.caches.get(expr)
+        if cache is None or cache.shape is not instance.shape:
+            cache = self.find_property(expr, instance)
+
+        if cache.slot is not None:
+            return instance.fields[cache.slot]
+
+        return cache.target.bind(instance)
+
+    def get_method(self, expr: GetExpr, instance: any) -> any:
+        """
+        Looks up a property that is about to be called, leaving the cache on expr up to date with the instance's shape
+        :return: the method, left unbound since it is called straight away, or None if the property is a field
+        """
+
+        if type(instance) is not LoxInstance:
+            raise LoxRuntimeError(expr.name, "Only instances have properties.")
+
+        cache = self.caches.get(expr)
+        if cache is None or cache.shape is not instance.shape:
+            cache = self.find_property(expr, instance)
+
+        return cache.target
+
+    def find_property(self, expr: GetExpr, instance: LoxInstance) -> InlineCache:
+        cache = self.caches.get(expr)
+        if cache is None:
+            cache = self.caches[expr] = InlineCache()
+
+        shape = instance.shape
+        if not cache.find(shape):
+            # Fields shadow methods
+            slot = shape.slots.get(expr.name.lexeme)
+            method = shape.klass.find_method(expr.name.lexeme) if slot is None else None
+
+            if slot is None and method is None:
+                raise LoxRuntimeError(expr.name, f"Undefined property '{expr.name.lexeme}'.")
+
+            cache.add(shape, slot, method)
+
+        return cache
+
+    def visit_set_expr(self, expr: SetExpr):
+        instance = expr.object.accept(self)
+
+        if type(instance) is not LoxInstance:
+            raise LoxRuntimeError(expr.name, "Only instances have fields.")
+
+        value = expr.value.accept(self)
+        self.set_property(expr, instance, value)
+        return value
+
+    def set_property(self, expr: SetExpr, instance: LoxInstance, value: any) -> None:
+        cache = self.caches.get(expr)
+        shape = instance.shape
+
+        if cache is None or cache.shape is not shape:
+            if cache is None:
+                cache = self.caches[expr] = InlineCache()
+
+            if not cache.find(shape):
+                slot = shape.slots.get(expr.name.lexeme)
+
+                if slot is None:
+                    cache.add(shape, len(shape.slots), shape.adding(expr.name.lexeme))
+                else:
+                    cache.add(shape, slot, None)
+
+        if cache.target is None:
+            instance.fields[cache.slot] = value
+        else:
+            instance.fields.append(value)
+            instance.shape = cache.target
+
+    def visit_this_expr(self, expr: ThisExpr):
+        return self.environment.get(expr.keyword)
+
+    def visit_super_expr(self, expr: SuperExpr):
+        superclass = self.environment.get(expr.keyword)
+        method = superclass.find_method(expr.method.lexeme)
+
+        if method is None:
+            raise LoxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
+
+        return method.bind(self.environment.get(THIS))
+
+    #
+    # Collections
+    #
+    # Lists and maps hold a Python list and dict, so indexing is a single lookup. Lists and strings are indexed by
+    # position and maps by key.
+    #
+
+    def visit_list_expr(self, expr: ListExpr):
+        return LoxList([element.accept(self) for element in expr.elements])
+
+    def visit_index_expr(self, expr: IndexExpr):
+        target = expr.object.accept(self)
+        return self.get_index(expr, target, expr.index.accept(self))
+
+    def get_index(self, expr: IndexExpr, target: any, index: any) -> any:
+        if type(target) is LoxList:
+            return target.elements[self.position(expr.bracket, index, len(target.elements))]
+
+        if type(target) is LoxMap:
+            try:
+                return target.entries[self.map_key(expr.bracket, index)]
+            except KeyError:
+                raise LoxRuntimeError(expr.bracket, f"Undefined key '{stringify(index)}'.")
+
+        if type(target) is str:
+            return target[self.position(expr.bracket, index, len(target))]
+
+        raise LoxRuntimeError(expr.bracket, "Only lists, maps and strings can be indexed.")
+
+    def visit_set_index_expr(self, expr: SetIndexExpr):
+        target = expr.object.accept(self)
+        index = expr.index.accept(self)
+        value = expr.value.accept(self)
+
+        self.set_index(expr, target, index, value)
+        return value
+
+    def set_index(self, expr: SetIndexExpr, target: any, index: any, value: any) -> None:
+        if type(target) is LoxList:
+            target.elements[self.position(expr.bracket, index, len(target.elements))] = value
+        elif type(target) is LoxMap:
+            target.entries[self.map_key(expr.bracket, index)] = value
+        else:
+            raise LoxRuntimeError(expr.bracket, "Only lists and maps can be assigned by index.")
+
+    @staticmethod
+    def position(bracket: Token, index: any, length: int) -> int:
+        if type(index) is not float or not index.is_integer():
+            raise LoxRuntimeError(bracket, "Index must be an integer.")
+
+        if not 0 <= index < length:
+            raise LoxRuntimeError(bracket, "Index out of bounds.")
+
+        return int(index)
+
+    @staticmethod
+    def map_key(bracket: Token, key: any) -> any:
+        try:
+            return LoxMap.key(key)
+        except TypeError as error:
+            raise LoxRuntimeError(bracket, error.args[0])
+
+    @staticmethod
+    def iterate(stmt: ForInStmt, iterable: any) -> Iterable[any]:
+        """
+        :return: the elements of a list, the keys of a map or the characters of a string, taken before the loop starts
+                 so the body can change the collection, or the lines of a file, read as the loop goes
+        """
+
+        if type(iterable) is LoxList:
+            return list(iterable.elements)
+
+        if type(iterable) is LoxMap:
+            return iterable.keys()
+
+        if type(iterable) is str or type(iterable) is LineReader:
+            return iterable
+
+        raise LoxRuntimeError(stmt.name, "Can only loop over lists, maps, strings and files.")
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        superclass = None
+
+        if stmt.superclass is not None:
+            superclass = self.evaluate(stmt.superclass)
+
+            if not isinstance(superclass, LoxClass):
+                raise LoxRuntimeError(stmt.superclass.name, "Superclass must be a class.")
+
+        self.environment.define(stmt.name.lexeme, None)
+
+        # Methods of a subclass close over an extra scope holding the superclass, for super to find
+        environment = self.environment
+        if superclass is not None:
+            environment = Environment(self.environment)
+            environment.define("super", superclass)
+
+        # The methods share one closure
+        closure = environment.capture(method_names(stmt, self.free_cache))
+        methods = {
+            method.name.lexeme: LoxFunction(method, closure, method.name.lexeme == "init") for method in stmt.methods
+        }
+
+        self.environment.assign(stmt.name, LoxClass(stmt.name.lexeme, superclass, methods))
+
     def visit_expression_stmt(self, stmt: ExpressionStmt):
         self.evaluate(stmt.expression)
 
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        # Defined before capturing, so a function that calls itself captures its own name
+        self.environment.define(stmt.name.lexeme, None)
+        self.environment.define(stmt.name.lexeme, LoxFunction(stmt, self.environment.capture(free_names(stmt, self.free_cache))))
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        if self.is_truthy(self.evaluate(stmt.condition)):
+            return self.execute(stmt.then_branch)
+        elif stmt.else_branch is not None:
+            return self.execute(stmt.else_branch)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        value = None
+        if stmt.value is not None:
+            value = self.evaluate(stmt.value)
+
+        return Return(value)
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        return BREAK
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        while self.is_truthy(self.evaluate(stmt.condition)):
+            completion = self.execute(stmt.body)
+
+            # A break ends this loop, and a return carries on up to the function call
+            if completion is not None:
+                return None if completion is BREAK else completion
+
+    def visit_for_in_stmt(self, stmt: ForInStmt):
+        body = [stmt.body]
+
+        # Each pass gets its own variable, so closures made in the body keep the element they saw
+        for value in self.iterate(stmt, self.evaluate(stmt.iterable)):
+            environment = Environment(self.environment)
+            environment.define(stmt.name.lexeme, value)
+
+            completion = self.execute_block(body, environment)
+            if completion is not None:
+                return None if completion is BREAK else completion
+
+    def visit_import_stmt(self, stmt: ImportStmt):
+        self.environment.import_module(find_module(self, stmt.path))
+
     def visit_print_stmt(self, stmt: PrintStmt):
         value = self.evaluate(stmt.expression)
 
         if isinstance(value, str):
-            print(f"\"{value}\"")
+            print(f"\"{value}\"", file=self.output)
         else:
-            print(str(value))
+            print(str(value), file=self.output)
 
     def visit_variable_stmt(self, stmt: VariableStmt):
         value = self.evaluate(stmt.initializer)
@@ -143,21 +837,225 @@ class Interpreter(ExprVisitor, StmtVisitor):
         return self.environment.get(expr.name)
 
     def visit_assign_expr(self, expr: AssignExpr):
-        value = self.evaluate(expr.value)
+        value = expr.value.accept(self)
         self.environment.assign(expr.name, value)
         return value
 
     def visit_block_stmt(self, stmt: BlockStmt):
         return self.execute_block(stmt.statements, Environment(self.environment))
 
-    def execute_block(self, statements: list[Stmt], new_env: Environment):
+    def visit_lazy_block_stmt(self, stmt: LazyBlockStmt):
+        self.expand_block(stmt)
+        return self.visit_block_stmt(stmt)
+
+    def expand_block(self, stmt: LazyBlockStmt) -> None:
+        if not stmt.expand():
+            raise LoxRuntimeError(stmt.brace, "Block has syntax errors.")
+
+        if self.specialize:
+            prepare(stmt.statements)
+
+    def execute_block(self, statements: list[Stmt], new_env: Environment) -> Return | Break | None:
+        """
+        :return: the completion of the return or break that ended the block early, if one did
+        """
+
         enclosed = self.environment
-        # the new_env has self.environment as its enclosed
+        # the new_env has self.environment as its enclosed, and is left again however the block ends, even by an error
         try:
             self.environment = new_env
 
             for statement in statements:
-                self.execute(statement)
+                completion = self.execute(statement)
+                if completion is not None:
+                    return completion
         finally:
             self.environment = enclosed
 
+    #
+    # Async execution
+    #
+    # These mirror execute/evaluate but yield to the event loop every slice_size statements and await async natives,
+    # so one process can interleave many programs. Expressions without a call in them can't reach an async
+    # native, so they are handed to the synchronous visitor as-is.
+    #
+
+    async def interpret_async(self, statements: list[Stmt]) -> bool:
+        self.start(statements)
+        self.slice_left = self.slice_size
+
+        try:
+            for statement in statements:
+                await self.execute_async(statement)
+
+            return False
+        except LoxRuntimeError as error:
+            return self.stop(error)
+        except RecursionError:
+            return self.stop(LoxRuntimeError(self.statement_token(statement), "Stack overflow."))
+
+    async def execute_async(self, statement: Stmt):
+        try:
+            return await self.execute_statement_async(statement)
+        except LoxRuntimeError as error:
+            if not error.located:
+                error.locate(statement.uses)
+            raise
+
+    async def execute_statement_async(self, statement: Stmt):
+        self.slice_left -= 1
+        if self.slice_left <= 0:
+            self.slice_left = self.slice_size
+            await asyncio.sleep(0)
+
+        if self.limited:
+            self.check_limits(statement)
+
+        if type(statement) is LazyBlockStmt:
+            self.expand_block(statement)
+
+        if isinstance(statement, BlockStmt):
+            return await self.execute_block_async(statement.statements, Environment(self.environment))
+
+        elif isinstance(statement, IfStmt):
+            if self.is_truthy(await self.evaluate_async(statement.condition)):
+                return await self.execute_async(statement.then_branch)
+            elif statement.else_branch is not None:
+                return await self.execute_async(statement.else_branch)
+
+        elif isinstance(statement, WhileStmt):
+            while self.is_truthy(await self.evaluate_async(statement.condition)):
+                completion = await self.execute_async(statement.body)
+                if completion is not None:
+                    return None if completion is BREAK else completion
+
+        elif isinstance(statement, ForInStmt):
+            for value in self.iterate(statement, await self.evaluate_async(statement.iterable)):
+                environment = Environment(self.environment)
+                environment.define(statement.name.lexeme, value)
+
+                completion = await self.execute_block_async([statement.body], environment)
+                if completion is not None:
+                    return None if completion is BREAK else completion
+
+        elif isinstance(statement, ExpressionStmt):
+            await self.evaluate_async(statement.expression)
+
+        elif isinstance(statement, PrintStmt):
+            self.visit_print_stmt(PrintStmt(LiteralExpr(await self.evaluate_async(statement.expression))))
+
+        elif isinstance(statement, VariableStmt):
+            self.environment.define(statement.name.lexeme, await self.evaluate_async(statement.initializer))
+
+        elif isinstance(statement, ReturnStmt) and statement.value is not None:
+            return Return(await self.evaluate_async(statement.value))
+
+        else:
+            return statement.accept(self)
+
+    async def execute_block_async(self, statements: list[Stmt], new_env: Environment):
+        enclosed = self.environment
+
+        try:
+            self.environment = new_env
+
+            for statement in statements:
+                completion = await self.execute_async(statement)
+                if completion is not None:
+                    return completion
+        finally:
+            self.environment = enclosed
+
+    async def evaluate_async(self, expr: Expr) -> any:
+        # Deeply nested expressions need the iterative evaluator, at the cost of blocking on any async natives in them
+        if expr.deep or not contains_call(expr, self.call_cache):
+            return self.evaluate(expr)
+
+        if isinstance(expr, CallExpr):
+            callee = await self.evaluate_async(expr.callee)
+            arguments = [await self.evaluate_async(argument) for argument in expr.arguments]
+
+            self.check_call(expr, callee, arguments)
+
+            try:
+                if isinstance(callee, (AsyncNativeFunction, LoxClass, LoxFunction)):
+                    return await callee.call_async(self, arguments)
+
+                return callee.call(self, arguments)
+            except NativeError as error:
+                raise LoxRuntimeError(expr.paren, error.args[0])
+
+        if isinstance(expr, GroupingExpr):
+            return await self.evaluate_async(expr.expression)
+
+        if isinstance(expr, LogicalExpr):
+            left = await self.evaluate_async(expr.left)
+
+            if self.is_truthy(left) == (expr.operator.type == TokenType.OR):
+                return left
+
+            return await self.evaluate_async(expr.right)
+
+        if isinstance(expr, AssignExpr):
+            value = await self.evaluate_async(expr.value)
+            self.environment.assign(expr.name, value)
+            return value
+
+        if isinstance(expr, GetExpr):
+            return self.get_property(expr, await self.evaluate_async(expr.object))
+
+        if isinstance(expr, SetExpr):
+            instance = await self.evaluate_async(expr.object)
+
+            if type(instance) is not LoxInstance:
+                raise LoxRuntimeError(expr.name, "Only instances have fields.")
+
+            value = await self.evaluate_async(expr.value)
+            self.set_property(expr, instance, value)
+            return value
+
+        if isinstance(expr, IndexExpr):
+            target = await self.evaluate_async(expr.object)
+            return self.get_index(expr, target, await self.evaluate_async(expr.index))
+
+        if isinstance(expr, SetIndexExpr):
+            target = await self.evaluate_async(expr.object)
+            index = await self.evaluate_async(expr.index)
+            value = await self.evaluate_async(expr.value)
+
+            self.set_index(expr, target, index, value)
+            return value
+
+        if isinstance(expr, ListExpr):
+            return LoxList([await self.evaluate_async(element) for element in expr.elements])
+
+        if isinstance(expr, UnaryExpr):
+            return self.apply_unary(expr.operator, await self.evaluate_async(expr.right))
+
+        if isinstance(expr, BinaryExpr):
+            left = await self.evaluate_async(expr.left)
+            return self.apply_binary(expr.operator, left, await self.evaluate_async(expr.right))
+
+        return self.evaluate(expr)
+
+
+def contains_call(expr: Expr, cache: CallCache) -> bool:
+    cached = cache.get(expr)
+    if cached is not None:
+        return cached
+
+    found = False
+    pending = [expr]
+
+    while pending and not found:
+        node = pending.pop()
+
+        if isinstance(node, CallExpr):
+            found = True
+        elif isinstance(node, Expr):
+            pending.extend(getattr(node, child.name) for child in fields(node))
+        elif isinstance(node, list):
+            pending.extend(node)
+
+    cache[expr] = found
+    return found
@@ -0,0 +1,126 @@
+import threading
+
+from AST.Stmt import *
+from Error import parse_error
+from Incremental import RegionParser
+from Optimizer import walk
+from Token import Token
+
+#
+# In lazy mode the parser only matches braces to find where a nested block ends, and leaves a lazy block holding its
+# token range. The first time the block runs, its statements are parsed and it swaps its class back to BlockStmt, so
+# blocks that never run are never parsed.
+#
+
+# Held while a block parses, so threads running the same block parse it once between them
+EXPAND_LOCK = threading.Lock()
+
+
+class LazyBlockStmt(BlockStmt):
+    # set once parsing the block has reported syntax errors, so running it again doesn't report them twice
+    failed = False
+
+    def __init__(
+        self,
+        brace: Token,
+        tokens: list[Token],
+        start: int,
+        end: int,
+        functions: tuple[str, ...],
+        classes: tuple[str, ...],
+        loops: int,
+    ) -> None:
+        super().__init__(None)
+        self.brace = brace
+        self.tokens = tokens
+        # the index of the first token after the opening brace
+        self.start = start
+        # the index of the closing brace
+        self.end = end
+        # the parser's enclosing functions, classes and loops where the block starts, to check return, this, super
+        # and break
+        self.functions = functions
+        self.classes = classes
+        self.loops = loops
+
+    def accept(self, visitor: StmtVisitor):
+        return visitor.visit_lazy_block_stmt(self)
+
+    def expand(self) -> bool:
+        """
+        Parses the block's statements, reporting any syntax errors in them. Nested blocks are left lazy.
+        The statements are in place before the class is swapped, so another thread running the same block either
+        waits for the parse to finish or sees it finished.
+        :return: whether the block parsed without errors
+        """
+
+        with EXPAND_LOCK:
+            return self.expand_locked()
+
+    def expand_locked(self) -> bool:
+        # Another thread may have parsed the block since this one found it lazy
+        if type(self) is not LazyBlockStmt:
+            return True
+
+        if self.failed:
+            return False
+
+        parser = BlockParser(self.tokens, self.start, self.end)
+        parser.functions = list(self.functions)
+        parser.classes = list(self.classes)
+        parser.loops = self.loops
+
+        statements = parser.parse()
+
+        if parser.errors:
+            for token, message in parser.errors:
+                parse_error(token, message)
+
+            self.failed = True
+            return False
+
+        self.statements = statements
+        self.__class__ = BlockStmt
+
+        # A parsed block is an ordinary one, and holding on to the token list would keep the whole file's tokens alive
+        del self.brace, self.tokens, self.start, self.end, self.functions, self.classes, self.loops
+        return True
+
+    def __reduce__(self):
+        # Pickling a lazy block, like sending a function to a worker process, takes the block's statements instead of
+        # the whole token list
+        self.expand()
+        return BlockStmt, (self.statements,)
+
+
+class BlockParser(RegionParser):
+    """
+    Parses the statements between a block's braces, treating the closing brace as the end of the input so recovering
+    from an error can't carry on past it
+    """
+
+    def __init__(self, tokens: list[Token], start: int, end: int) -> None:
+        super().__init__(tokens)
+        self.lazy = True
+        self.current = start
+        self.end = end
+
+    def at_end(self) -> bool:
+        return self.current >= self.end
+
+
+def verify(statements: list[Stmt]) -> bool:
+    """
+    Parses every lazy block in the statements, including those nested inside them, reporting any syntax errors
+    :return: whether every block parsed without errors
+    """
+
+    ok = True
+
+    # walk only looks at a node's children after yielding it, so it carries on into the statements of each block
+    # expanded here
+    for node in walk(statements):
+        if type(node) is LazyBlockStmt:
+            ok = node.expand() and ok
+
+    return ok
@@ -0,0 +1,57 @@
+import mmap
+
+
+class LineReader:
+    """
+    Reads a file's lines one at a time through a read-only memory map. Only the pages around the line being read need
+    to be in memory, so a script can work through a file far larger than it could hold as a string.
+    """
+
+    __slots__ = ("path", "file", "map", "position")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.file = open(path, "rb")
+        self.position = 0
+
+        try:
+            # An empty file can't be mapped, and has no lines to read anyway
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.file.seek(0, 2) else None
+        except (OSError, ValueError):
+            self.file.close()
+            raise
+
+    def next_line(self) -> str | None:
+        """
+        :return: the next line, without its line ending, or None once the whole file has been read
+        """
+
+        if self.map is None or self.position >= len(self.map):
+            self.close()
+            return None
+
+        end = self.map.find(b"\n", self.position)
+        if end < 0:
+            end = len(self.map)
+
+        line = self.map[self.position:end]
+        self.position = end + 1
+
+        if line.endswith(b"\r"):
+            line = line[:-1]
+
+        return line.decode("utf-8", errors="replace")
+
+    def close(self) -> None:
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+        self.file.close()
+
+    def __iter__(self):
+        while (line := self.next_line()) is not None:
+            yield line
+
+    def __str__(self) -> str:
+        return f"<lines {self.path}>"
@@ -0,0 +1,6 @@
+class LoxCallable:
+    def arity(self) -> int:
+        raise NotImplementedError("Tried calling a virtual method arity")
+
+    def call(self, interpreter, arguments: list[any]) -> any:
+        raise NotImplementedError("Tried calling a virtual method call")
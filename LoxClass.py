@@ -0,0 +1,56 @@
+from __future__ import annotations
+from dataclasses import *
+
+from LoxCallable import LoxCallable
+from LoxFunction import LoxFunction
+from LoxInstance import LoxInstance
+from Shape import Shape
+
+
+# Classes compare by identity, two classes with the same methods are still different classes
+@dataclass(eq=False)
+class LoxClass(LoxCallable):
+    name: str
+    superclass: LoxClass | None
+    methods: dict[str, LoxFunction]
+    # the shape new instances start out with
+    shape: Shape = field(init=False)
+
+    def __post_init__(self):
+        self.shape = Shape(self)
+
+    def find_method(self, name: str) -> LoxFunction | None:
+        klass = self
+        while klass is not None:
+            if name in klass.methods:
+                return klass.methods[name]
+
+            klass = klass.superclass
+
+        return None
+
+    def arity(self) -> int:
+        initializer = self.find_method("init")
+        return 0 if initializer is None else initializer.arity()
+
+    def call(self, interpreter, arguments: list[any]) -> any:
+        instance = LoxInstance(self)
+
+        initializer = self.find_method("init")
+        if initializer is not None:
+            initializer.call_method(interpreter, instance, arguments)
+
+        return instance
+
+    async def call_async(self, interpreter, arguments: list[any]) -> any:
+        # The initializer runs like any other function called from async code, so it can yield and await natives
+        instance = LoxInstance(self)
+
+        initializer = self.find_method("init")
+        if initializer is not None:
+            await initializer.bind(instance).call_async(interpreter, arguments)
+
+        return instance
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,71 @@
+from dataclasses import *
+
+from AST.Stmt import FunctionStmt
+from Environment import Environment
+from LoxCallable import LoxCallable
+from Return import Return
+from Token import Token
+from TokenType import TokenType
+
+THIS = Token(TokenType.THIS, "this", None, 0)
+
+
+@dataclass
+class LoxFunction(LoxCallable):
+    declaration: FunctionStmt
+    closure: Environment
+    is_initializer: bool = False
+
+    def arity(self) -> int:
+        return len(self.declaration.params)
+
+    def bind(self, instance) -> "LoxFunction":
+        environment = Environment(self.closure)
+        environment.define("this", instance)
+
+        return LoxFunction(self.declaration, environment, self.is_initializer)
+
+    def call(self, interpreter, arguments: list[any]) -> any:
+        return self.run(interpreter, Environment(self.closure), arguments)
+
+    def call_method(self, interpreter, instance, arguments: list[any]) -> any:
+        # Calling a method straight off an instance puts this in with the parameters, rather than binding a new
+        # function with an environment of its own for it
+        return self.run(interpreter, Environment(self.closure, {"this": instance}), arguments)
+
+    def run(self, interpreter, environment: Environment, arguments: list[any]) -> any:
+        for param, argument in zip(self.declaration.params, arguments):
+            environment.define(param.lexeme, argument)
+
+        # The body ends early by returning. A break outside of any loop is a syntax error, but one that was reported
+        # is still run, and ends the body with nothing to return.
+        interpreter.depth += 1
+        try:
+            completion = interpreter.execute_block(self.declaration.body, environment)
+        finally:
+            interpreter.depth -= 1
+
+        if self.is_initializer:
+            return environment.get(THIS)
+
+        return completion.value if type(completion) is Return else None
+
+    async def call_async(self, interpreter, arguments: list[any]) -> any:
+        environment = Environment(self.closure)
+
+        for param, argument in zip(self.declaration.params, arguments):
+            environment.define(param.lexeme, argument)
+
+        interpreter.depth += 1
+        try:
+            completion = await interpreter.execute_block_async(self.declaration.body, environment)
+        finally:
+            interpreter.depth -= 1
+
+        if self.is_initializer:
+            return environment.get(THIS)
+
+        return completion.value if type(completion) is Return else None
+
+    def __str__(self) -> str:
+        return f"<fn {self.declaration.name.lexeme}>"
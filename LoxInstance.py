@@ -0,0 +1,13 @@
+class LoxInstance:
+    """
+    An object, with its fields stored in a list laid out by its shape rather than in a dict of its own.
+    """
+
+    __slots__ = ("shape", "fields")
+
+    def __init__(self, klass) -> None:
+        self.shape = klass.shape
+        self.fields: list[any] = []
+
+    def __str__(self) -> str:
+        return f"{self.shape.klass.name} instance"
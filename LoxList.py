@@ -0,0 +1,11 @@
+from dataclasses import *
+
+from Stringify import stringify
+
+
+@dataclass
+class LoxList:
+    elements: list[any] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return "[" + ", ".join(stringify(element) for element in self.elements) + "]"
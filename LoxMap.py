@@ -0,0 +1,44 @@
+from dataclasses import *
+
+from LoxList import LoxList
+from Stringify import stringify
+
+
+@dataclass
+class LoxMap:
+    """
+    A hash map from Lox values to Lox values. True and 1 are equal as Python dict keys, so bools are stored wrapped in
+    a tuple to keep them apart from numbers. Lists and maps compare by their contents, so they can't be keys.
+    """
+
+    entries: dict[any, any] = field(default_factory=dict)
+
+    @staticmethod
+    def key(value: any) -> any:
+        """
+        :return: the dict key a Lox value is stored under
+        :raises TypeError: if the value can't be a key
+        """
+
+        if type(value) is bool:
+            return bool, value
+
+        if isinstance(value, (LoxList, LoxMap)):
+            raise TypeError("Lists and maps can't be map keys.")
+
+        return value
+
+    @staticmethod
+    def value(key: any) -> any:
+        """
+        :return: the Lox value a dict key was made from
+        """
+
+        return key[1] if type(key) is tuple else key
+
+    def keys(self) -> list[any]:
+        return [self.value(key) for key in self.entries]
+
+    def __str__(self) -> str:
+        entries = (f"{stringify(self.value(key))}: {stringify(value)}" for key, value in self.entries.items())
+        return "{" + ", ".join(entries) + "}"
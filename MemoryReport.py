@@ -0,0 +1,219 @@
+import gc
+import os
+import sys
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import *
+from typing import Iterator
+
+from AST.Stmt import Stmt
+from Environment import Cell, Environment
+from LoxClass import LoxClass
+from LoxFunction import LoxFunction
+from LoxInstance import LoxInstance
+from LoxList import LoxList
+from LoxMap import LoxMap
+from NativeFunction import NativeFunction
+from Optimizer import walk
+from Token import Token
+
+
+def size_of(value: any) -> int:
+    """
+    An estimate of the bytes an object takes up by itself, counting its attribute dict but not what it refers to
+    """
+
+    size = sys.getsizeof(value)
+
+    if hasattr(value, "__dict__"):
+        size += sys.getsizeof(value.__dict__)
+
+    return size
+
+
+def format_bytes(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(size) < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+
+        size /= 1024
+
+    return f"{size:.1f} GiB"
+
+
+@dataclass
+class Tally:
+    count: int = 0
+    size: int = 0
+
+    def add(self, size: int) -> None:
+        self.count += 1
+        self.size += size
+
+
+@dataclass
+class MemoryReport:
+    """
+    Accounts for the memory a run uses. tracemalloc gives the peak of each phase of main.run, and the live objects left
+    at the end are walked to estimate how much of it is source text, tokens, AST nodes, environments and values.
+    """
+
+    # the current and peak bytes traced during each phase, kept as the largest seen if a phase runs more than once
+    phases: dict[str, tuple[int, int]] = field(default_factory=dict)
+    sources: list[str] = field(default_factory=list)
+    tokens: list[Token] = field(default_factory=list)
+    statements: list[Stmt] = field(default_factory=list)
+
+    @staticmethod
+    def start() -> None:
+        # One frame is enough to see which module made each allocation, and keeps tracing cheap
+        tracemalloc.start(1)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        if not tracemalloc.is_tracing():
+            yield
+            return
+
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            previous = self.phases.get(name, (0, 0))
+            self.phases[name] = (max(previous[0], current - before), max(previous[1], peak - before))
+
+    def keep(self, source: str, tokens: list[Token], statements: list[Stmt]) -> None:
+        """
+        Holds on to what a run was made from, so it can be accounted for once everything has run
+        """
+
+        if tracemalloc.is_tracing():
+            self.sources.append(source)
+            self.tokens.extend(tokens)
+            self.statements.extend(statements)
+
+    def report(self) -> str:
+        # Snapshot before accounting, so the report's own allocations don't show up in it
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        traced = tracemalloc.get_traced_memory()
+        lines = ["Memory report", "", f"{'Phase':<28}{'retained':>12}{'peak':>12}"]
+
+        for name, (current, peak) in self.phases.items():
+            lines.append(f"{name:<28}{format_bytes(current):>12}{format_bytes(peak):>12}")
+
+        subsystems = {"source text": Tally(), "tokens": Tally()}
+
+        for source in self.sources:
+            subsystems["source text"].add(sys.getsizeof(source))
+
+        for token in self.tokens:
+            # Lexemes are slices of the source, so each token has its own copy
+            subsystems["tokens"].add(size_of(token) + sys.getsizeof(token.lexeme))
+
+        nodes = self.count_nodes()
+        subsystems["AST nodes"] = Tally(
+            sum(tally.count for tally in nodes.values()), sum(tally.size for tally in nodes.values())
+        )
+
+        environments = [value for value in gc.get_objects() if type(value) == Environment]
+        subsystems["environments"] = Tally()
+        for environment in environments:
+            subsystems["environments"].add(size_of(environment) + sys.getsizeof(environment.values))
+
+        values = self.count_values(environments)
+
+        lines += ["", f"{'Subsystem':<28}{'objects':>12}{'bytes':>12}"]
+        for name, tally in subsystems.items():
+            lines.append(f"{name:<28}{tally.count:>12}{format_bytes(tally.size):>12}")
+
+        lines += ["", f"{'AST node class':<28}{'objects':>12}{'bytes':>12}{'per node':>12}"]
+        for name, tally in sorted(nodes.items(), key=lambda item: -item[1].size):
+            lines.append(f"{name:<28}{tally.count:>12}{format_bytes(tally.size):>12}{tally.size / tally.count:>10.0f} B")
+
+        lines += ["", f"{'Runtime value':<28}{'objects':>12}{'bytes':>12}"]
+        for name, tally in sorted(values.items(), key=lambda item: -item[1].size):
+            lines.append(f"{name:<28}{tally.count:>12}{format_bytes(tally.size):>12}")
+
+        if snapshot is not None:
+            current, peak = traced
+            lines += ["", f"Traced: {format_bytes(current)} live, {format_bytes(peak)} peak since the last phase began"]
+            lines += ["", f"{'Allocated by':<28}{'blocks':>12}{'bytes':>12}"]
+
+            for statistic in snapshot.statistics("filename")[:10]:
+                name = os.path.basename(statistic.traceback[0].filename)
+                lines.append(f"{name:<28}{statistic.count:>12}{format_bytes(statistic.size):>12}")
+
+        return "\n".join(lines)
+
+    def count_nodes(self) -> dict[str, Tally]:
+        nodes: dict[str, Tally] = {}
+        # The parser shares identical expressions between their uses, so each node is only counted once
+        seen: set[int] = set()
+
+        for statement in self.statements:
+            for node in walk(statement):
+                if id(node) in seen:
+                    continue
+
+                seen.add(id(node))
+                size = size_of(node)
+
+                for value in vars(node).values():
+                    if type(value) == list:
+                        size += sys.getsizeof(value)
+
+                nodes.setdefault(type(node).__name__, Tally()).add(size)
+
+        return nodes
+
+    @staticmethod
+    def count_values(environments: list[Environment]) -> dict[str, Tally]:
+        """
+        Tallies every value reachable from the live environments, counting shared values once
+        """
+
+        values: dict[str, Tally] = {}
+        seen: set[int] = set()
+        pending = [value for environment in environments for value in environment.values.values()]
+
+        while pending:
+            value = pending.pop()
+
+            # Natives are shared by every interpreter, and bools and nil are singletons
+            if value is None or type(value) == bool or isinstance(value, NativeFunction) or id(value) in seen:
+                continue
+
+            seen.add(id(value))
+
+            if type(value) == str:
+                name, size = "strings", sys.getsizeof(value)
+            elif type(value) == float:
+                name, size = "numbers", sys.getsizeof(value)
+            elif type(value) == LoxList:
+                name, size = "lists", size_of(value) + sys.getsizeof(value.elements)
+                pending.extend(value.elements)
+            elif type(value) == LoxMap:
+                name, size = "maps", size_of(value) + sys.getsizeof(value.entries)
+                pending.extend(LoxMap.value(key) for key in value.entries)
+                pending.extend(value.entries.values())
+            elif type(value) == LoxInstance:
+                name, size = "instances", size_of(value) + sys.getsizeof(value.fields)
+                pending.extend(value.fields)
+            elif type(value) == Cell:
+                name, size = "captured variables", size_of(value)
+                pending.append(value.value)
+            elif type(value) == LoxFunction:
+                # The declaration is counted with the AST and the closure with the environments
+                name, size = "functions", size_of(value)
+            elif type(value) == LoxClass:
+                name, size = "classes", size_of(value) + sys.getsizeof(value.methods)
+                pending.extend(value.methods.values())
+            else:
+                name, size = type(value).__name__, size_of(value)
+
+            values.setdefault(name, Tally()).add(size)
+
+        return values
@@ -0,0 +1,124 @@
+import os
+import threading
+from dataclasses import *
+
+from Environment import Environment
+from Error import error, parse_error
+from RuntimeError import LoxRuntimeError
+from Token import Token
+
+# The globals of every module run in this process, keyed by resolved path and modification time so an edited file is
+# loaded afresh while unchanged ones are shared by every script that imports them.
+MODULES: dict[tuple[str, float], Environment] = {}
+
+# Modules part way through running, to catch modules that need each other's definitions to load
+LOADING: set[tuple[str, float]] = set()
+
+# Held while a module loads, so threads importing the same module run it once between them. Loading a module can
+# look up names that load other modules on the same thread, so the lock is reentrant.
+LOCK = threading.RLock()
+
+
+@dataclass
+class Module:
+    """
+    A module named by an import statement. It isn't run until a name that isn't defined anywhere else is looked up.
+    """
+
+    path: str
+    mtime: float
+    # the path in the import statement, for error messages
+    token: Token
+    exports: Environment | None = None
+    # the interpreter that ran the import statement, whose limits and output the module runs under
+    importer: any = field(default=None, repr=False)
+
+    def load(self) -> Environment:
+        if self.exports is None:
+            self.exports = load_module(self.path, self.mtime, self.token, self.importer)
+
+        return self.exports
+
+    def __reduce__(self):
+        # The importer is only needed while its script runs, and holds things like its output that can't be pickled
+        return Module, (self.path, self.mtime, self.token, self.exports)
+
+
+def find_module(importer, token: Token) -> Module:
+    """
+    Resolves an imported path without loading the module
+    :param importer: the interpreter running the import, whose directory relative paths are resolved against
+    :param token: the string token naming the module
+    :return: the module
+    """
+
+    path = os.path.realpath(os.path.join(importer.directory, token.literal))
+
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        raise LoxRuntimeError(token, f"Can't find module '{token.literal}'.")
+
+    return Module(path, mtime, token, importer=importer)
+
+
+def load_module(path: str, mtime: float, token: Token, importer=None) -> Environment:
+    with LOCK:
+        return load_module_locked(path, mtime, token, importer)
+
+
+def load_module_locked(path: str, mtime: float, token: Token, importer=None) -> Environment:
+    key = (path, mtime)
+
+    if key in MODULES:
+        return MODULES[key]
+
+    if key in LOADING:
+        raise LoxRuntimeError(token, f"Circular import of '{token.literal}'.")
+
+    from Incremental import RegionParser, RegionScanner
+    from Interpreter import Interpreter
+
+    try:
+        with open(path, "r") as file:
+            source = file.read()
+    except OSError:
+        raise LoxRuntimeError(token, f"Can't read module '{token.literal}'.")
+
+    scanner = RegionScanner(source, 1)
+    parser = RegionParser(scanner.scan_tokens())
+    statements = parser.parse()
+
+    if scanner.errors or parser.errors:
+        for line, message in scanner.errors:
+            error(line, message)
+
+        for error_token, message in parser.errors:
+            parse_error(error_token, message)
+
+        raise LoxRuntimeError(token, f"Module '{token.literal}' has errors.")
+
+    interpreter = Interpreter(directory=os.path.dirname(path))
+
+    # The module shares the importer's fuel and deadline, so moving work into an import can't get around them
+    if importer is not None:
+        interpreter.output = importer.output
+        interpreter.fuel = importer.fuel
+        interpreter.deadline = importer.deadline
+        interpreter.limited = importer.limited
+
+    LOADING.add(key)
+
+    # Runtime errors, running out of fuel or time included, are left to propagate, so they are reported with the
+    # module's line numbers
+    try:
+        for statement in statements:
+            interpreter.execute(statement)
+    finally:
+        LOADING.discard(key)
+
+        if importer is not None:
+            importer.fuel = interpreter.fuel
+
+    MODULES[key] = interpreter.globals
+    return interpreter.globals
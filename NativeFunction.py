@@ -0,0 +1,52 @@
+from dataclasses import *
+from typing import Awaitable, Callable
+
+from LoxCallable import LoxCallable
+
+
+class NativeError(Exception):
+    """
+    Raised by a native function when it is called with bad arguments.
+    The interpreter turns it into a LoxRuntimeError at the call site, since natives have no token to report.
+    """
+
+    pass
+
+
+@dataclass
+class NativeFunction(LoxCallable):
+    name: str
+    parameters: int
+    function: Callable[..., any]
+
+    def arity(self) -> int:
+        return self.parameters
+
+    def call(self, interpreter, arguments: list[any]) -> any:
+        return self.function(*arguments)
+
+    def __str__(self) -> str:
+        return f"<native fn {self.name}>"
+
+    def __reduce__(self):
+        # The wrapped callables may be closures, so natives are pickled by name and re-bound on load
+        return find_native, (self.name,)
+
+
+@dataclass
+class AsyncNativeFunction(NativeFunction):
+    """
+    A native that does I/O. Async execution awaits the coroutine so other programs can run in the meantime,
+    while synchronous execution falls back to the blocking function.
+    """
+
+    coroutine: Callable[..., Awaitable[any]] = None
+
+    async def call_async(self, interpreter, arguments: list[any]) -> any:
+        return await self.coroutine(*arguments)
+
+
+def find_native(name: str) -> NativeFunction:
+    from Builtins import NATIVES
+
+    return NATIVES[name]
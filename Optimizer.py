@@ -0,0 +1,504 @@
+from dataclasses import *
+from typing import Iterator
+
+from AST.Expr import *
+from AST.Stmt import *
+from Token import Token
+from TokenType import TokenType
+
+
+class Optimizer:
+    """
+    Rewrites a parsed program to do less work without changing what it prints or which runtime errors it raises.
+
+    Common subexpression elimination: a pure expression (built from literals, variables and operators) that is
+    computed again in the same block, with none of its variables assigned and no call made in between, reuses the
+    value from the first time. The first occurrence stores its value in a temporary declared at the top of the block,
+    which the later ones read. The first occurrence would have raised any error the later ones could.
+
+    Dead store elimination: inside blocks and function bodies, an assignment or declaration of a local variable whose
+    value is never read is removed. Its value is still evaluated if that could raise an error or call something.
+    """
+
+    def __init__(self) -> None:
+        self.temporaries = 0
+
+    def optimize(self, statements: list[Stmt]) -> list[Stmt]:
+        # Occurrences of an expression are told apart by identity, so ones the parser shared are copied first
+        statements = unshare(statements)
+
+        # Globals can be read by anything that runs later, so only local stores are ever treated as dead
+        return self.optimize_block(statements, None)
+
+    def optimize_block(self, statements: list[Stmt], parameters: list[Token] | None) -> list[Stmt]:
+        """
+        :param statements: the statements of a block, function body or the whole program
+        :param parameters: the function's parameters for a function body, an empty list for a block and None at the
+                           top level, where variables are global
+        :return: the optimized statements
+        """
+
+        temporaries: list[Token] = []
+        statements = self.reuse(statements, temporaries)
+
+        # Temporaries are only known once the whole block has been rewritten
+        statements[:0] = [VariableStmt(temporary, LiteralExpr(None)) for temporary in temporaries]
+
+        if parameters is None:
+            return statements
+
+        return self.remove_dead_stores(statements, {parameter.lexeme for parameter in parameters})
+
+    #
+    # Common subexpression elimination
+    #
+
+    def reuse(self, statements: list[Stmt], temporaries: list[Token]) -> list[Stmt]:
+        scan = AvailabilityScan()
+
+        for statement in statements:
+            scan.statement(statement)
+
+        rewrite = Rewrite(self, scan, temporaries)
+        return [rewrite.statement(statement) for statement in statements]
+
+    def reuse_in(self, statement: Stmt, temporaries: list[Token]) -> Stmt:
+        """
+        Optimizes a statement nested in a statement list, like the body of a while loop, with its own window of
+        available expressions but sharing the temporaries of the enclosing block.
+        """
+
+        if isinstance(statement, BlockStmt):
+            return BlockStmt(self.optimize_block(statement.statements, []))
+
+        return self.reuse([statement], temporaries)[0]
+
+    def reuse_in_expression(self, expr: Expr, temporaries: list[Token]) -> Expr:
+        return self.reuse([ExpressionStmt(expr)], temporaries)[0].expression
+
+    def temporary(self, line: int) -> Token:
+        # Scripts can't name a variable starting with @, so temporaries can't clash with anything
+        self.temporaries += 1
+        return Token(TokenType.IDENTIFIER, f"@{self.temporaries}", None, line)
+
+    #
+    # Dead store elimination
+    #
+
+    def remove_dead_stores(self, statements: list[Stmt], parameters: set[str]) -> list[Stmt]:
+        # Before a variable is declared in the block, its name refers to a variable outside of it
+        local_from: dict[str, int] = {name: -1 for name in parameters}
+        for index, statement in enumerate(statements):
+            if isinstance(statement, VariableStmt):
+                local_from.setdefault(statement.name.lexeme, index)
+
+        # A function declared in the block could read any variable it mentions whenever it is called
+        captured = {name for statement in statements for function in walk(statement)
+                    if isinstance(function, FunctionStmt) for name in mentioned(function)}
+
+        def declared(index: int) -> set[str]:
+            return {name for name, start in local_from.items() if start < index}
+
+        live: set[str] = set()
+        mentioned_later: set[str] = set()
+        optimized: list[Stmt] = []
+
+        for index in range(len(statements) - 1, -1, -1):
+            statement = statements[index]
+            replacement = [statement]
+
+            if isinstance(statement, VariableStmt):
+                name = statement.name.lexeme
+
+                if name not in live and name not in captured:
+                    replacement = self.side_effects(statement.initializer, declared(index))
+
+                    # Later assignments still need the variable to exist, just not this value
+                    if name in mentioned_later:
+                        replacement.append(VariableStmt(statement.name, LiteralExpr(None)))
+
+                live.discard(name)
+                live |= read(statement.initializer)
+
+            elif isinstance(statement, ExpressionStmt) and isinstance(statement.expression, AssignExpr):
+                name = statement.expression.name.lexeme
+                value = statement.expression.value
+
+                if local_from.get(name, index) < index and name not in live and name not in captured:
+                    replacement = self.side_effects(value, declared(index))
+
+                live.discard(name)
+                live |= read(value)
+
+            else:
+                live |= mentioned(statement)
+
+            mentioned_later |= mentioned(statement)
+            optimized[:0] = replacement
+
+        return optimized
+
+    @staticmethod
+    def side_effects(expr: Expr, declared: set[str]) -> list[Stmt]:
+        """
+        The statements needed to keep whatever evaluating an unused expression could do
+        :param expr: an expression whose value isn't needed
+        :param declared: the local variables already declared, which can be read without raising an error
+        :return: nothing if evaluating it can't raise an error or call anything, otherwise the expression on its own
+        """
+
+        if is_harmless(expr, declared):
+            return []
+
+        return [ExpressionStmt(expr)]
+
+
+class AvailabilityScan:
+    """
+    Walks statements in evaluation order, tracking which pure expressions have already been computed and are still
+    valid, to find the occurrences that can reuse an earlier one.
+    """
+
+    def __init__(self) -> None:
+        # the occurrence that first computed each available expression, by structural key
+        self.available: dict[tuple, Expr] = {}
+        # occurrences that can reuse an earlier one, and the earlier occurrences that will be reused
+        self.reused: dict[Expr, Expr] = {}
+        self.sources: set[Expr] = set()
+
+    def statement(self, statement: Stmt) -> None:
+        if isinstance(statement, (ExpressionStmt, PrintStmt)):
+            self.expression(statement.expression)
+
+        elif isinstance(statement, VariableStmt):
+            self.expression(statement.initializer)
+            self.invalidate(statement.name.lexeme)
+
+        elif isinstance(statement, ReturnStmt) and statement.value is not None:
+            self.expression(statement.value)
+
+        elif isinstance(statement, IfStmt):
+            self.expression(statement.condition)
+
+            # Either branch runs straight after the condition, so can use anything available before it
+            available = self.available
+            for branch in (statement.then_branch, statement.else_branch):
+                if branch is not None and not isinstance(branch, BlockStmt):
+                    self.available = dict(available)
+                    self.statement(branch)
+
+            self.available = {}
+
+        else:
+            # Loops, blocks and declarations get their own window, and anything could change inside them
+            self.available.clear()
+
+    def expression(self, expr: Expr, conditional: bool = False) -> None:
+        # Deep expressions are left alone, so scanning them can't recurse too far
+        if expr.deep:
+            self.available.clear()
+            return
+
+        key = expression_key(expr)
+        candidate = key is not None and isinstance(expr, (BinaryExpr, UnaryExpr, LogicalExpr))
+
+        if candidate and key in self.available:
+            self.reused[expr] = self.available[key]
+            self.sources.add(self.available[key])
+            return
+
+        if isinstance(expr, GroupingExpr):
+            self.expression(expr.expression, conditional)
+
+        elif isinstance(expr, UnaryExpr):
+            self.expression(expr.right, conditional)
+
+        elif isinstance(expr, BinaryExpr):
+            self.expression(expr.left, conditional)
+            self.expression(expr.right, conditional)
+
+        elif isinstance(expr, LogicalExpr):
+            self.expression(expr.left, conditional)
+            # The right operand might not be evaluated, so nothing in it can be relied on afterwards
+            self.expression(expr.right, True)
+
+        elif isinstance(expr, AssignExpr):
+            self.expression(expr.value, conditional)
+            self.invalidate(expr.name.lexeme)
+
+        elif isinstance(expr, CallExpr):
+            self.expression(expr.callee, conditional)
+            for argument in expr.arguments:
+                self.expression(argument, conditional)
+
+            # The callee could assign any variable it can see
+            self.available.clear()
+
+        elif isinstance(expr, GetExpr):
+            self.expression(expr.object, conditional)
+
+        elif isinstance(expr, SetExpr):
+            self.expression(expr.object, conditional)
+            self.expression(expr.value, conditional)
+
+        elif isinstance(expr, IndexExpr):
+            self.expression(expr.object, conditional)
+            self.expression(expr.index, conditional)
+
+        elif isinstance(expr, SetIndexExpr):
+            self.expression(expr.object, conditional)
+            self.expression(expr.index, conditional)
+            self.expression(expr.value, conditional)
+
+        elif isinstance(expr, ListExpr):
+            for element in expr.elements:
+                self.expression(element, conditional)
+
+        if candidate and not conditional:
+            self.available[key] = expr
+
+    def invalidate(self, name: str) -> None:
+        for key in [key for key in self.available if name in key_variables(key)]:
+            del self.available[key]
+
+
+@dataclass
+class Rewrite:
+    optimizer: Optimizer
+    scan: AvailabilityScan
+    temporaries: list[Token]
+    names: dict[Expr, Token] = field(default_factory=dict)
+
+    def statement(self, statement: Stmt) -> Stmt:
+        if isinstance(statement, ExpressionStmt):
+            return ExpressionStmt(self.expression(statement.expression))
+
+        if isinstance(statement, PrintStmt):
+            return PrintStmt(self.expression(statement.expression))
+
+        if isinstance(statement, VariableStmt):
+            return VariableStmt(statement.name, self.expression(statement.initializer))
+
+        if isinstance(statement, ReturnStmt):
+            return ReturnStmt(statement.keyword, None if statement.value is None else self.expression(statement.value))
+
+        if isinstance(statement, IfStmt):
+            return IfStmt(
+                self.expression(statement.condition),
+                self.branch(statement.then_branch),
+                None if statement.else_branch is None else self.branch(statement.else_branch),
+            )
+
+        if isinstance(statement, WhileStmt):
+            return WhileStmt(
+                self.optimizer.reuse_in_expression(statement.condition, self.temporaries),
+                self.optimizer.reuse_in(statement.body, self.temporaries),
+            )
+
+        if isinstance(statement, ForInStmt):
+            return ForInStmt(
+                statement.name,
+                self.optimizer.reuse_in_expression(statement.iterable, self.temporaries),
+                self.optimizer.reuse_in(statement.body, self.temporaries),
+            )
+
+        if isinstance(statement, BlockStmt):
+            return BlockStmt(self.optimizer.optimize_block(statement.statements, []))
+
+        if isinstance(statement, FunctionStmt):
+            return self.function(statement)
+
+        if isinstance(statement, ClassStmt):
+            return ClassStmt(statement.name, statement.superclass, [self.function(method) for method in statement.methods])
+
+        return statement
+
+    def function(self, function: FunctionStmt) -> FunctionStmt:
+        return FunctionStmt(function.name, function.params, self.optimizer.optimize_block(function.body, function.params))
+
+    def branch(self, statement: Stmt) -> Stmt:
+        if isinstance(statement, BlockStmt):
+            return BlockStmt(self.optimizer.optimize_block(statement.statements, []))
+
+        return self.statement(statement)
+
+    def expression(self, expr: Expr) -> Expr:
+        if expr in self.scan.reused:
+            return VariableExpr(self.name(self.scan.reused[expr]))
+
+        if expr.deep:
+            return expr
+
+        if isinstance(expr, GroupingExpr):
+            rewritten = GroupingExpr(self.expression(expr.expression))
+        elif isinstance(expr, UnaryExpr):
+            rewritten = UnaryExpr(expr.operator, self.expression(expr.right))
+        elif isinstance(expr, BinaryExpr):
+            rewritten = BinaryExpr(self.expression(expr.left), expr.operator, self.expression(expr.right))
+        elif isinstance(expr, LogicalExpr):
+            rewritten = LogicalExpr(self.expression(expr.left), expr.operator, self.expression(expr.right))
+        elif isinstance(expr, AssignExpr):
+            rewritten = AssignExpr(expr.name, self.expression(expr.value))
+        elif isinstance(expr, CallExpr):
+            rewritten = CallExpr(
+                self.expression(expr.callee), expr.paren, [self.expression(argument) for argument in expr.arguments]
+            )
+        elif isinstance(expr, GetExpr):
+            rewritten = GetExpr(self.expression(expr.object), expr.name)
+        elif isinstance(expr, SetExpr):
+            rewritten = SetExpr(self.expression(expr.object), expr.name, self.expression(expr.value))
+        elif isinstance(expr, IndexExpr):
+            rewritten = IndexExpr(self.expression(expr.object), expr.bracket, self.expression(expr.index))
+        elif isinstance(expr, SetIndexExpr):
+            rewritten = SetIndexExpr(
+                self.expression(expr.object), expr.bracket, self.expression(expr.index), self.expression(expr.value)
+            )
+        elif isinstance(expr, ListExpr):
+            rewritten = ListExpr(expr.bracket, [self.expression(element) for element in expr.elements])
+        else:
+            rewritten = expr
+
+        if expr in self.scan.sources:
+            return AssignExpr(self.name(expr), rewritten)
+
+        return rewritten
+
+    def name(self, source: Expr) -> Token:
+        if source not in self.names:
+            self.names[source] = self.optimizer.temporary(first_token(source).line)
+            self.temporaries.append(self.names[source])
+
+        return self.names[source]
+
+
+def expression_key(expr: Expr) -> tuple | None:
+    """
+    A key that is equal for structurally identical pure expressions
+    :param expr: the expression
+    :return: the key, or None if evaluating the expression could assign or call something
+    """
+
+    if isinstance(expr, LiteralExpr):
+        # Include the type, since 1 == True in Python
+        return "literal", type(expr.value), expr.value
+
+    if isinstance(expr, VariableExpr):
+        return "variable", expr.name.lexeme
+
+    if isinstance(expr, GroupingExpr):
+        return expression_key(expr.expression)
+
+    if isinstance(expr, UnaryExpr):
+        right = expression_key(expr.right)
+        return None if right is None else ("unary", expr.operator.type, right)
+
+    if isinstance(expr, (BinaryExpr, LogicalExpr)):
+        left = expression_key(expr.left)
+        right = expression_key(expr.right)
+        return None if left is None or right is None else (type(expr).__name__, expr.operator.type, left, right)
+
+    return None
+
+
+def key_variables(key: tuple) -> Iterator[str]:
+    if key[0] == "variable":
+        yield key[1]
+    elif key[0] != "literal":
+        for part in key[2:]:
+            yield from key_variables(part)
+
+
+def first_token(node: Expr | Stmt) -> Token | None:
+    for child in walk(node):
+        for value in vars(child).values():
+            if isinstance(value, Token):
+                return value
+
+    return None
+
+
+def is_harmless(expr: Expr, declared: set[str]) -> bool:
+    if isinstance(expr, LiteralExpr):
+        return True
+
+    if isinstance(expr, VariableExpr):
+        return expr.name.lexeme in declared
+
+    if isinstance(expr, GroupingExpr):
+        return is_harmless(expr.expression, declared)
+
+    # ! works on any value, unlike -
+    if isinstance(expr, UnaryExpr) and expr.operator.type == TokenType.BANG:
+        return is_harmless(expr.right, declared)
+
+    if isinstance(expr, LogicalExpr):
+        return is_harmless(expr.left, declared) and is_harmless(expr.right, declared)
+
+    return False
+
+
+def own_tokens(node: Expr | Stmt) -> list[Token]:
+    """
+    :return: the tokens held by the node itself rather than by the nodes below it, in field order
+    """
+
+    return [value for value in vars(node).values() if isinstance(value, Token)]
+
+
+def unshare(node: any, uses: dict[Expr, tuple[int, ...]] | None = None) -> any:
+    """
+    Copies a node, or a list of them, so that no node below it is reached more than once. Deep expressions are left
+    as they are, since the optimizer doesn't look inside them. Each copy of a shared node gets tokens on the lines of
+    the use it was copied for, from the uses of the statement it is in.
+    """
+
+    if isinstance(node, list):
+        return [unshare(child, uses) for child in node]
+
+    if not isinstance(node, (Expr, Stmt)) or (isinstance(node, Expr) and node.deep):
+        return node
+
+    if isinstance(node, Stmt):
+        uses = dict(node.uses or ())
+
+    values = [unshare(getattr(node, child.name), uses) for child in fields(node)]
+
+    if uses and node in uses:
+        lines = iter(uses[node])
+        values = [
+            Token(value.type, value.lexeme, value.literal, next(lines)) if isinstance(value, Token) else value
+            for value in values
+        ]
+
+    copy = type(node)(*values)
+
+    # Deep expressions are still shared, so runtime errors in them are located with the uses
+    if isinstance(node, Stmt):
+        copy.uses = node.uses
+
+    return copy
+
+
+def walk(node: Expr | Stmt) -> Iterator[Expr | Stmt]:
+    """
+    Yields a node and every node below it in source order, without recursing
+    """
+
+    pending = [node]
+
+    while pending:
+        node = pending.pop()
+
+        if isinstance(node, (Expr, Stmt)):
+            yield node
+            pending.extend(getattr(node, child.name) for child in reversed(fields(node)))
+        elif isinstance(node, list):
+            pending.extend(reversed(node))
+
+
+def mentioned(node: Expr | Stmt) -> set[str]:
+    return {child.name.lexeme for child in walk(node) if isinstance(child, (VariableExpr, AssignExpr, VariableStmt))}
+
+
+def read(node: Expr | Stmt) -> set[str]:
+    return {child.name.lexeme for child in walk(node) if isinstance(child, VariableExpr)}
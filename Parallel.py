@@ -0,0 +1,57 @@
+import math
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from LoxCallable import LoxCallable
+from LoxList import LoxList
+from NativeFunction import NativeError
+
+# State of a pool worker process, set up once per worker by init_worker
+worker_function: LoxCallable | None = None
+worker_interpreter = None
+
+
+def parallel_map(function: any, inputs: LoxList) -> LoxList:
+    """
+    Calls function on every element of inputs across a pool of worker processes
+    :param function: a one argument Lox function or native
+    :param inputs: the arguments to call the function with
+    :return: a list of the results, in the same order as inputs
+    """
+
+    if not isinstance(function, LoxCallable):
+        raise NativeError("parallel_map() expects a function argument.")
+
+    if function.arity() != 1:
+        raise NativeError("parallel_map() expects a function taking one argument.")
+
+    if len(inputs.elements) == 0:
+        return LoxList()
+
+    # The function's AST and everything reachable from its closure is pickled once here and unpickled once per
+    # worker, so each task only has to ship its argument and result.
+    try:
+        payload = pickle.dumps(function, pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, RecursionError):
+        raise NativeError("parallel_map() can't send the function's closure to worker processes.")
+
+    workers = min(os.cpu_count() or 1, len(inputs.elements))
+    chunk_size = math.ceil(len(inputs.elements) / (workers * 4))
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(payload,)) as executor:
+        # Runtime errors raised in a worker are pickled back with their token, so they keep their line number
+        return LoxList(list(executor.map(call_in_worker, inputs.elements, chunksize=chunk_size)))
+
+
+def init_worker(payload: bytes) -> None:
+    global worker_function, worker_interpreter
+
+    from Interpreter import Interpreter
+
+    worker_function = pickle.loads(payload)
+    worker_interpreter = Interpreter()
+
+
+def call_in_worker(argument: any) -> any:
+    return worker_function.call(worker_interpreter, [argument])
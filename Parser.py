@@ -2,23 +2,92 @@ import Token
 from AST.Expr import *
 from AST.Stmt import *
 from Error import parse_error
+from Optimizer import own_tokens
+from dataclasses import *
 
 
 from TokenType import *
 
+# How tightly each binary operator binds, loosest first. Unary operators bind tighter than all of them.
+BINARY_PRECEDENCE = {
+    TokenType.EQUAL: 1,
+    TokenType.OR: 2,
+    TokenType.AND: 3,
+    TokenType.BANG_EQUAL: 4,
+    TokenType.EQUAL_EQUAL: 4,
+    TokenType.GREATER: 5,
+    TokenType.GREATER_EQUAL: 5,
+    TokenType.LESS: 5,
+    TokenType.LESS_EQUAL: 5,
+    TokenType.MINUS: 6,
+    TokenType.PLUS: 6,
+    TokenType.SLASH: 7,
+    TokenType.STAR: 7,
+}
+UNARY_PRECEDENCE = 8
+
+# Expressions nested deeper than this are marked so the interpreter evaluates them with an explicit stack
+DEEP_EXPRESSION = 64
+# Brackets and assignments nested deeper than this are left to the explicit-stack parser rather than recursed into
+SHALLOW_NESTING = 16
+
+# A node built by the expression parser, along with how deeply nested it is
+Operand = tuple[Expr, int]
+
+# The kinds of pending entry that stand for an open bracket rather than an operator
+BRACKETS = ("group", "call", "index", "list")
+
 
 class ParseError(Exception):
     pass
 
 
+@dataclass
+class Pending:
+    """
+    An operator or open bracket on the expression parser's stack, waiting for its operands
+    """
+
+    # "unary", "binary", or one of BRACKETS
+    kind: str
+    token: Token
+    precedence: int = 0
+    # for calls and indexing, the callee or the object being indexed, and for calls and lists the arguments or
+    # elements parsed so far
+    callee: Operand | None = None
+    arguments: list[Operand] = field(default_factory=list)
+
+
 class Parser:
     def __init__(
         self,
         tokens: list[Token],
+        lazy: bool = False,
+        share: bool = False,
     ) -> None:
         self.tokens = tokens
+        # Leave the statements of nested blocks as token ranges until they are first run
+        self.lazy = lazy
+        # Structurally identical expressions share one node, looked up by node_key, whatever lines they are on. The
+        # statements that use a shared node on other lines keep those lines in their uses, for runtime errors. It costs
+        # parse time, so it is only turned on where the AST is kept around and its size matters.
+        self.share = share
+        self.nodes: dict[tuple, Expr] = {}
+        # the node built for each shared node in the expression being parsed, which has this use's tokens
+        self.parsed: dict[Expr, Expr] = {}
+        # the line tuples in the statements' uses, kept once each as most are a single line many nodes are used on
+        self.lines: dict[tuple[int, ...], tuple[int, ...]] = {}
         # current = index of current token to be parsed
         self.current = 0
+        # the kinds of the functions and classes enclosing the current token, innermost last, so uses of return,
+        # this and super that can't work are reported
+        self.functions: list[str] = []
+        self.classes: list[str] = []
+        # how many loops enclose the current token within the innermost function, so a break that has no loop to end
+        # is reported
+        self.loops = 0
+        # how many brackets and assignments enclose the current token in the expression being parsed
+        self.nesting = 0
 
     def match(self, *types: TokenType) -> bool:
         """
@@ -26,10 +95,10 @@ class Parser:
         :param types: token types to match against
         :return:
         """
-        for t in types:
-            if self.check(t):
-                self.advance()
-                return True
+
+        if self.peek().type in types and not self.at_end():
+            self.current += 1
+            return True
 
         return False
 
@@ -40,10 +109,8 @@ class Parser:
         :return:
         """
 
-        if self.at_end():
-            return False
-
-        return self.peek().type == token_type
+        # The type is compared first, since it rules out most tokens before the end needs checking
+        return self.peek().type == token_type and not self.at_end()
 
     def advance(self) -> Token:
         """
@@ -72,6 +139,14 @@ class Parser:
 
         return self.tokens[self.current]
 
+    def peek_at(self, offset: int) -> Token:
+        """
+        Returns the token offset places after the current one, or the EOF token if there aren't that many
+        :return:
+        """
+
+        return self.tokens[min(self.current + offset, len(self.tokens) - 1)]
+
     def previous(self) -> Token:
         """
         Returns the previous parsed token
@@ -83,68 +158,106 @@ class Parser:
     def expression(self) -> Expr:
         """
         expression -> assignment ;
+
+        Expressions are parsed by recursive descent, until brackets or assignments nest more than SHALLOW_NESTING deep
+        and the rest of that subexpression is left to deep_expression, so how deeply an expression can nest is only
+        limited by memory.
         :return:
         """
 
-        return self.assignment()
+        self.parsed = {}
+        self.nesting = 0
 
-    def assignment(self):
+        return self.assignment()[0]
+
+    def nested(self) -> Operand:
         """
-        assignment -> IDENTIFIER "=" assignment
-                      | equality ;
+        Parses an expression within brackets or on the right of an assignment
         :return:
         """
 
-        # Adding types here explicitly to make things more obvious
-        expr: Expr = self.equality()
+        if self.nesting >= SHALLOW_NESTING:
+            return self.deep_expression()
 
-        if self.match(TokenType.EQUAL):
-            equals: Token = self.previous()
-            value: Expr = self.assignment()
+        self.nesting += 1
+        expr = self.assignment()
+        self.nesting -= 1
 
-            # The trick is that right before we create the assignment expression node, we look at the left-hand side
-            # expression and figure out what kind of assignment target it is. We convert the r-value expression node
-            # into an l-value representation.
-            # https://craftinginterpreters.com/statements-and-state.html#assignment-syntax
-            if isinstance(expr, VariableExpr):
-                name: Token = expr.name
-                return AssignExpr(name, value)
+        return expr
 
-            self.error(equals, "Invalid assignment target.")
+    def assignment(self) -> Operand:
+        """
+        assignment -> ( call "." )? IDENTIFIER "=" assignment
+                      | call "[" expression "]" "=" assignment
+                      | logic_or ;
+        :return:
+        """
+
+        expr = self.logic_or()
+
+        if self.match(TokenType.EQUAL):
+            equals = self.previous()
+            return self.assigned(equals, expr, self.nested())
 
         return expr
 
-    @staticmethod
-    def error(token: Token, message: str) -> ParseError:
-        parse_error(token, message)
-        return ParseError()
+    def assigned(self, equals: Token, target: Operand, value: Operand) -> Operand:
+        """
+        Builds the node assigning value to target, or reports target if it can't be assigned to
+        :param equals: the "=" token
+        :param target: the expression on the left of the "="
+        :param value: the expression on the right of the "="
+        :return: the assignment, or target if it can't be assigned to
+        """
 
-    def synchronise(self) -> None:
+        # The trick is that right before we create the assignment expression node, we look at the left-hand side
+        # expression and figure out what kind of assignment target it is. We convert the r-value expression node into
+        # an l-value representation.
+        # https://craftinginterpreters.com/statements-and-state.html#assignment-syntax
+        # The target's tokens are taken from this use of it, as the shared node may have others
+        expr = self.parsed.get(target[0], target[0])
+
+        if isinstance(expr, VariableExpr):
+            return self.operand(AssignExpr(expr.name, value[0]), value)
+        if isinstance(expr, GetExpr):
+            return self.operand(SetExpr(expr.object, expr.name, value[0]), target, value)
+        if isinstance(expr, IndexExpr):
+            return self.operand(SetIndexExpr(expr.object, expr.bracket, expr.index, value[0]), target, value)
+
+        self.error(equals, "Invalid assignment target.")
+        return target
+
+    def logic_or(self) -> Operand:
         """
-        Advance until a probable statement boundary is found.
-        This is useful for parse error recovery because we do not want cascading errors.
+        logic_or -> logic_and ( "or" logic_and )* ;
+        :return:
+        """
+
+        expr = self.logic_and()
+
+        while self.match(TokenType.OR):
+            operator = self.previous()
+            right = self.logic_and()
+            expr = self.operand(LogicalExpr(expr[0], operator, right[0]), expr, right)
 
+        return expr
+
+    def logic_and(self) -> Operand:
+        """
+        logic_and -> equality ( "and" equality )* ;
         :return:
         """
 
-        self.advance()
+        expr = self.equality()
 
-        while not self.at_end():
-            if (
-                self.peek().type == TokenType.CLASS
-                or self.peek().type == TokenType.FUN
-                or self.peek().type == TokenType.VAR
-                or self.peek().type == TokenType.FOR
-                or self.peek().type == TokenType.IF
-                or self.peek().type == TokenType.WHILE
-                or self.peek().type == TokenType.PRINT
-                or self.peek().type == TokenType.RETURN
-            ):
-                return
+        while self.match(TokenType.AND):
+            operator = self.previous()
+            right = self.equality()
+            expr = self.operand(LogicalExpr(expr[0], operator, right[0]), expr, right)
 
-            self.advance()
+        return expr
 
-    def equality(self) -> Expr:
+    def equality(self) -> Operand:
         """
         equality -> comparison ( ( "!=" | "==" ) comparison )* ;
         :return:
@@ -152,14 +265,14 @@ class Parser:
 
         expr = self.comparison()
 
-        while self.match(TokenType.BANG_EQUAL, TokenType.BANG_EQUAL):
+        while self.match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
             operator = self.previous()
             right = self.comparison()
-            expr = BinaryExpr(expr, operator, right)
+            expr = self.operand(BinaryExpr(expr[0], operator, right[0]), expr, right)
 
         return expr
 
-    def comparison(self) -> Expr:
+    def comparison(self) -> Operand:
         """
         comparison -> term ( ( ">" | ">=" | "<" | "<=" ) term )* ;
         :return:
@@ -175,11 +288,11 @@ class Parser:
         ):
             operator = self.previous()
             right = self.term()
-            expr = BinaryExpr(expr, operator, right)
+            expr = self.operand(BinaryExpr(expr[0], operator, right[0]), expr, right)
 
         return expr
 
-    def term(self) -> Expr:
+    def term(self) -> Operand:
         """
         term -> factor ( ( "-" | "+" ) factor )* ;
         :return:
@@ -190,11 +303,11 @@ class Parser:
         while self.match(TokenType.MINUS, TokenType.PLUS):
             operator = self.previous()
             right = self.factor()
-            expr = BinaryExpr(expr, operator, right)
+            expr = self.operand(BinaryExpr(expr[0], operator, right[0]), expr, right)
 
         return expr
 
-    def factor(self) -> Expr:
+    def factor(self) -> Operand:
         """
         factor -> unary ( ( "/" | "*" ) unary )* ;
         :return:
@@ -205,49 +318,394 @@ class Parser:
         while self.match(TokenType.SLASH, TokenType.STAR):
             operator = self.previous()
             right = self.unary()
-            expr = BinaryExpr(expr, operator, right)
+            expr = self.operand(BinaryExpr(expr[0], operator, right[0]), expr, right)
 
         return expr
 
-    def unary(self) -> Expr:
+    def unary(self) -> Operand:
         """
         unary -> ( "!" | "-" ) unary
-                 | primary ;
+                 | call ;
+
+        A run of prefix operators is collected in a loop rather than by recursion, since it can be any length.
         :return:
         """
 
-        if self.match(TokenType.BANG, TokenType.MINUS):
-            operator = self.previous()
-            right = self.unary()
-            return UnaryExpr(operator, right)
+        operators = []
+
+        while self.match(TokenType.BANG, TokenType.MINUS):
+            operators.append(self.previous())
+
+        expr = self.call()
+
+        while operators:
+            expr = self.operand(UnaryExpr(operators.pop(), expr[0]), expr)
+
+        return expr
+
+    def call(self) -> Operand:
+        """
+        call -> primary ( "(" arguments? ")" | "." IDENTIFIER | "[" expression "]" )* ;
+        :return:
+        """
+
+        expr = self.primary()
+
+        while True:
+            if self.match(TokenType.LEFT_PAREN):
+                call = Pending("call", self.previous(), callee=expr, arguments=self.arguments(TokenType.RIGHT_PAREN))
+                expr = self.finish_call(call)
+            elif self.match(TokenType.DOT):
+                name = self.consume(TokenType.IDENTIFIER, "Expect property name after '.'.")
+                expr = self.operand(GetExpr(expr[0], name), expr)
+            elif self.match(TokenType.LEFT_BRACKET):
+                bracket = self.previous()
+                index = self.nested()
+                self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after index.")
+                expr = self.operand(IndexExpr(expr[0], bracket, index[0]), expr, index)
+            else:
+                return expr
+
+    def arguments(self, closing: TokenType) -> list[Operand]:
+        """
+        arguments -> expression ( "," expression )* ;
+        :param closing: the type of the token that ends the list, which is left for the caller to consume
+        :return:
+        """
+
+        arguments = []
+
+        if self.check(closing):
+            return arguments
+
+        while True:
+            if closing == TokenType.RIGHT_PAREN and len(arguments) >= 255:
+                # Report but don't throw, the parser is still in a perfectly valid state
+                self.error(self.peek(), "Can't have more than 255 arguments.")
+
+            arguments.append(self.nested())
+
+            if not self.match(TokenType.COMMA):
+                return arguments
+
+    def deep_expression(self) -> Operand:
+        """
+        Parses an expression with the same grammar as expression, but instead of a recursive method per rule, pending
+        operators and open brackets are kept on an explicit stack and reduced by precedence
+        :return:
+        """
+
+        operands: list[Operand] = []
+        pending: list[Pending] = []
+        expect_operand = True
+
+        while True:
+            if expect_operand:
+                if self.match(TokenType.BANG, TokenType.MINUS):
+                    pending.append(Pending("unary", self.previous(), UNARY_PRECEDENCE))
+                elif self.match(TokenType.LEFT_PAREN):
+                    pending.append(Pending("group", self.previous()))
+                elif self.match(TokenType.LEFT_BRACKET):
+                    bracket = Pending("list", self.previous())
+
+                    if self.match(TokenType.RIGHT_BRACKET):
+                        operands.append(self.finish_list(bracket))
+                        expect_operand = False
+                    else:
+                        pending.append(bracket)
+                else:
+                    operands.append(self.primary())
+                    expect_operand = False
+
+            elif self.match(TokenType.LEFT_PAREN):
+                call = Pending("call", self.previous(), callee=operands.pop())
+
+                if self.check(TokenType.RIGHT_PAREN):
+                    operands.append(self.finish_call(call))
+                else:
+                    pending.append(call)
+                    expect_operand = True
+
+            elif self.match(TokenType.DOT):
+                name = self.consume(TokenType.IDENTIFIER, "Expect property name after '.'.")
+                instance = operands.pop()
+                operands.append(self.operand(GetExpr(instance[0], name), instance))
+
+            elif self.match(TokenType.LEFT_BRACKET):
+                pending.append(Pending("index", self.previous(), callee=operands.pop()))
+                expect_operand = True
+
+            elif self.check(TokenType.COMMA) and self.innermost_bracket(pending) in ("call", "list"):
+                self.advance()
+                self.reduce(operands, pending, 0)
+
+                if pending[-1].kind == "call" and len(pending[-1].arguments) >= 254:
+                    # Report but don't throw, the parser is still in a perfectly valid state
+                    self.error(self.peek(), "Can't have more than 255 arguments.")
+
+                pending[-1].arguments.append(operands.pop())
+                expect_operand = True
+
+            elif self.check(TokenType.RIGHT_PAREN) and self.innermost_bracket(pending) in ("group", "call"):
+                self.reduce(operands, pending, 0)
+                bracket = pending.pop()
+
+                if bracket.kind == "group":
+                    self.advance()
+                    inner = operands.pop()
+                    operands.append(self.operand(GroupingExpr(inner[0]), inner))
+                else:
+                    bracket.arguments.append(operands.pop())
+                    operands.append(self.finish_call(bracket))
+
+            elif self.check(TokenType.RIGHT_BRACKET) and self.innermost_bracket(pending) in ("index", "list"):
+                self.reduce(operands, pending, 0)
+                bracket = pending.pop()
+                self.advance()
+
+                if bracket.kind == "index":
+                    index = operands.pop()
+                    expr = IndexExpr(bracket.callee[0], bracket.token, index[0])
+                    operands.append(self.operand(expr, bracket.callee, index))
+                else:
+                    bracket.arguments.append(operands.pop())
+                    operands.append(self.finish_list(bracket))
+
+            elif self.peek().type in BINARY_PRECEDENCE:
+                operator = self.advance()
+                precedence = BINARY_PRECEDENCE[operator.type]
+
+                # Assignment is right associative, so it leaves an assignment waiting to its left on the stack
+                self.reduce(operands, pending, precedence + 1 if operator.type == TokenType.EQUAL else precedence)
+                pending.append(Pending("binary", operator, precedence))
+                expect_operand = True
+
+            else:
+                self.reduce(operands, pending, 0)
+                bracket = self.innermost_bracket(pending)
+
+                if bracket == "group":
+                    raise self.error(self.peek(), "Expected ')' after expression")
+                if bracket == "call":
+                    raise self.error(self.peek(), "Expect ')' after arguments.")
+                if bracket == "index":
+                    raise self.error(self.peek(), "Expect ']' after index.")
+                if bracket == "list":
+                    raise self.error(self.peek(), "Expect ']' after list elements.")
+
+                return operands.pop()
+
+    @staticmethod
+    def innermost_bracket(pending: list[Pending]) -> str | None:
+        for entry in reversed(pending):
+            if entry.kind in BRACKETS:
+                return entry.kind
+
+        return None
+
+    def reduce(self, operands: list[Operand], pending: list[Pending], precedence: int) -> None:
+        """
+        Builds nodes for the pending operators that bind at least as tightly as precedence, stopping at an open bracket
+        :param operands: the operands parsed so far
+        :param pending: the operators and open brackets waiting for operands
+        :param precedence: the loosest binding operator to reduce
+        :return:
+        """
+
+        while pending and pending[-1].kind not in BRACKETS:
+            if pending[-1].precedence < precedence:
+                return
+
+            entry = pending.pop()
+
+            if entry.kind == "unary":
+                right = operands.pop()
+                operands.append(self.operand(UnaryExpr(entry.token, right[0]), right))
+                continue
+
+            right = operands.pop()
+            left = operands.pop()
+
+            if entry.token.type == TokenType.EQUAL:
+                operands.append(self.assigned(entry.token, left, right))
+            elif entry.token.type == TokenType.OR or entry.token.type == TokenType.AND:
+                operands.append(self.operand(LogicalExpr(left[0], entry.token, right[0]), left, right))
+            else:
+                operands.append(self.operand(BinaryExpr(left[0], entry.token, right[0]), left, right))
+
+    def operand(self, expr: Expr, *children: Operand) -> Operand:
+        """
+        Pairs a new node with its depth, marking it for the interpreter if it is nested too deeply to evaluate recursively
+        :param expr: the new node
+        :param children: the operands the node was built from
+        :return: the node, or an identical one parsed earlier, with its depth
+        """
+
+        depth = 1
+
+        for child in children:
+            if child[1] >= depth:
+                depth = child[1] + 1
+
+        if depth > DEEP_EXPRESSION:
+            expr.deep = True
+
+        return self.shared(expr), depth
+
+    def shared(self, expr: Expr) -> Expr:
+        if not self.share:
+            return expr
+
+        node = self.nodes.setdefault(self.node_key(expr), expr)
+        # A node used more than once in one expression keeps the lines of its first use there
+        self.parsed.setdefault(node, expr)
+
+        return node
+
+    def uses(self) -> tuple[tuple[Expr, tuple[int, ...]], ...] | None:
+        """
+        :return: each shared node in the expression just parsed whose tokens are on other lines there than in the node,
+                 paired with the lines they are on, for the uses of the statement it is in
+        """
+
+        uses = []
+
+        for node, expr in self.parsed.items():
+            if expr is node:
+                continue
+
+            lines = tuple(token.line for token in own_tokens(expr))
+
+            if lines != tuple(token.line for token in own_tokens(node)):
+                uses.append((node, self.lines.setdefault(lines, lines)))
+
+        return tuple(uses) or None
+
+    @staticmethod
+    def used(statement: Stmt, uses: tuple[tuple[Expr, tuple[int, ...]], ...] | None) -> Stmt:
+        statement.uses = uses
+        return statement
+
+    @staticmethod
+    def node_key(expr: Expr) -> tuple:
+        """
+        A key that is equal for expressions with the same type, token lexemes, literal values and children, wherever
+        they are in the source. Children are compared by identity, which is enough since they were shared before their
+        parent was built.
+        :return:
+        """
+
+        key = [type(expr)]
+
+        for value in vars(expr).values():
+            if isinstance(value, Token):
+                key.append((value.type, value.lexeme))
+            elif isinstance(value, list):
+                key.append(tuple(value))
+            elif isinstance(value, (Expr, bool)):
+                key.append(value)
+            else:
+                # 1.0 == True, and the interpreter tells them apart, so literals are compared by type as well
+                key.append((type(value), value))
+
+        return tuple(key)
+
+    def finish_call(self, call: Pending) -> Operand:
+        paren = self.consume(TokenType.RIGHT_PAREN, "Expect ')' after arguments.")
+        expr = CallExpr(call.callee[0], paren, [argument[0] for argument in call.arguments])
+
+        return self.operand(expr, call.callee, *call.arguments)
+
+    def finish_list(self, bracket: Pending) -> Operand:
+        expr = ListExpr(bracket.token, [element[0] for element in bracket.arguments])
+
+        return self.operand(expr, *bracket.arguments)
+
+    @staticmethod
+    def error(token: Token, message: str) -> ParseError:
+        parse_error(token, message)
+        return ParseError()
 
-        return self.primary()
+    def synchronise(self) -> None:
+        """
+        Advance until a probable statement boundary is found.
+        This is useful for parse error recovery because we do not want cascading errors.
 
-    def primary(self) -> Expr:
+        :return:
         """
-        primary -> NUMBER | STRING | "true" | "false" | "nil"
-                   | "(" expression ")"
-                   | IDENTIFIER ;
+
+        self.advance()
+
+        while not self.at_end():
+            if (
+                self.peek().type == TokenType.CLASS
+                or self.peek().type == TokenType.FUN
+                or self.peek().type == TokenType.IMPORT
+                or self.peek().type == TokenType.VAR
+                or self.peek().type == TokenType.FOR
+                or self.peek().type == TokenType.IF
+                or self.peek().type == TokenType.WHILE
+                or self.peek().type == TokenType.PRINT
+                or self.peek().type == TokenType.RETURN
+                or self.peek().type == TokenType.BREAK
+            ):
+                return
+
+            self.advance()
+
+    def primary(self) -> Operand:
+        """
+        primary -> NUMBER | STRING | "true" | "false" | "nil" | "this"
+                   | "(" expression ")" | list
+                   | IDENTIFIER | "super" "." IDENTIFIER ;
+        list -> "[" arguments? "]" ;
+
+        deep_expression matches open brackets itself before getting here, to keep them on its stack.
         :return:
         """
 
         if self.match(TokenType.FALSE):
-            return LiteralExpr(False)
+            return self.shared(LiteralExpr(False)), 1
         if self.match(TokenType.TRUE):
-            return LiteralExpr(True)
+            return self.shared(LiteralExpr(True)), 1
         if self.match(TokenType.NIL):
-            return LiteralExpr(None)
+            return self.shared(LiteralExpr(None)), 1
 
         if self.match(TokenType.NUMBER, TokenType.STRING):
-            return LiteralExpr(self.previous().literal)
+            return self.shared(LiteralExpr(self.previous().literal)), 1
+
+        if self.match(TokenType.THIS):
+            keyword = self.previous()
+
+            if not self.classes:
+                self.error(keyword, "Can't use 'this' outside of a class.")
+
+            return self.shared(ThisExpr(keyword)), 1
+
+        if self.match(TokenType.SUPER):
+            keyword = self.previous()
+
+            if not self.classes:
+                self.error(keyword, "Can't use 'super' outside of a class.")
+            elif self.classes[-1] != "subclass":
+                self.error(keyword, "Can't use 'super' in a class with no superclass.")
+
+            self.consume(TokenType.DOT, "Expect '.' after 'super'.")
+            method = self.consume(TokenType.IDENTIFIER, "Expect superclass method name.")
+            return self.shared(SuperExpr(keyword, method)), 1
 
         if self.match(TokenType.IDENTIFIER):
-            return VariableExpr(self.previous())
+            return self.shared(VariableExpr(self.previous())), 1
 
         if self.match(TokenType.LEFT_PAREN):
-            expr = self.expression()
+            inner = self.nested()
             self.consume(TokenType.RIGHT_PAREN, "Expected ')' after expression")
-            return GroupingExpr(expr)
+            return self.operand(GroupingExpr(inner[0]), inner)
+
+        if self.match(TokenType.LEFT_BRACKET):
+            bracket = Pending("list", self.previous(), arguments=self.arguments(TokenType.RIGHT_BRACKET))
+            self.consume(TokenType.RIGHT_BRACKET, "Expect ']' after list elements.")
+            return self.finish_list(bracket)
 
         raise self.error(self.peek(), "Expected expression.")
 
@@ -269,19 +727,183 @@ class Parser:
     def statement(self):
         """
         statement -> exprStmt
+                     | breakStmt
+                     | forStmt
+                     | ifStmt
                      | printStmt
+                     | returnStmt
+                     | whileStmt
                      | block ;
         :return:
         """
 
+        if self.match(TokenType.FOR):
+            return self.for_statement()
+
+        if self.match(TokenType.IF):
+            return self.if_statement()
+
         if self.match(TokenType.PRINT):
             return self.print_statement()
 
+        if self.match(TokenType.RETURN):
+            return self.return_statement()
+
+        if self.match(TokenType.WHILE):
+            return self.while_statement()
+
+        if self.match(TokenType.BREAK):
+            return self.break_statement()
+
         if self.match(TokenType.LEFT_BRACE):
+            if self.lazy:
+                return self.lazy_block()
+
             return BlockStmt(self.block())
 
         return self.expression_statement()
 
+    def for_statement(self):
+        """
+        forStmt -> "for" "(" ( varDecl | exprStmt | ";" ) expression? ";" expression? ")" statement
+                   | "for" "(" "var" IDENTIFIER "in" expression ")" statement ;
+
+        There is no for node in the AST, the loop is desugared into a while loop inside a block. Loops over the elements
+        of a collection have their own node. "in" is only a keyword there, so it can still name variables elsewhere.
+        :return:
+        """
+
+        self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'for'.")
+
+        if self.check(TokenType.VAR) and self.peek_at(1).type == TokenType.IDENTIFIER and self.peek_at(2).lexeme == "in":
+            return self.for_in_statement()
+
+        if self.match(TokenType.SEMICOLON):
+            initializer = None
+        elif self.match(TokenType.VAR):
+            initializer = self.variable_declaration()
+        else:
+            initializer = self.expression_statement()
+
+        condition = LiteralExpr(True)
+        condition_uses = None
+        if not self.check(TokenType.SEMICOLON):
+            condition = self.expression()
+            condition_uses = self.uses()
+
+        self.consume(TokenType.SEMICOLON, "Expect ';' after loop condition.")
+
+        increment = None
+        increment_uses = None
+        if not self.check(TokenType.RIGHT_PAREN):
+            increment = self.expression()
+            increment_uses = self.uses()
+
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
+
+        body = self.loop_body()
+
+        if increment is not None:
+            body = BlockStmt([body, self.used(ExpressionStmt(increment), increment_uses)])
+
+        body = self.used(WhileStmt(condition, body), condition_uses)
+
+        if initializer is not None:
+            body = BlockStmt([initializer, body])
+
+        return body
+
+    def for_in_statement(self):
+        self.advance()
+        name = self.advance()
+        self.advance()
+
+        iterable = self.expression()
+        uses = self.uses()
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
+
+        return self.used(ForInStmt(name, iterable, self.loop_body()), uses)
+
+    def if_statement(self):
+        """
+        ifStmt -> "if" "(" expression ")" statement ( "else" statement )? ;
+        :return:
+        """
+
+        self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
+        condition = self.expression()
+        uses = self.uses()
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after if condition.")
+
+        then_branch = self.statement()
+        else_branch = None
+
+        # The else is bound to the nearest if that precedes it
+        if self.match(TokenType.ELSE):
+            else_branch = self.statement()
+
+        return self.used(IfStmt(condition, then_branch, else_branch), uses)
+
+    def return_statement(self):
+        """
+        returnStmt -> "return" expression? ";" ;
+        :return:
+        """
+
+        keyword = self.previous()
+        value = None
+        uses = None
+
+        if not self.functions:
+            # Report but don't throw, the parser is still in a perfectly valid state
+            self.error(keyword, "Can't return from top-level code.")
+
+        if not self.check(TokenType.SEMICOLON):
+            if self.functions and self.functions[-1] == "initializer":
+                self.error(keyword, "Can't return a value from an initializer.")
+
+            value = self.expression()
+            uses = self.uses()
+
+        self.consume(TokenType.SEMICOLON, "Expect ';' after return value.")
+        return self.used(ReturnStmt(keyword, value), uses)
+
+    def while_statement(self):
+        """
+        whileStmt -> "while" "(" expression ")" statement ;
+        :return:
+        """
+
+        self.consume(TokenType.LEFT_PAREN, "Expect '(' after 'while'.")
+        condition = self.expression()
+        uses = self.uses()
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after condition.")
+        body = self.loop_body()
+
+        return self.used(WhileStmt(condition, body), uses)
+
+    def loop_body(self) -> Stmt:
+        self.loops += 1
+        try:
+            return self.statement()
+        finally:
+            self.loops -= 1
+
+    def break_statement(self):
+        """
+        breakStmt -> "break" ";" ;
+        :return:
+        """
+
+        keyword = self.previous()
+
+        if not self.loops:
+            # Report but don't throw, the parser is still in a perfectly valid state
+            self.error(keyword, "Can't break outside of a loop.")
+
+        self.consume(TokenType.SEMICOLON, "Expect ';' after 'break'.")
+        return BreakStmt(keyword)
+
     def print_statement(self):
         """
         printStmt -> "print" expression ";" ;
@@ -289,8 +911,9 @@ class Parser:
         """
 
         value = self.expression()
+        uses = self.uses()
         self.consume(TokenType.SEMICOLON, "Expect ';' after value.")
-        return PrintStmt(value)
+        return self.used(PrintStmt(value), uses)
 
     def block(self):
         """
@@ -307,6 +930,37 @@ class Parser:
 
         return statements
 
+    def lazy_block(self):
+        """
+        Skips over a block by matching braces, leaving its statements to be parsed when it is first run.
+        A block missing its closing brace is parsed straight away, to report the error.
+        :return:
+        """
+
+        from LazyBlock import LazyBlockStmt
+
+        brace = self.previous()
+        start = self.current
+        end = self.current
+        depth = 1
+
+        while depth:
+            token_type = self.tokens[end].type
+
+            if token_type == TokenType.EOF:
+                return BlockStmt(self.block())
+            elif token_type == TokenType.LEFT_BRACE:
+                depth += 1
+            elif token_type == TokenType.RIGHT_BRACE:
+                depth -= 1
+
+            end += 1
+
+        self.current = end
+        return LazyBlockStmt(
+            brace, self.tokens, start, end - 1, tuple(self.functions), tuple(self.classes), self.loops
+        )
+
     def expression_statement(self):
         """
         exprStmt -> expression ";" ;
@@ -314,17 +968,30 @@ class Parser:
         """
 
         value = self.expression()
+        uses = self.uses()
         self.consume(TokenType.SEMICOLON, "Expect ';' after expression.")
-        return ExpressionStmt(value)
+        return self.used(ExpressionStmt(value), uses)
 
     def declaration(self):
         """
-        declaration -> varDecl
+        declaration -> classDecl
+                       | funDecl
+                       | importDecl
+                       | varDecl
                        | statement ;
         :return:
         """
 
         try:
+            if self.match(TokenType.CLASS):
+                return self.class_declaration()
+
+            if self.match(TokenType.FUN):
+                return self.function("function")
+
+            if self.match(TokenType.IMPORT):
+                return self.import_declaration()
+
             if self.match(TokenType.VAR):
                 return self.variable_declaration()
 
@@ -333,6 +1000,87 @@ class Parser:
             self.synchronise()
             return None
 
+    def class_declaration(self):
+        """
+        classDecl -> "class" IDENTIFIER ( "<" IDENTIFIER )? "{" function* "}" ;
+        :return:
+        """
+
+        name = self.consume(TokenType.IDENTIFIER, "Expect class name.")
+        superclass = None
+
+        if self.match(TokenType.LESS):
+            superclass = VariableExpr(self.consume(TokenType.IDENTIFIER, "Expect superclass name."))
+
+            if superclass.name.lexeme == name.lexeme:
+                self.error(superclass.name, "A class can't inherit from itself.")
+
+        self.consume(TokenType.LEFT_BRACE, "Expect '{' before class body.")
+
+        self.classes.append("class" if superclass is None else "subclass")
+        try:
+            methods = []
+            while not self.check(TokenType.RIGHT_BRACE) and not self.at_end():
+                methods.append(self.function("method"))
+        finally:
+            self.classes.pop()
+
+        self.consume(TokenType.RIGHT_BRACE, "Expect '}' after class body.")
+
+        return ClassStmt(name, superclass, methods)
+
+    def function(self, kind: str):
+        """
+        funDecl -> "fun" function ;
+        function -> IDENTIFIER "(" parameters? ")" block ;
+        parameters -> IDENTIFIER ( "," IDENTIFIER )* ;
+        :param kind: what sort of function is being declared, used in error messages
+        :return:
+        """
+
+        name = self.consume(TokenType.IDENTIFIER, f"Expect {kind} name.")
+        self.consume(TokenType.LEFT_PAREN, f"Expect '(' after {kind} name.")
+
+        params = []
+
+        if not self.check(TokenType.RIGHT_PAREN):
+            while True:
+                if len(params) >= 255:
+                    self.error(self.peek(), "Can't have more than 255 parameters.")
+
+                params.append(self.consume(TokenType.IDENTIFIER, "Expect parameter name."))
+
+                if not self.match(TokenType.COMMA):
+                    break
+
+        self.consume(TokenType.RIGHT_PAREN, "Expect ')' after parameters.")
+        self.consume(TokenType.LEFT_BRACE, f"Expect '{{' before {kind} body.")
+
+        # A loop around the declaration doesn't enclose the body, which only runs when the function is called
+        loops = self.loops
+        self.loops = 0
+
+        self.functions.append("initializer" if kind == "method" and name.lexeme == "init" else kind)
+        try:
+            body = self.block()
+        finally:
+            self.functions.pop()
+            self.loops = loops
+
+        return FunctionStmt(name, params, body)
+
+    def import_declaration(self):
+        """
+        importDecl -> "import" STRING ";" ;
+        :return:
+        """
+
+        keyword = self.previous()
+        path = self.consume(TokenType.STRING, "Expect module path after 'import'.")
+        self.consume(TokenType.SEMICOLON, "Expect ';' after module path.")
+
+        return ImportStmt(keyword, path)
+
     def variable_declaration(self):
         """
         varDecl -> "var" IDENTIFIER ( "=" expression )? ";" ;
@@ -341,13 +1089,15 @@ class Parser:
 
         name = self.consume(TokenType.IDENTIFIER, "Expect variable name.")
         initializer = LiteralExpr(None)
+        uses = None
 
         if self.match(TokenType.EQUAL):
             initializer = self.expression()
+            uses = self.uses()
 
         self.consume(TokenType.SEMICOLON, "Expect ';' variable declaration.")
 
-        return VariableStmt(name, initializer)
+        return self.used(VariableStmt(name, initializer), uses)
 
     def parse(self) -> list[Stmt]:
         """
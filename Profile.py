@@ -0,0 +1,171 @@
+import hashlib
+import json
+from collections import Counter
+from dataclasses import *
+
+from AST.Expr import *
+from AST.Stmt import *
+from Optimizer import walk
+from Specialized import *
+from TokenType import TokenType
+
+#
+# A profile records what running a script saw: the operand types at each operator site. Sites are keyed by source
+# location, as the line, the operator's lexeme and a count telling apart several on the same line, so a profile can be
+# matched up with a fresh parse of the same source. Loading one specializes operator sites up front rather than on
+# their first run.
+#
+
+# Bumped whenever the layout of the profile file changes, so stale profiles are rejected
+PROFILE_VERSION = 2
+
+# Operators that work on any operands, so specialize whatever types they saw
+ANY_OPERANDS = {TokenType.EQUAL_EQUAL: EqualExpr, TokenType.BANG_EQUAL: NotEqualExpr, TokenType.BANG: NotExpr}
+
+
+class ProfileError(Exception):
+    pass
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def site_keys(statements: list[Stmt]) -> dict[BinaryExpr | UnaryExpr, str]:
+    """
+    :return: the key of every operator site in the statements
+    """
+
+    keys = {}
+    seen: Counter[tuple[int, str]] = Counter()
+
+    for node in walk(statements):
+        # Shared expression nodes are reached once for each place they are used, but are one site
+        if node in keys or not isinstance(node, (BinaryExpr, UnaryExpr)):
+            continue
+
+        token = node.operator
+        seen[token.line, token.lexeme] += 1
+        keys[node] = f"{token.line}:{token.lexeme}:{seen[token.line, token.lexeme]}"
+
+    return keys
+
+
+def operand_types(expr: BinaryExpr | UnaryExpr) -> str | None:
+    """
+    :return: what an operator site's class says about the operands it saw, or None if it never ran
+    """
+
+    specialized = type(expr)
+
+    if specialized in NUMBER_OPERATIONS.values() or specialized is NumberNegateExpr:
+        return "number"
+    if specialized is StringConcatExpr:
+        return "string"
+    if specialized in ANY_OPERANDS.values():
+        return "any"
+    if specialized in (BinaryExpr, UnaryExpr):
+        return "mixed"
+
+    return None
+
+
+def specialized_class(expr: BinaryExpr | UnaryExpr, types: str) -> type[Expr] | None:
+    operator = expr.operator.type
+
+    if types == "any":
+        return ANY_OPERANDS.get(operator)
+
+    if isinstance(expr, UnaryExpr):
+        return NumberNegateExpr if types == "number" and operator == TokenType.MINUS else None
+
+    if types == "number":
+        return NUMBER_OPERATIONS.get(operator)
+    if types == "string" and operator == TokenType.PLUS:
+        return StringConcatExpr
+
+    return None
+
+
+@dataclass
+class Profile:
+    source_hash: str
+    # whether the optimizer ran first, which changes the operators there are to key
+    optimized: bool = False
+    # operand types by operator site: "number", "string", "any" for equality and !, or "mixed"
+    sites: dict[str, str] = field(default_factory=dict)
+
+    @staticmethod
+    def record(statements: list[Stmt], source: str, optimized: bool = False) -> "Profile":
+        """
+        :param statements: the statements that were run, with their operators specialized by running them
+        :param source: the source they were parsed from
+        :param optimized: whether the statements were optimized
+        :return: the profile of the run
+        """
+
+        profile = Profile(source_hash(source), optimized)
+
+        for node, key in site_keys(statements).items():
+            types = operand_types(node)
+            if types is not None:
+                profile.sites[key] = types
+
+        return profile
+
+    def save(self, file_path: str) -> None:
+        with open(file_path, "w") as file:
+            json.dump({"version": PROFILE_VERSION, **asdict(self)}, file, indent=1, sort_keys=True)
+
+    @staticmethod
+    def load(file_path: str, source: str, optimized: bool = False) -> "Profile":
+        """
+        Reads a profile back, checking it was recorded for this source
+        :param file_path: a file written by save
+        :param source: the source of the script about to run
+        :param optimized: whether the script about to run was optimized
+        :return: the profile
+        """
+
+        with open(file_path, "r") as file:
+            try:
+                data = json.load(file)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                raise ProfileError(f"'{file_path}' is corrupt.")
+
+        if not isinstance(data, dict) or data.pop("version", None) != PROFILE_VERSION:
+            raise ProfileError(f"'{file_path}' was made by an incompatible version of the interpreter.")
+
+        try:
+            profile = Profile(**data)
+        except TypeError:
+            raise ProfileError(f"'{file_path}' is corrupt.")
+
+        if profile.source_hash != source_hash(source):
+            raise ProfileError(f"'{file_path}' was recorded for a different version of the script.")
+
+        if profile.optimized != optimized:
+            raise ProfileError(f"'{file_path}' was recorded {'with' if profile.optimized else 'without'} -O.")
+
+        return profile
+
+    def apply(self, statements: list[Stmt], specializations: Specializations) -> int:
+        """
+        Specializes every operator site the profile saw get the same types each time, which can still go back to the
+        generic node if it later sees others. Sites already proven by type inference are left alone.
+        :return: how many sites were specialized
+        """
+
+        count = 0
+
+        for node, key in site_keys(statements).items():
+            if type(node) not in (BinaryExpr, UnaryExpr) or key not in self.sites:
+                continue
+
+            specialized = specialized_class(node, self.sites[key])
+
+            if specialized is not None:
+                specializations.preset(node, specialized)
+                count += 1
+
+        return count
@@ -0,0 +1,59 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import *
+
+from AST.Stmt import Stmt
+from Interpreter import Interpreter
+from RuntimeError import LoxRuntimeError
+
+
+@dataclass
+class Run:
+    """
+    The outcome of running a program once
+    """
+
+    interpreter: Interpreter
+    # everything the program printed, including the runtime error it stopped with
+    output: str
+    error: LoxRuntimeError | None
+
+    @property
+    def had_error(self) -> bool:
+        return self.error is not None
+
+
+@dataclass(frozen=True)
+class Program:
+    """
+    A parsed program that can be run by any number of threads at once. Running a program never writes to its nodes,
+    since inline caches belong to the interpreter, so everything a run changes is in the interpreter running it:
+    its environments, its output and the error it stopped with.
+
+    Operator specialization rewrites nodes in place, so runs of a shared program don't specialize.
+    """
+
+    statements: tuple[Stmt, ...]
+    # where the program's imports are resolved from
+    directory: str = ""
+
+    def run(self, fuel: int | None = None, time_limit: float | None = None) -> Run:
+        output = io.StringIO()
+        interpreter = Interpreter(directory=self.directory, fuel=fuel, time_limit=time_limit, output=output)
+        interpreter.interpret(self.statements)
+
+        return Run(interpreter, output.getvalue(), interpreter.error)
+
+    def run_threads(self, count: int, fuel: int | None = None, time_limit: float | None = None) -> list[Run]:
+        """
+        Runs the program on several threads at once, each with its own interpreter
+        :param count: how many threads to run it on
+        :param fuel: how many statements each run may take, or None for no limit
+        :param time_limit: how many seconds each run may take, or None for no limit
+        :return: the runs, in the order of the threads that ran them
+        """
+
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            futures = [executor.submit(self.run, fuel, time_limit) for _ in range(count)]
+
+        return [future.result() for future in futures]
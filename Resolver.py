@@ -0,0 +1,175 @@
+import weakref
+from dataclasses import *
+
+from AST.Expr import *
+from AST.Stmt import *
+
+
+@dataclass(frozen=True)
+class FreeNames:
+    """
+    The variables from outside a function that its body, or any function nested in it, can refer to
+    """
+
+    # names no declaration in the function could be meant by, which must be in scope wherever it is declared
+    required: frozenset[str]
+    # those as well as names used before a declaration of them later in the same scope, which until then refer to an
+    # outer variable if there is one
+    names: frozenset[str]
+
+
+# Free names by function, which can be cached since a body doesn't change once parsed. Each interpreter keeps its own,
+# so threads running a shared program never write to the same one.
+FreeCache = weakref.WeakKeyDictionary[FunctionStmt, FreeNames]
+
+
+def free_names(function: FunctionStmt, cache: FreeCache) -> FreeNames | None:
+    """
+    :return: the function's free names, or None if part of its body hasn't been parsed yet, so they can't be known
+    """
+
+    cached = cache.get(function)
+    if cached is not None:
+        return cached
+
+    resolver = Resolver(cache)
+
+    try:
+        resolver.scope([parameter.lexeme for parameter in function.params], function.body)
+    except Unparsed:
+        return None
+
+    found = FreeNames(frozenset(resolver.required), frozenset(resolver.names))
+    cache[function] = found
+    return found
+
+
+def method_names(klass: ClassStmt, cache: FreeCache) -> FreeNames | None:
+    """
+    :return: the free names of all of a class's methods, which share a closure, or None if they can't be known
+    """
+
+    required: set[str] = set()
+    names: set[str] = set()
+
+    for method in klass.methods:
+        inner = free_names(method, cache)
+        if inner is None:
+            return None
+
+        required |= inner.required
+        names |= inner.names
+
+    # Methods get this from the instance they are bound to, not from where the class is declared
+    return FreeNames(frozenset(required - {"this"}), frozenset(names - {"this"}))
+
+
+class Unparsed(Exception):
+    pass
+
+
+class Resolver:
+    """
+    Walks a function body in order, tracking the names each enclosing scope declares so far and declares at all, to
+    find which references could be to variables outside it. Nested functions are resolved on their own first and
+    their free names treated as references from where they are declared.
+    """
+
+    def __init__(self, cache: FreeCache) -> None:
+        self.cache = cache
+        # for each scope, innermost last, the names declared so far and the names declared anywhere in it
+        self.scopes: list[tuple[set[str], set[str]]] = []
+        self.required: set[str] = set()
+        self.names: set[str] = set()
+
+    def scope(self, defined: list[str], statements: list[Stmt]) -> None:
+        declared = set(defined)
+
+        for statement in statements:
+            if isinstance(statement, (VariableStmt, FunctionStmt, ClassStmt)):
+                declared.add(statement.name.lexeme)
+
+        self.scopes.append((set(defined), declared))
+
+        try:
+            for statement in statements:
+                self.statement(statement)
+        finally:
+            self.scopes.pop()
+
+    def statement(self, statement: Stmt) -> None:
+        if isinstance(statement, BlockStmt):
+            if statement.statements is None:
+                raise Unparsed()
+
+            self.scope([], statement.statements)
+
+        elif isinstance(statement, VariableStmt):
+            self.expression(statement.initializer)
+            self.scopes[-1][0].add(statement.name.lexeme)
+
+        elif isinstance(statement, FunctionStmt):
+            # The function can call itself, and its body only runs once it is called
+            self.scopes[-1][0].add(statement.name.lexeme)
+            self.nested(free_names(statement, self.cache))
+
+        elif isinstance(statement, ClassStmt):
+            if statement.superclass is not None:
+                self.expression(statement.superclass)
+
+            self.scopes[-1][0].add(statement.name.lexeme)
+            self.nested(method_names(statement, self.cache))
+
+        elif isinstance(statement, ForInStmt):
+            self.expression(statement.iterable)
+            self.scope([statement.name.lexeme], [statement.body])
+
+        else:
+            for child in fields(statement):
+                value = getattr(statement, child.name)
+
+                if isinstance(value, Stmt):
+                    self.statement(value)
+                elif isinstance(value, Expr):
+                    self.expression(value)
+
+    def nested(self, inner: FreeNames | None) -> None:
+        if inner is None:
+            raise Unparsed()
+
+        for name in inner.required:
+            # By the time the nested function runs, anything declared around it could be what it means
+            if not any(name in declared for _, declared in self.scopes):
+                self.required.add(name)
+                self.names.add(name)
+
+        for name in inner.names - inner.required:
+            self.reference(name)
+
+    def expression(self, expr: Expr) -> None:
+        pending = [expr]
+
+        while pending:
+            node = pending.pop()
+
+            if isinstance(node, list):
+                pending.extend(node)
+            elif isinstance(node, Expr):
+                if isinstance(node, (VariableExpr, AssignExpr)):
+                    self.reference(node.name.lexeme)
+                elif isinstance(node, ThisExpr):
+                    self.reference("this")
+                elif isinstance(node, SuperExpr):
+                    self.reference("super")
+                    self.reference("this")
+
+                pending.extend(getattr(node, child.name) for child in fields(node))
+
+    def reference(self, name: str) -> None:
+        if any(name in defined for defined, _ in self.scopes):
+            return
+
+        self.names.add(name)
+
+        if not any(name in declared for _, declared in self.scopes):
+            self.required.add(name)
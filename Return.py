@@ -0,0 +1,27 @@
+#
+# Statements that end something early complete with one of these, which execute and execute_block hand back up to the
+# call or loop that acts on it. Every other statement completes with None. Raising an exception instead would make
+# every return pay for creating and unwinding one.
+#
+
+
+class Return:
+    """
+    Completes a return statement, carrying its value back to the function call that is returning.
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: any) -> None:
+        self.value = value
+
+
+class Break:
+    """
+    Completes a break statement, ending the innermost loop it is in. There is nothing to carry, so one instance does.
+    """
+
+    __slots__ = ()
+
+
+BREAK = Break()
@@ -1,11 +1,38 @@
+from typing import TextIO
+
 from Token import Token
 
 
 class LoxRuntimeError(Exception):
+    # set once the statement the error was raised in has moved it onto the line of its token there
+    located = False
+
     def __init__(self, token: Token, message: str) -> None:
         super().__init__(message)
         self.token = token
 
+    def locate(self, uses: tuple | None) -> None:
+        """
+        Moves the error onto the line its token is on in the statement it was raised in. A node the parser shared
+        between uses on different lines holds the tokens of one of them, and the statement the lines of its own.
+        :param uses: the statement's uses
+        :return:
+        """
+
+        self.located = True
+
+        for node, lines in uses or ():
+            tokens = [value for value in vars(node).values() if isinstance(value, Token)]
+
+            for token, line in zip(tokens, lines):
+                if token is self.token:
+                    self.token = Token(token.type, token.lexeme, token.literal, line)
+                    return
+
+    def __reduce__(self):
+        # The default exception pickling only replays self.args, which would lose the token
+        return LoxRuntimeError, (self.token, self.args[0])
+
 
-def runtime_error(error: LoxRuntimeError) -> None:
-    print(f"[line {error.token.line}] {error.args[0]}")
+def runtime_error(error: LoxRuntimeError, file: TextIO | None = None) -> None:
+    print(f"[line {error.token.line}] {error.args[0]}", file=file)
@@ -6,12 +6,14 @@ from TokenType import *
 
 KEYWORDS = {
     "and": TokenType.AND,
+    "break": TokenType.BREAK,
     "class": TokenType.CLASS,
     "else": TokenType.ELSE,
     "false": TokenType.FALSE,
     "for": TokenType.FOR,
     "fun": TokenType.FUN,
     "if": TokenType.IF,
+    "import": TokenType.IMPORT,
     "nil": TokenType.NIL,
     "or": TokenType.OR,
     "print": TokenType.PRINT,
@@ -66,6 +68,10 @@ class Scanner:
             self.add_token(TokenType.LEFT_BRACE)
         elif char == "}":
             self.add_token(TokenType.RIGHT_BRACE)
+        elif char == "[":
+            self.add_token(TokenType.LEFT_BRACKET)
+        elif char == "]":
+            self.add_token(TokenType.RIGHT_BRACKET)
         elif char == ",":
             self.add_token(TokenType.COMMA)
         elif char == ".":
@@ -107,7 +113,10 @@ class Scanner:
         elif IDENT_START.match(char):
             self.identifier()
         else:
-            error(self.line, "Unexpected character.")
+            self.error("Unexpected character.")
+
+    def error(self, message: str) -> None:
+        error(self.line, message)
 
     def advance(self) -> str:
         self.current += 1
@@ -141,7 +150,7 @@ class Scanner:
             self.advance()
 
         if self.at_end():
-            error(self.line, "Unterminated string.")
+            self.error("Unterminated string.")
             return
 
         self.advance()
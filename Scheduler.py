@@ -0,0 +1,53 @@
+import asyncio
+from dataclasses import *
+
+from AST.Stmt import Stmt
+from Interpreter import Interpreter
+from Parser import Parser
+from Scanner import Scanner
+
+
+@dataclass
+class Job:
+    interpreter: Interpreter
+    statements: list[Stmt]
+    had_error: bool = False
+
+
+class Scheduler:
+    """
+    Runs several scripts in one process, each in its own interpreter, taking turns a slice of statements at a time.
+    A script that spins without doing any I/O only holds up the others for one slice, and stops with a runtime error
+    once it uses up its fuel or time limit.
+    """
+
+    def __init__(self, slice_size: int = 1000) -> None:
+        self.slice_size = slice_size
+        self.jobs: list[Job] = []
+
+    def add(self, source: str, fuel: int | None = None, time_limit: float | None = None) -> Job:
+        """
+        Queues a script to run
+        :param source: the script's source code
+        :param fuel: how many statements the script may run, or None for no limit
+        :param time_limit: how many seconds the script may take from when the scheduler starts, or None for no limit
+        :return: the job, whose had_error is set once run returns
+        """
+
+        statements = Parser(Scanner(source, []).scan_tokens()).parse()
+        interpreter = Interpreter(fuel=fuel, time_limit=time_limit, slice_size=self.slice_size)
+
+        job = Job(interpreter, statements)
+        self.jobs.append(job)
+        return job
+
+    def run(self) -> list[Job]:
+        asyncio.run(self.run_async())
+        return self.jobs
+
+    async def run_async(self) -> None:
+        # The event loop runs ready tasks in turn, so jobs that yield at the end of each slice take turns round-robin
+        results = await asyncio.gather(*(job.interpreter.interpret_async(job.statements) for job in self.jobs))
+
+        for job, had_error in zip(self.jobs, results):
+            job.had_error = had_error
@@ -0,0 +1,141 @@
+import io
+import time
+from collections import OrderedDict
+from dataclasses import *
+
+from AST.Stmt import Stmt
+from Error import error, parse_error
+from Incremental import RegionParser, RegionScanner
+from Interpreter import Interpreter
+from MemoryReport import MemoryReport
+from Optimizer import Optimizer
+from RuntimeError import LoxRuntimeError
+
+
+@dataclass
+class Evaluation:
+    """
+    The outcome of evaluating one snippet in a session
+    """
+
+    # everything the snippet printed, including its syntax errors or the runtime error it stopped with, if the
+    # session captures output
+    output: str
+    error: LoxRuntimeError | None
+    # whether the snippet had syntax errors, in which case none of it ran
+    syntax_error: bool
+    # whether the snippet's statements came from the cache, so scanning and parsing were skipped
+    cached: bool
+    # seconds spent scanning, parsing and optimizing the snippet, and running it
+    compile_time: float
+    run_time: float
+
+    @property
+    def had_error(self) -> bool:
+        return self.syntax_error or self.error is not None
+
+    @property
+    def total_time(self) -> float:
+        return self.compile_time + self.run_time
+
+
+@dataclass
+class Session:
+    """
+    Evaluates snippets one after another in one interpreter, so each sees the variables, functions and classes the
+    ones before it defined, like lines typed into the REPL. The statements of each snippet are cached by its source
+    text, so evaluating the same text again goes straight to running them. The least recently used are evicted once
+    there are more than cache_size.
+
+    Operator specialization stays in the cached nodes, and the interpreter keeps the inline caches of their property
+    accesses until the nodes are evicted, so a snippet evaluated again starts from what it learned the time before.
+    """
+
+    interpreter: Interpreter = field(default_factory=Interpreter)
+    optimize: bool = False
+    cache_size: int = 256
+    # collect what each evaluation prints into its output, rather than writing it to the interpreter's output
+    capture: bool = True
+    memory: MemoryReport = field(default_factory=MemoryReport)
+    cache: OrderedDict[str, tuple[Stmt, ...]] = field(default_factory=OrderedDict, init=False)
+    # one optimizer for the session, so temporaries in different snippets' globals get different names
+    optimizer: Optimizer = field(default_factory=Optimizer, init=False)
+
+    def evaluate(self, source: str) -> Evaluation:
+        """
+        Runs a snippet, scanning and parsing it first unless it is cached
+        :param source: the snippet's source code
+        :return: what it printed, whether it failed and how long it took
+        """
+
+        output = self.interpreter.output
+        if self.capture:
+            self.interpreter.output = io.StringIO()
+
+        try:
+            start = time.perf_counter()
+
+            statements = self.cache.get(source)
+            cached = statements is not None
+
+            if cached:
+                self.cache.move_to_end(source)
+            else:
+                statements = self.compile(source)
+
+            compiled = time.perf_counter()
+
+            if statements is None:
+                return Evaluation(self.captured(), None, True, False, compiled - start, 0.0)
+
+            # The error is only set by a run that fails, so one left by an earlier snippet has to be cleared
+            self.interpreter.error = None
+
+            with self.memory.phase("interpret"):
+                self.interpreter.interpret(statements)
+
+            return Evaluation(
+                self.captured(), self.interpreter.error, False, cached, compiled - start, time.perf_counter() - compiled
+            )
+        finally:
+            self.interpreter.output = output
+
+    def compile(self, source: str) -> tuple[Stmt, ...] | None:
+        """
+        Scans, parses and optimizes a snippet, caching its statements if it has no syntax errors
+        :return: the statements, or None if there were syntax errors, which are reported
+        """
+
+        with self.memory.phase("scan"):
+            scanner = RegionScanner(source, 1)
+            tokens = scanner.scan_tokens()
+
+        with self.memory.phase("parse"):
+            parser = RegionParser(tokens, share=True)
+            statements = parser.parse()
+
+        if scanner.errors or parser.errors:
+            for line, message in scanner.errors:
+                error(line, message, self.interpreter.output)
+
+            for token, message in parser.errors:
+                parse_error(token, message, self.interpreter.output)
+
+            return None
+
+        if self.optimize:
+            with self.memory.phase("optimize"):
+                statements = self.optimizer.optimize(statements)
+
+        self.memory.keep(source, tokens, statements)
+
+        statements = tuple(statements)
+
+        self.cache[source] = statements
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return statements
+
+    def captured(self) -> str:
+        return self.interpreter.output.getvalue() if self.capture else ""
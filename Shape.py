@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+# How many shapes an inline cache remembers before its site is treated as megamorphic and stops caching
+POLYMORPHIC_LIMIT = 4
+
+
+class Shape:
+    """
+    The layout shared by every instance of a class that had the same fields added in the same order: which slot of
+    the instance's field list holds each field. Adding a field moves an instance to the next shape along, and each
+    shape remembers the shapes it leads to so instances built the same way end up sharing them.
+
+    Each class has its own empty shape to start from, so a shape also determines where methods are found.
+    """
+
+    __slots__ = ("klass", "slots", "transitions")
+
+    def __init__(self, klass, slots: dict[str, int] | None = None) -> None:
+        self.klass = klass
+        self.slots: dict[str, int] = slots if slots is not None else {}
+        self.transitions: dict[str, Shape] = {}
+
+    def adding(self, name: str) -> Shape:
+        shape = self.transitions.get(name)
+
+        if shape is None:
+            shape = Shape(self.klass, {**self.slots, name: len(self.slots)})
+            self.transitions[name] = shape
+
+        return shape
+
+
+class InlineCache:
+    """
+    Remembers how a property access or assignment site resolved its name for each of the last few shapes seen there.
+    The most recent shape is checked first, so a site that only ever sees one shape costs a single comparison.
+
+    For an access, an entry is the slot holding the field, or the method if the shape has no such field. For an
+    assignment, it is the slot to store into, with the shape the instance moves to if the field is being added.
+    """
+
+    __slots__ = ("shape", "slot", "target", "entries")
+
+    def __init__(self) -> None:
+        self.shape: Shape | None = None
+        self.slot: int | None = None
+        # the method found for an access, or the shape moved to by an assignment adding a field
+        self.target = None
+        self.entries: dict[Shape, tuple[int | None, any]] = {}
+
+    def find(self, shape: Shape) -> bool:
+        """
+        Makes the entry for a shape the most recent one, if there is one
+        :return: whether the shape has an entry
+        """
+
+        entry = self.entries.get(shape)
+        if entry is None:
+            return False
+
+        self.shape = shape
+        self.slot, self.target = entry
+        return True
+
+    def add(self, shape: Shape, slot: int | None, target: any) -> None:
+        if len(self.entries) < POLYMORPHIC_LIMIT:
+            self.entries[shape] = (slot, target)
+
+        self.shape = shape
+        self.slot = slot
+        self.target = target
@@ -0,0 +1,52 @@
+import pickle
+
+from Environment import Environment
+
+# Bumped whenever the pickled form of the AST or runtime values changes, so stale snapshots are rejected
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b"LOXSNAP"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def save_snapshot(environment: Environment, file_path: str) -> None:
+    """
+    Writes a global environment, and everything reachable from it, to a snapshot file
+    :param environment: the globals of an interpreter that has run a prelude
+    :param file_path: where to write the snapshot
+    """
+
+    # Functions are pickled with their declarations and closures, and natives by name so they are re-bound on load
+    try:
+        payload = pickle.dumps((SNAPSHOT_VERSION, environment), pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, RecursionError):
+        raise SnapshotError("Can't snapshot the global environment.")
+
+    with open(file_path, "wb") as file:
+        file.write(SNAPSHOT_MAGIC)
+        file.write(payload)
+
+
+def load_snapshot(file_path: str) -> Environment:
+    """
+    Reads a global environment back from a snapshot file
+    :param file_path: a file written by save_snapshot
+    :return: the environment, ready to be used as an interpreter's globals
+    """
+
+    with open(file_path, "rb") as file:
+        if file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise SnapshotError(f"'{file_path}' is not a snapshot.")
+
+        # A native the snapshot refers to may no longer exist, which shows up as a KeyError
+        try:
+            version, environment = pickle.load(file)
+        except (pickle.UnpicklingError, EOFError, ValueError, KeyError, AttributeError):
+            raise SnapshotError(f"'{file_path}' is corrupt.")
+
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"'{file_path}' was made by an incompatible version of the interpreter.")
+
+    return environment
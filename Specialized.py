@@ -0,0 +1,246 @@
+from collections import Counter
+from dataclasses import *
+
+from AST.Expr import *
+from AST.Stmt import Stmt
+from Optimizer import walk
+from TokenType import TokenType
+
+#
+# Specialized nodes swap their class in for the generic one once a site has seen its operands, so the interpreter
+# dispatches straight to a visitor that only has to check the operand types it expects. A site whose guard fails goes
+# back to the generic class for good, rather than flipping between specializations.
+#
+
+
+class UnspecializedBinaryExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_unspecialized_binary_expr(self)
+
+
+class UnspecializedUnaryExpr(UnaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_unspecialized_unary_expr(self)
+
+
+class NumberAddExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_add_expr(self)
+
+
+class NumberSubtractExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_subtract_expr(self)
+
+
+class NumberMultiplyExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_multiply_expr(self)
+
+
+class NumberDivideExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_divide_expr(self)
+
+
+class NumberGreaterExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_greater_expr(self)
+
+
+class NumberGreaterEqualExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_greater_equal_expr(self)
+
+
+class NumberLessExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_less_expr(self)
+
+
+class NumberLessEqualExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_less_equal_expr(self)
+
+
+class StringConcatExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_string_concat_expr(self)
+
+
+# Equality works on any pair of values, so these never need a guard
+class EqualExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_equal_expr(self)
+
+
+class NotEqualExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_not_equal_expr(self)
+
+
+class NumberNegateExpr(UnaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_number_negate_expr(self)
+
+
+class NotExpr(UnaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_not_expr(self)
+
+
+# Operators whose operand types were proven before the program ran, so they skip the guard altogether
+
+
+class KnownNumberAddExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_add_expr(self)
+
+
+class KnownNumberSubtractExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_subtract_expr(self)
+
+
+class KnownNumberMultiplyExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_multiply_expr(self)
+
+
+class KnownNumberDivideExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_divide_expr(self)
+
+
+class KnownNumberGreaterExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_greater_expr(self)
+
+
+class KnownNumberGreaterEqualExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_greater_equal_expr(self)
+
+
+class KnownNumberLessExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_less_expr(self)
+
+
+class KnownNumberLessEqualExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_less_equal_expr(self)
+
+
+class KnownStringConcatExpr(BinaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_string_concat_expr(self)
+
+
+class KnownNumberNegateExpr(UnaryExpr):
+    def accept(self, visitor: ExprVisitor):
+        return visitor.visit_known_number_negate_expr(self)
+
+
+NUMBER_OPERATIONS = {
+    TokenType.PLUS: NumberAddExpr,
+    TokenType.MINUS: NumberSubtractExpr,
+    TokenType.STAR: NumberMultiplyExpr,
+    TokenType.SLASH: NumberDivideExpr,
+    TokenType.GREATER: NumberGreaterExpr,
+    TokenType.GREATER_EQUAL: NumberGreaterEqualExpr,
+    TokenType.LESS: NumberLessExpr,
+    TokenType.LESS_EQUAL: NumberLessEqualExpr,
+}
+
+KNOWN_NUMBER_OPERATIONS = {
+    TokenType.PLUS: KnownNumberAddExpr,
+    TokenType.MINUS: KnownNumberSubtractExpr,
+    TokenType.STAR: KnownNumberMultiplyExpr,
+    TokenType.SLASH: KnownNumberDivideExpr,
+    TokenType.GREATER: KnownNumberGreaterExpr,
+    TokenType.GREATER_EQUAL: KnownNumberGreaterEqualExpr,
+    TokenType.LESS: KnownNumberLessExpr,
+    TokenType.LESS_EQUAL: KnownNumberLessEqualExpr,
+}
+
+
+@dataclass
+class Specializations:
+    """
+    Counts the sites currently running as each specialized node, and how many had to go back to the generic one.
+    """
+
+    sites: Counter[str] = field(default_factory=Counter)
+    despecialized: int = 0
+
+    def specialize_binary(self, expr: BinaryExpr, left: any, right: any) -> None:
+        operator = expr.operator.type
+
+        if operator == TokenType.EQUAL_EQUAL:
+            specialized = EqualExpr
+        elif operator == TokenType.BANG_EQUAL:
+            specialized = NotEqualExpr
+        elif type(left) == float and type(right) == float:
+            specialized = NUMBER_OPERATIONS.get(operator, BinaryExpr)
+        elif operator == TokenType.PLUS and type(left) == str and type(right) == str:
+            specialized = StringConcatExpr
+        else:
+            specialized = BinaryExpr
+
+        self.specialize(expr, specialized)
+
+    def specialize_unary(self, expr: UnaryExpr, right: any) -> None:
+        if expr.operator.type == TokenType.BANG:
+            specialized = NotExpr
+        elif type(right) == float:
+            specialized = NumberNegateExpr
+        else:
+            specialized = UnaryExpr
+
+        self.specialize(expr, specialized)
+
+    def specialize(self, expr: Expr, specialized: type[Expr]) -> None:
+        # A recursive call inside an operand can have specialized the site already
+        if type(expr) not in (UnspecializedBinaryExpr, UnspecializedUnaryExpr):
+            return
+
+        expr.__class__ = specialized
+
+        if specialized not in (BinaryExpr, UnaryExpr):
+            self.sites[specialized.__name__] += 1
+
+    def preset(self, expr: Expr, specialized: type[Expr]) -> None:
+        """
+        Specializes a site before it has run, from types seen when a profile was recorded
+        """
+
+        expr.__class__ = specialized
+        self.sites[specialized.__name__] += 1
+
+    def despecialize(self, expr: Expr, generic: type[Expr]) -> None:
+        if type(expr) == generic:
+            return
+
+        self.sites[type(expr).__name__] -= 1
+        self.despecialized += 1
+        expr.__class__ = generic
+
+    def __str__(self) -> str:
+        lines = [f"{name}: {count}" for name, count in sorted(self.sites.items()) if count > 0]
+        lines.append(f"Specialized sites: {self.sites.total()}, despecialized: {self.despecialized}")
+
+        return "\n".join(lines)
+
+
+def prepare(statements: list[Stmt]) -> None:
+    """
+    Marks every operator in the statements to specialize itself the first time it runs
+    """
+
+    for statement in statements:
+        for node in walk(statement):
+            if type(node) == BinaryExpr:
+                node.__class__ = UnspecializedBinaryExpr
+            elif type(node) == UnaryExpr:
+                node.__class__ = UnspecializedUnaryExpr
@@ -0,0 +1,13 @@
+def stringify(value: any) -> str:
+    if value is None:
+        return "nil"
+
+    if type(value) == bool:
+        return "true" if value else "false"
+
+    if type(value) == float:
+        # Lox only has doubles, so integral values are shown without the trailing ".0"
+        text = repr(value)
+        return text[:-2] if text.endswith(".0") else text
+
+    return str(value)
@@ -13,3 +13,7 @@ class Token:
 
     def to_string(self) -> str:
         return self.type.name + " " + self.lexeme + " " + str(self.literal)
+
+    def __reduce__(self):
+        # Tokens are the bulk of a pickled AST, so skip the per-instance __dict__
+        return Token, (self.type, self.lexeme, self.literal, self.line)
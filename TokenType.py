@@ -7,6 +7,8 @@ class TokenType(Enum):
     RIGHT_PAREN = auto()
     LEFT_BRACE = auto()
     RIGHT_BRACE = auto()
+    LEFT_BRACKET = auto()
+    RIGHT_BRACKET = auto()
     COMMA = auto()
     DOT = auto()
     MINUS = auto()
@@ -32,12 +34,14 @@ class TokenType(Enum):
 
     # Keywords.
     AND = auto()
+    BREAK = auto()
     CLASS = auto()
     ELSE = auto()
     FALSE = auto()
     FUN = auto()
     FOR = auto()
     IF = auto()
+    IMPORT = auto()
     NIL = auto()
     OR = auto()
     PRINT = auto()
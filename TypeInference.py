@@ -0,0 +1,417 @@
+from dataclasses import *
+
+from AST.Expr import *
+from AST.Stmt import *
+from Optimizer import walk
+from Specialized import *
+from Token import Token
+from TokenType import TokenType
+
+# The types a value can have, as bits so a set of possible types is a bitwise or of them
+NUMBER = 1
+STRING = 2
+BOOL = 4
+NIL = 8
+# functions, classes, instances and anything else a native can return
+OBJECT = 16
+ANY = NUMBER | STRING | BOOL | NIL | OBJECT
+
+ARITHMETIC = {TokenType.MINUS, TokenType.STAR, TokenType.SLASH}
+COMPARISON = {TokenType.GREATER, TokenType.GREATER_EQUAL, TokenType.LESS, TokenType.LESS_EQUAL}
+
+
+def literal_type(value: any) -> int:
+    if value is None:
+        return NIL
+    if type(value) == bool:
+        return BOOL
+    if type(value) == float:
+        return NUMBER
+    if type(value) == str:
+        return STRING
+
+    return OBJECT
+
+
+@dataclass
+class Diagnostic:
+    token: Token
+    message: str
+
+
+class TypeInference:
+    """
+    Works out which types each operator's operands can have, following assignments through the program in the order
+    they run: branches are joined where they meet and loops are repeated until the types at their start stop changing.
+    Variables are tracked by name through the block scopes they are declared in. Anything the pass can't see, like
+    globals from an earlier script or a function's parameters and enclosing variables, can be of any type.
+
+    A call can run any function, so it forgets the types of every variable a function body assigns. Nodes can be
+    shared between several places in the program, so the operand types of a node are the union over everywhere it
+    was reached, and an operator is only proven if it holds for all of them.
+    """
+
+    def __init__(self, closed: bool = True) -> None:
+        """
+        :param closed: whether the program being analyzed is the only code that has run, so that there are no
+                       functions from outside it that a call could run to assign its globals
+        """
+
+        self.closed = closed
+        self.scopes: list[dict[str, int]] = [{}]
+        # how many function bodies the statement being analyzed is in, since only outside of one is scopes[0] global
+        self.function_depth = 0
+        # the union of the types seen for each operand of an operator, call or property access, in source order
+        self.operands: dict[Expr, list[int]] = {}
+        # variables any function body assigns, or None if some of the program hasn't been parsed yet
+        self.clobbered: set[str] | None = set()
+        # for each loop being analyzed, innermost last, the types wherever a break in it left
+        self.breaks: list[list[list[dict[str, int]]]] = []
+
+    def analyze(self, statements: list[Stmt]) -> None:
+        for node in walk(statements):
+            if isinstance(node, FunctionStmt) and self.clobbered is not None:
+                self.clobbered |= {child.name.lexeme for child in walk(node.body) if isinstance(child, AssignExpr)}
+            elif isinstance(node, BlockStmt) and node.statements is None:
+                # A lazy block could assign anything
+                self.clobbered = None
+
+        self.block(statements)
+
+    def specialize(self) -> int:
+        """
+        Swaps the class of every operator whose operand types are proven for one that doesn't check them
+        :return: how many operators were specialized
+        """
+
+        count = 0
+
+        for expr, operands in self.operands.items():
+            if type(expr) == BinaryExpr:
+                left, right = operands
+                operator = expr.operator.type
+
+                if left == NUMBER and right == NUMBER and operator in KNOWN_NUMBER_OPERATIONS:
+                    expr.__class__ = KNOWN_NUMBER_OPERATIONS[operator]
+                elif left == STRING and right == STRING and operator == TokenType.PLUS:
+                    expr.__class__ = KnownStringConcatExpr
+                elif operator == TokenType.EQUAL_EQUAL:
+                    expr.__class__ = EqualExpr
+                elif operator == TokenType.BANG_EQUAL:
+                    expr.__class__ = NotEqualExpr
+                else:
+                    continue
+
+                count += 1
+
+            elif type(expr) == UnaryExpr:
+                if expr.operator.type == TokenType.BANG:
+                    expr.__class__ = NotExpr
+                elif operands[0] == NUMBER:
+                    expr.__class__ = KnownNumberNegateExpr
+                else:
+                    continue
+
+                count += 1
+
+        return count
+
+    def diagnostics(self) -> list[Diagnostic]:
+        """
+        :return: the operations that raise a runtime error whenever they run, in the order they appear
+        """
+
+        found = []
+
+        for expr, operands in self.operands.items():
+            if isinstance(expr, BinaryExpr):
+                left, right = operands
+                operator = expr.operator.type
+
+                if operator == TokenType.PLUS and not (left & right & (NUMBER | STRING)):
+                    found.append(Diagnostic(expr.operator, "Operands are never two numbers or two strings."))
+                elif (operator in ARITHMETIC or operator in COMPARISON) and not (left & right & NUMBER):
+                    found.append(Diagnostic(expr.operator, "Operands are never both numbers."))
+                elif operator == TokenType.SLASH and type(expr.right) == LiteralExpr and expr.right.value == 0.0:
+                    found.append(Diagnostic(expr.operator, "Always divides by zero."))
+
+            elif isinstance(expr, UnaryExpr):
+                if expr.operator.type == TokenType.MINUS and not operands[0] & NUMBER:
+                    found.append(Diagnostic(expr.operator, "Operand is never a number."))
+
+            elif isinstance(expr, CallExpr):
+                if not operands[0] & OBJECT:
+                    found.append(Diagnostic(expr.paren, "Callee is never a function or class."))
+
+            elif isinstance(expr, (GetExpr, SetExpr)):
+                if not operands[0] & OBJECT:
+                    found.append(Diagnostic(expr.name, "Only instances have properties."))
+
+            elif isinstance(expr, IndexExpr):
+                if not operands[0] & (OBJECT | STRING):
+                    found.append(Diagnostic(expr.bracket, "Only lists, maps and strings can be indexed."))
+
+        return sorted(found, key=lambda diagnostic: diagnostic.token.line)
+
+    #
+    # Statements
+    #
+
+    def block(self, statements: list[Stmt]) -> None:
+        for statement in statements:
+            self.statement(statement)
+
+    def statement(self, statement: Stmt) -> None:
+        if isinstance(statement, (ExpressionStmt, PrintStmt)):
+            self.expression(statement.expression)
+
+        elif isinstance(statement, VariableStmt):
+            self.scopes[-1][statement.name.lexeme] = self.expression(statement.initializer)
+
+        elif isinstance(statement, ReturnStmt):
+            if statement.value is not None:
+                self.expression(statement.value)
+
+        elif isinstance(statement, BreakStmt):
+            # A break outside of any loop was reported by the parser, and leaves nothing to join up with
+            if self.breaks:
+                self.breaks[-1].append(self.copy())
+
+        elif isinstance(statement, BlockStmt):
+            if statement.statements is None:
+                self.forget_all()
+                return
+
+            self.scopes.append({})
+            try:
+                self.block(statement.statements)
+            finally:
+                self.scopes.pop()
+
+        elif isinstance(statement, IfStmt):
+            self.expression(statement.condition)
+            before = self.copy()
+
+            self.statement(statement.then_branch)
+            after_then = self.scopes
+            self.scopes = before
+
+            if statement.else_branch is not None:
+                self.statement(statement.else_branch)
+
+            self.join(after_then)
+
+        elif isinstance(statement, WhileStmt):
+            self.loop(statement)
+
+        elif isinstance(statement, ForInStmt):
+            self.expression(statement.iterable)
+            self.loop(statement)
+
+        elif isinstance(statement, FunctionStmt):
+            self.scopes[-1][statement.name.lexeme] = OBJECT
+            self.function(statement)
+
+        elif isinstance(statement, ClassStmt):
+            if statement.superclass is not None:
+                self.expression(statement.superclass)
+
+            self.scopes[-1][statement.name.lexeme] = OBJECT
+
+            for method in statement.methods:
+                self.function(method)
+
+    def loop(self, statement: WhileStmt | ForInStmt) -> None:
+        self.breaks.append([])
+
+        # Each pass starts from the types at the end of the last one joined with those on entry, until nothing widens
+        while True:
+            start = self.copy()
+
+            if isinstance(statement, WhileStmt):
+                self.expression(statement.condition)
+                self.statement(statement.body)
+            else:
+                self.scopes.append({statement.name.lexeme: ANY})
+                try:
+                    self.statement(statement.body)
+                finally:
+                    self.scopes.pop()
+
+            self.join(start)
+
+            if self.scopes == start:
+                break
+
+        # A while loop exits after its condition is false, or from any break
+        if isinstance(statement, WhileStmt):
+            self.expression(statement.condition)
+
+        for left in self.breaks.pop():
+            self.join(left)
+
+    def function(self, function: FunctionStmt) -> None:
+        # The body runs whenever the function is called, when nothing is known about its parameters or surroundings
+        scopes = self.scopes
+        breaks = self.breaks
+        self.scopes = [{parameter.lexeme: ANY for parameter in function.params}]
+        self.breaks = []
+        self.function_depth += 1
+
+        try:
+            self.block(function.body)
+        finally:
+            self.scopes = scopes
+            self.breaks = breaks
+            self.function_depth -= 1
+
+    #
+    # Expressions
+    #
+
+    def expression(self, expr: Expr) -> int:
+        """
+        :return: the types the expression's value can have
+        """
+
+        if expr.deep:
+            return self.unknown(expr)
+
+        if isinstance(expr, LiteralExpr):
+            return literal_type(expr.value)
+
+        if isinstance(expr, GroupingExpr):
+            return self.expression(expr.expression)
+
+        if isinstance(expr, VariableExpr):
+            return self.lookup(expr.name.lexeme)
+
+        if isinstance(expr, AssignExpr):
+            value = self.expression(expr.value)
+            self.assign(expr.name.lexeme, value)
+            return value
+
+        if isinstance(expr, UnaryExpr):
+            self.record(expr, self.expression(expr.right))
+            return BOOL if expr.operator.type == TokenType.BANG else NUMBER
+
+        if isinstance(expr, BinaryExpr):
+            left = self.expression(expr.left)
+            right = self.expression(expr.right)
+            self.record(expr, left, right)
+
+            operator = expr.operator.type
+            if operator in ARITHMETIC:
+                return NUMBER
+            if operator == TokenType.PLUS:
+                return left & right & (NUMBER | STRING) or NUMBER | STRING
+
+            return BOOL
+
+        if isinstance(expr, LogicalExpr):
+            left = self.expression(expr.left)
+            before = self.copy()
+
+            # The right operand may not run, so afterwards variables have the types from either path
+            right = self.expression(expr.right)
+            self.join(before)
+            return left | right
+
+        if isinstance(expr, CallExpr):
+            self.record(expr, self.expression(expr.callee))
+
+            for argument in expr.arguments:
+                self.expression(argument)
+
+            self.forget_clobbered()
+            return ANY
+
+        if isinstance(expr, GetExpr):
+            self.record(expr, self.expression(expr.object))
+            return ANY
+
+        if isinstance(expr, SetExpr):
+            self.record(expr, self.expression(expr.object))
+            return self.expression(expr.value)
+
+        if isinstance(expr, IndexExpr):
+            self.record(expr, self.expression(expr.object))
+            self.expression(expr.index)
+            return ANY
+
+        if isinstance(expr, SetIndexExpr):
+            self.expression(expr.object)
+            self.expression(expr.index)
+            return self.expression(expr.value)
+
+        if isinstance(expr, ListExpr):
+            for element in expr.elements:
+                self.expression(element)
+
+            return OBJECT
+
+        # this and super
+        return OBJECT
+
+    def unknown(self, expr: Expr) -> int:
+        # Deep expressions aren't looked into, beyond forgetting whatever they could change
+        for node in walk(expr):
+            if isinstance(node, AssignExpr):
+                self.assign(node.name.lexeme, ANY)
+            elif isinstance(node, CallExpr):
+                self.forget_clobbered()
+
+        return ANY
+
+    def record(self, expr: Expr, *types: int) -> None:
+        seen = self.operands.get(expr)
+
+        if seen is None:
+            self.operands[expr] = list(types)
+        else:
+            for index, operand in enumerate(types):
+                seen[index] |= operand
+
+    #
+    # Variables
+    #
+
+    def lookup(self, name: str) -> int:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                return scope[name]
+
+        return ANY
+
+    def assign(self, name: str, value: int) -> None:
+        for scope in reversed(self.scopes):
+            if name in scope:
+                scope[name] = value
+                return
+
+    def forget_clobbered(self) -> None:
+        if self.clobbered is None:
+            self.forget_all()
+            return
+
+        for scope in self.scopes:
+            for name in self.clobbered & scope.keys():
+                scope[name] = ANY
+
+        # Functions from earlier scripts close over the globals, though not over anything local to this program
+        if not self.closed and self.function_depth == 0:
+            for name in self.scopes[0]:
+                self.scopes[0][name] = ANY
+
+    def forget_all(self) -> None:
+        for scope in self.scopes:
+            for name in scope:
+                scope[name] = ANY
+
+    def copy(self) -> list[dict[str, int]]:
+        return [dict(scope) for scope in self.scopes]
+
+    def join(self, other: list[dict[str, int]]) -> None:
+        for scope, other_scope in zip(self.scopes, other):
+            for name in scope:
+                scope[name] |= other_scope.get(name, ANY)
@@ -0,0 +1,62 @@
+"""
+Runs many copies of an I/O-bound Lox program in one process and compares sequential execution with the
+cooperative async mode. Each program sleeps between small bits of work, standing in for file or network reads.
+
+Usage, from the repository root: python -m benchmarks.async_concurrency
+"""
+
+import asyncio
+import time
+
+from Interpreter import Interpreter
+from Parser import Parser
+from Scanner import Scanner
+
+PROGRAM = """
+var total = 0;
+for (var i = 0; i < 5; i = i + 1) {
+    sleep(0.01);
+    total = total + i;
+}
+"""
+
+PROGRAM_COUNTS = [1, 10, 100, 500]
+
+
+def parse():
+    return Parser(Scanner(PROGRAM, []).scan_tokens()).parse()
+
+
+def run_sequential(count: int) -> float:
+    statements = parse()
+    start = time.perf_counter()
+
+    for _ in range(count):
+        Interpreter().interpret(statements)
+
+    return time.perf_counter() - start
+
+
+async def run_concurrent(count: int) -> float:
+    statements = parse()
+    start = time.perf_counter()
+
+    await asyncio.gather(*(Interpreter().interpret_async(statements) for _ in range(count)))
+
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    print(f"{'programs':>10} {'sequential (s)':>16} {'async (s)':>12} {'speedup':>10}")
+
+    for count in PROGRAM_COUNTS:
+        # Running hundreds of programs back to back takes a while, so extrapolate from a small sample
+        sample = min(count, 10)
+        sequential = run_sequential(sample) * count / sample
+        concurrent = asyncio.run(run_concurrent(count))
+
+        print(f"{count:>10} {sequential:>16.3f} {concurrent:>12.3f} {sequential / concurrent:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Times programs that spend most of their time calling and returning from functions, or leaving loops early: recursive
+calls, small methods, returns from inside nested loops and blocks, and loops ended by break. Returns and breaks hand
+a completion back up through execute rather than raising an exception, so these measure what that costs per call.
+
+Usage, from the repository root: python -m benchmarks.call_heavy
+"""
+
+import time
+
+from Parser import Parser
+from Program import Program
+from Scanner import Scanner
+
+PROGRAMS = {
+    "recursion": """
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+
+print fib(20);
+""",
+    "methods": """
+class Point {
+    init(x, y) { this.x = x; this.y = y; }
+    getX() { return this.x; }
+    getY() { return this.y; }
+    plus(other) { return Point(this.x + other.getX(), this.y + other.getY()); }
+}
+
+var total = Point(0, 0);
+var step = Point(1, 2);
+for (var i = 0; i < 5000; i = i + 1) total = total.plus(step);
+print total.getX() + total.getY();
+""",
+    "nested return": """
+fun find(limit, target) {
+    for (var i = 0; i < limit; i = i + 1) {
+        {
+            var square = i * i;
+            if (square >= target) return i;
+        }
+    }
+    return nil;
+}
+
+var sum = 0;
+for (var n = 0; n < 400; n = n + 1) sum = sum + find(100, n * 10);
+print sum;
+""",
+    "break": """
+var sum = 0;
+for (var n = 0; n < 400; n = n + 1) {
+    var i = 0;
+    while (true) {
+        if (i * i >= n * 10) break;
+        i = i + 1;
+    }
+    sum = sum + i;
+}
+print sum;
+""",
+}
+
+REPEATS = 3
+
+
+def main() -> None:
+    print(f"{'program':>14} {'best of ' + str(REPEATS) + ' (s)':>16}")
+
+    for name, source in PROGRAMS.items():
+        program = Program(tuple(Parser(Scanner(source, []).scan_tokens()).parse()))
+        expected = program.run().output
+
+        best = float("inf")
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            run = program.run()
+            best = min(best, time.perf_counter() - start)
+
+            assert run.output == expected
+
+        print(f"{name:>14} {best:>16.3f}")
+
+
+if __name__ == "__main__":
+    main()
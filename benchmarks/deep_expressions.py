@@ -0,0 +1,36 @@
+"""
+Parses and evaluates long operator chains and deeply parenthesised expressions, which used to overflow the Python
+stack, and times a recursive function on ordinary shallow expressions to check normal throughput.
+
+Usage, from the repository root: python -m benchmarks.deep_expressions
+"""
+
+import time
+
+from Interpreter import Interpreter
+from Parser import Parser
+from Scanner import Scanner
+
+SHALLOW = """
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+fib(20);
+"""
+
+
+def run(source: str) -> float:
+    start = time.perf_counter()
+    Interpreter().interpret(Parser(Scanner(source, []).scan_tokens()).parse())
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    for terms in [100, 10_000, 100_000]:
+        chain = run("1" + " + 1" * (terms - 1) + ";")
+        nested = run("(" * terms + "1" + ")" * terms + ";")
+        print(f"{terms:>7} terms: chain {chain * 1000:9.2f} ms, nested parentheses {nested * 1000:9.2f} ms")
+
+    print(f"fib(20) on shallow expressions: {min(run(SHALLOW) for _ in range(3)) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
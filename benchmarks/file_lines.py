@@ -0,0 +1,96 @@
+"""
+Counts the lines and characters of a generated file, once by reading the whole file into a string with read_file()
+and walking its characters, and once by looping over open_lines(), which reads the file through a memory map a line
+at a time. Compares throughput and the peak memory Python allocates for each.
+
+Usage, from the repository root: python -m benchmarks.file_lines
+"""
+
+import os
+import tempfile
+import time
+import tracemalloc
+
+from Parser import Parser
+from Program import Program
+from Scanner import Scanner
+
+LINES = 5_000
+
+READ_ALL = """
+var lines = 0;
+var characters = 0;
+var line = "";
+
+for (var c in read_file(PATH)) {
+    if (c == "
+") {
+        lines = lines + 1;
+        characters = characters + len(line);
+        line = "";
+    } else {
+        line = line + c;
+    }
+}
+
+print lines;
+print characters;
+"""
+
+LINE_READER = """
+var lines = 0;
+var characters = 0;
+
+for (var line in open_lines(PATH)) {
+    lines = lines + 1;
+    characters = characters + len(line);
+}
+
+print lines;
+print characters;
+"""
+
+
+def measure(source: str, path: str) -> tuple[float, int, str]:
+    source = source.replace("PATH", f'"{path}"')
+    program = Program(tuple(Parser(Scanner(source, []).scan_tokens()).parse()))
+
+    start = time.perf_counter()
+    run = program.run()
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows every allocation down, so memory is measured on a second run rather than the timed one
+    tracemalloc.start()
+    program.run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, peak, run.output
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "input.txt")
+
+        with open(path, "w") as file:
+            for i in range(LINES):
+                file.write(f"record {i:08d},{i * 7 % 1000:04d},some payload text\n")
+
+        size = os.path.getsize(path)
+
+        print(f"{LINES} lines, {size / 2 ** 10:.0f} KiB")
+        print(f"{'':>12} {'run (s)':>10} {'MiB/s':>10} {'peak memory':>14}")
+
+        expected = None
+
+        for name, source in (("read_file", READ_ALL), ("open_lines", LINE_READER)):
+            elapsed, peak, output = measure(source, path)
+
+            assert expected is None or output == expected
+            expected = output
+
+            print(f"{name:>12} {elapsed:>10.3f} {size / 2 ** 20 / elapsed:>10.2f} {peak / 2 ** 10:>10.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
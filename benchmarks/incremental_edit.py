@@ -0,0 +1,65 @@
+"""
+Times a single-line edit to a 100k-line generated file, comparing a full rescan and reparse with the incremental
+front end. One edit keeps the line count the same and one inserts a line, which shifts every later token.
+
+Usage, from the repository root: python -m benchmarks.incremental_edit
+"""
+
+import time
+
+from Incremental import IncrementalFrontEnd
+from Optimizer import unshare
+from Parser import Parser
+from Scanner import Scanner
+
+LINES = 100_000
+
+
+def generate() -> str:
+    lines = []
+
+    for i in range(0, LINES, 4):
+        lines.append(f"var v{i} = {i} * 2 + 1;")
+        lines.append(f"fun f{i}(x) {{ return x + v{i}; }}")
+        lines.append(f"if (v{i} > 10) print f{i}(v{i}); else print \"small\";")
+        lines.append(f"// generated line {i + 3}")
+
+    return "\n".join(lines) + "\n"
+
+
+def full_parse(source: str) -> float:
+    start = time.perf_counter()
+    Parser(Scanner(source, []).scan_tokens()).parse()
+    return time.perf_counter() - start
+
+
+def incremental(front_end: IncrementalFrontEnd, offset: int, removed: int, inserted: str) -> float:
+    start = time.perf_counter()
+    front_end.edit(offset, removed, inserted)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    source = generate()
+    middle = source.index(f"var v{LINES // 2} =")
+
+    front_end = IncrementalFrontEnd(source)
+    full = full_parse(source)
+
+    # Change the constant on one line, then insert a whole new declaration after it
+    same_lines = incremental(front_end, middle + len(f"var v{LINES // 2} = "), len(str(LINES // 2)), "42")
+    new_line = incremental(front_end, middle, 0, "var inserted = 1;\n")
+
+    # The two share nodes differently, so they are compared with every use copied out onto its own lines
+    expected = Parser(Scanner(front_end.source, []).scan_tokens()).parse()
+    assert repr(unshare(front_end.statements)) == repr(unshare(expected)), (
+        "incremental result differs from a full parse"
+    )
+
+    print(f"full scan and parse:           {full * 1000:10.2f} ms")
+    print(f"edit within a line:            {same_lines * 1000:10.2f} ms  ({full / same_lines:.0f}x)")
+    print(f"edit inserting a line:         {new_line * 1000:10.2f} ms  ({full / new_line:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Copies and sums a list element by element through the get() and push() natives, then does the same work with index
+syntax, and again with the extend() native and a for-in loop, and compares how long each takes to run.
+
+Usage, from the repository root: python -m benchmarks.indexed_access
+"""
+
+import time
+
+from Parser import Parser
+from Program import Program
+from Scanner import Scanner
+
+SIZE = 20_000
+
+NATIVE_CALLS = f"""
+var items = list();
+for (var i = 0; i < {SIZE}; i = i + 1) push(items, i);
+
+var copy = list();
+for (var i = 0; i < len(items); i = i + 1) push(copy, get(items, i));
+
+var total = 0;
+for (var i = 0; i < len(copy); i = i + 1) total = total + get(copy, i);
+print total;
+"""
+
+INDEXING = f"""
+var items = list();
+for (var i = 0; i < {SIZE}; i = i + 1) push(items, i);
+
+var copy = list();
+for (var i = 0; i < len(items); i = i + 1) push(copy, items[i]);
+
+var total = 0;
+for (var i = 0; i < len(copy); i = i + 1) total = total + copy[i];
+print total;
+"""
+
+BULK = f"""
+var items = list();
+for (var i = 0; i < {SIZE}; i = i + 1) push(items, i);
+
+var copy = [];
+extend(copy, items);
+
+var total = 0;
+for (var item in copy) total = total + item;
+print total;
+"""
+
+
+def measure(source: str) -> tuple[float, str]:
+    program = Program(tuple(Parser(Scanner(source, []).scan_tokens()).parse()))
+    elapsed = float("inf")
+
+    # Take the best of a few runs, since a single run is easily thrown off by other work on the machine
+    for _ in range(3):
+        start = time.perf_counter()
+        run = program.run()
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    return elapsed, run.output
+
+
+def main() -> None:
+    print(f"{SIZE} elements")
+    print(f"{'':>14} {'run (s)':>10} {'speedup':>10}")
+
+    baseline, expected = measure(NATIVE_CALLS)
+    print(f"{'native calls':>14} {baseline:>10.3f}")
+
+    for name, source in (("indexing", INDEXING), ("bulk, for-in", BULK)):
+        elapsed, output = measure(source)
+        assert output == expected
+
+        print(f"{name:>14} {elapsed:>10.3f} {baseline / elapsed:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Scans, parses and runs a long generated script of ordinary statements: shallow arithmetic, comparisons, assignments,
+nested blocks and calls to natives, with no deep expressions and no fuel or time limit. It only uses what the
+language had before the other benchmarks' features were added, so it can be run against older revisions to check
+that nothing added since made ordinary code slower.
+
+Usage, from the repository root: python -m benchmarks.ordinary_code
+"""
+
+import contextlib
+import io
+import time
+
+from Interpreter import Interpreter
+from Parser import Parser
+from Scanner import Scanner
+
+LINES = 60_000
+REPEATS = 3
+
+
+def generate() -> str:
+    lines = []
+
+    for i in range(0, LINES, 6):
+        lines.append(f"var a{i} = {i} * 2 + 1;")
+        lines.append(f"{{ var b = a{i} - 3; print b * (a{i} + 4) / 2; }}")
+        lines.append(f"a{i} = a{i} + len(\"label\") - 1;")
+        lines.append(f"print a{i} > {i} * 3 + 1 - a{i} / 2 != !(a{i} <= {i});")
+        lines.append(f"print str(a{i}) + \" items\";")
+        lines.append(f"{{ var c = -a{i}; {{ c = c * c - a{i} / 4; }} print c >= 0; }}")
+
+    return "\n".join(lines) + "\n"
+
+
+def best(run) -> float:
+    elapsed = float("inf")
+
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    return elapsed
+
+
+def main() -> None:
+    source = generate()
+    tokens = Scanner(source, []).scan_tokens()
+    statements = Parser(tokens).parse()
+
+    def interpret() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            Interpreter().interpret(statements)
+
+    print(f"{LINES} lines, {len(tokens)} tokens, best of {REPEATS}")
+    print(f"scan      {best(lambda: Scanner(source, []).scan_tokens()):8.3f} s")
+    print(f"parse     {best(lambda: Parser(tokens).parse()):8.3f} s")
+    print(f"interpret {best(interpret):8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Scans a generated script of a few MiB, once with the sequential scanner and once in shards across a pool of worker
+processes, and checks both give the same tokens. The script has strings spanning lines and comments holding quotes,
+so shards have to be cut around them.
+
+Usage, from the repository root: python -m benchmarks.parallel_scan
+"""
+
+import os
+import time
+
+from Scanner import Scanner
+from ShardedScanner import ShardedScanner
+
+SIZE = 4 * 2 ** 20
+
+CHUNK = """
+// "a quote in a comment" doesn't open a string
+fun record_NUMBER(a, b) {
+    var label = "a label
+spanning // two lines";
+    if (a <= b) return a * 2.5 + b;
+    return [a, b, label];
+}
+"""
+
+
+def main() -> None:
+    chunks = []
+    length = 0
+    while length < SIZE:
+        chunk = CHUNK.replace("NUMBER", str(len(chunks)))
+        chunks.append(chunk)
+        length += len(chunk)
+
+    source = "".join(chunks)
+    print(f"{len(source) / 2 ** 20:.1f} MiB, {source.count(chr(10))} lines, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    expected = Scanner(source, []).scan_tokens()
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tokens = ShardedScanner(source).scan_tokens()
+    sharded = time.perf_counter() - start
+
+    assert tokens == expected
+
+    print(f"{len(tokens)} tokens")
+    print(f"sequential {sequential:.3f} s")
+    print(f"   sharded {sharded:.3f} s ({sequential / sharded:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
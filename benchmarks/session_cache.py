@@ -0,0 +1,93 @@
+"""
+Evaluates a handful of notebook-style snippets over and over in one session, the way a tool re-running cells would,
+and compares the latency of the first, uncached evaluation of each with the cached ones after it. Also times the same
+evaluations through main.run, which scans and parses every time.
+
+Usage, from the repository root: python -m benchmarks.session_cache
+"""
+
+import io
+import statistics
+import time
+
+from Interpreter import Interpreter
+from Session import Session
+from main import run
+
+SETUP = """
+class Account {
+    init(owner, balance) { this.owner = owner; this.balance = balance; }
+    deposit(amount) { this.balance = this.balance + amount; return this; }
+}
+
+fun interest(balance, rate, years) {
+    var total = balance;
+    for (var i = 0; i < years; i = i + 1) total = total * (1 + rate);
+    return total;
+}
+
+var accounts = [];
+for (var i = 0; i < 20; i = i + 1) push(accounts, Account("owner", i * 100));
+"""
+
+CELLS = [
+    "var total = 0; for (var account in accounts) total = total + account.balance; print total;",
+    "print interest(1000, 0.05, 10);",
+    "accounts[0].deposit(10).deposit(5); print accounts[0].balance;",
+    """
+fun report(list) {
+    var richest = list[0];
+    for (var account in list) {
+        if (account.balance > richest.balance) richest = account;
+    }
+    return richest.balance;
+}
+print report(accounts);
+""",
+]
+
+ROUNDS = 200
+
+
+def main() -> None:
+    session = Session()
+    assert not session.evaluate(SETUP).had_error
+
+    first = {}
+    cached = {cell: [] for cell in CELLS}
+
+    for _ in range(ROUNDS):
+        for cell in CELLS:
+            evaluation = session.evaluate(cell)
+            assert not evaluation.had_error
+
+            if evaluation.cached:
+                cached[cell].append(evaluation)
+            else:
+                first[cell] = evaluation
+
+    interpreter = Interpreter(output=io.StringIO())
+    run(SETUP, interpreter)
+
+    uncached = {cell: [] for cell in CELLS}
+    for _ in range(ROUNDS):
+        for cell in CELLS:
+            start = time.perf_counter()
+            run(cell, interpreter)
+            uncached[cell].append(time.perf_counter() - start)
+
+    print(f"{ROUNDS} rounds of {len(CELLS)} cells, median latency in microseconds")
+    print(f"{'cell':>5} {'first':>10} {'compile':>10} {'cached':>10} {'run':>10} {'main.run':>10}")
+
+    for index, cell in enumerate(CELLS):
+        hits = cached[cell]
+        print(
+            f"{index:>5} {first[cell].total_time * 1e6:>10.0f} {first[cell].compile_time * 1e6:>10.0f}"
+            f" {statistics.median(hit.total_time for hit in hits) * 1e6:>10.0f}"
+            f" {statistics.median(hit.run_time for hit in hits) * 1e6:>10.0f}"
+            f" {statistics.median(uncached[cell]) * 1e6:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
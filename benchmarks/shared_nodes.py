@@ -0,0 +1,69 @@
+"""
+Parses a large generated file that repeats the same constants and expression fragments, with and without the parser
+sharing identical expression nodes, and compares parse time, the memory the AST holds on to and how many distinct
+expression nodes were built.
+
+Usage, from the repository root: python -m benchmarks.shared_nodes
+"""
+
+import gc
+import time
+import tracemalloc
+
+from AST.Expr import Expr
+from Optimizer import walk
+from Parser import Parser
+from Scanner import Scanner
+
+LINES = 20_000
+
+
+def generate() -> str:
+    lines = []
+
+    for i in range(0, LINES, 4):
+        lines.append(f"var v{i} = (1 + 2) * 3 + \"label\";")
+        lines.append(f"if (v{i} > 10 and v{i} < 100) print v{i} * v{i} + v{i} * v{i};")
+        lines.append(f"var w{i} = v{i} * 0.5 + v{i} * 0.5 - 1;")
+        lines.append(f"print \"label\" + \"label\";")
+
+    return "\n".join(lines) + "\n"
+
+
+def distinct_nodes(statements) -> int:
+    return len({id(node) for statement in statements for node in walk(statement) if isinstance(node, Expr)})
+
+
+def measure(tokens, share: bool) -> tuple[float, int, int]:
+    elapsed = float("inf")
+
+    # Take the best of a few runs, since a single parse is easily thrown off by other work on the machine
+    for _ in range(3):
+        gc.collect()
+        start = time.perf_counter()
+        Parser(tokens, share=share).parse()
+        elapsed = min(elapsed, time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    statements = Parser(tokens, share=share).parse()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return elapsed, retained, distinct_nodes(statements)
+
+
+def main() -> None:
+    tokens = Scanner(generate(), []).scan_tokens()
+
+    print(f"{LINES} lines, {len(tokens)} tokens")
+    print(f"{'':>10} {'parse (s)':>12} {'AST memory':>14} {'expression nodes':>18}")
+
+    for share in (False, True):
+        elapsed, retained, nodes = measure(tokens, share)
+        print(f"{'shared' if share else 'unshared':>10} {elapsed:>12.3f} {retained / 2 ** 20:>10.1f} MiB {nodes:>18}")
+
+
+if __name__ == "__main__":
+    main()
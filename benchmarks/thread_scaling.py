@@ -0,0 +1,59 @@
+"""
+Runs one parsed program on a growing number of threads at once and compares it with running the same number of copies
+one after another. With the GIL, threads take turns and the speedup stays near 1x; on a free-threaded build of Python
+it should grow with the number of cores.
+
+Usage, from the repository root: python -m benchmarks.thread_scaling
+"""
+
+import os
+import sys
+import time
+
+from Parser import Parser
+from Program import Program
+from Scanner import Scanner
+
+PROGRAM = """
+class Counter {
+    init() { this.count = 0; }
+    add(n) { this.count = this.count + n; }
+}
+
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+
+var counter = Counter();
+for (var i = 0; i < 2000; i = i + 1) counter.add(i);
+print fib(17) + counter.count;
+"""
+
+THREAD_COUNTS = [1, 2, 4, 8]
+
+
+def main() -> None:
+    program = Program(tuple(Parser(Scanner(PROGRAM, []).scan_tokens()).parse()))
+    gil = sys._is_gil_enabled() if hasattr(sys, "_is_gil_enabled") else True
+
+    print(f"{os.cpu_count()} cores, GIL {'enabled' if gil else 'disabled'}")
+    print(f"{'threads':>8} {'sequential (s)':>16} {'threaded (s)':>14} {'speedup':>10}")
+
+    expected = program.run().output
+
+    for count in THREAD_COUNTS:
+        start = time.perf_counter()
+        for _ in range(count):
+            program.run()
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        runs = program.run_threads(count)
+        threaded = time.perf_counter() - start
+
+        # Every thread shares the nodes, so any state leaking between them would show up as a different result
+        assert all(run.output == expected for run in runs)
+
+        print(f"{count:>8} {sequential:>16.3f} {threaded:>14.3f} {sequential / threaded:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,47 +1,292 @@
+import argparse
+import os
 import sys
 
+from AST.Stmt import Stmt
 from AstPrinter import ASTPrinter
+from Error import warning
 from Interpreter import Interpreter
+from LazyBlock import verify
+from MemoryReport import MemoryReport
+from NativeFunction import NativeFunction
+from Optimizer import Optimizer
 from Parser import Parser
+from Profile import Profile, ProfileError
 from Scanner import Scanner
+from ShardedScanner import ShardedScanner
+from Scheduler import Scheduler
+from Session import Session
+from Snapshot import SnapshotError, load_snapshot, save_snapshot
+from TypeInference import TypeInference
 
 
 def main() -> None:
-    args = sys.argv[1:]
-    if len(args) > 1:
-        print("Usage: main.py [script]")
-        sys.exit(64)
-    elif len(args) == 1:
-        run_file(args[0])
-    else:
-        run_prompt()
+    parser = argparse.ArgumentParser(prog="main.py")
+    parser.add_argument("scripts", nargs="*", metavar="script", help="scripts to run, taking turns if there are several")
+    parser.add_argument("-O", dest="optimize", action="store_true", help="optimize the program before running it")
+    parser.add_argument(
+        "--specialize",
+        action="store_true",
+        help="let operators specialize themselves to the types they see, and report how many did",
+    )
+    parser.add_argument("--snapshot", metavar="FILE", help="start from the globals saved in a snapshot")
+    parser.add_argument("--save-snapshot", metavar="FILE", help="save the globals to a snapshot after running")
+    parser.add_argument("--fuel", type=int, metavar="STATEMENTS", help="stop a script after this many statements")
+    parser.add_argument("--time-limit", type=float, metavar="SECONDS", help="stop a script after this many seconds")
+    parser.add_argument("--lazy", action="store_true", help="parse the body of each block the first time it runs")
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="with --lazy, check every block parses before running, rather than only those that run",
+    )
+    parser.add_argument(
+        "--infer",
+        action="store_true",
+        help="infer operand types before running, so operators proven to get numbers or strings skip their checks",
+    )
+    parser.add_argument(
+        "--type-check",
+        action="store_true",
+        help="list the operations that fail whenever they run, instead of running the script",
+    )
+    parser.add_argument(
+        "--record-profile",
+        action="store_true",
+        help="record the operand types each operator saw, to SCRIPT.profile",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="specialize operators up front from the types in SCRIPT.profile, if it matches the script",
+    )
+    parser.add_argument(
+        "--parallel-scan",
+        action="store_true",
+        help="scan large scripts in shards across a pool of worker processes",
+    )
+    parser.add_argument(
+        "--mem-report",
+        action="store_true",
+        help="trace memory use and report how much went to each phase and subsystem",
+    )
+    args = parser.parse_args()
 
+    if len(args.scripts) > 1:
+        sys.exit(70 if run_scheduled(args.scripts, args.fuel, args.time_limit) else 0)
+
+    options = dict(specialize=args.specialize, fuel=args.fuel, time_limit=args.time_limit)
+    interpreter = Interpreter(**options)
+
+    if args.snapshot is not None:
+        try:
+            interpreter = Interpreter(load_snapshot(args.snapshot), **options)
+        except (OSError, SnapshotError) as error:
+            print(f"Can't load snapshot: {error}", file=sys.stderr)
+            sys.exit(66)
+
+    memory = MemoryReport()
+    if args.mem_report:
+        memory.start()
+
+    try:
+        if args.scripts:
+            had_error = run_file(
+                args.scripts[0],
+                args.optimize,
+                interpreter,
+                memory,
+                args.lazy,
+                args.verify,
+                args.infer,
+                args.type_check,
+                args.profile,
+                args.record_profile,
+                args.parallel_scan,
+            )
+        else:
+            had_error = run_prompt(args.optimize, interpreter, memory)
+    finally:
+        if args.specialize:
+            print(interpreter.specializations, file=sys.stderr)
+
+        if args.mem_report:
+            print(memory.report(), file=sys.stderr)
+
+    if args.save_snapshot is not None:
+        # A prelude that failed partway through would leave a snapshot missing whatever came after the error
+        if had_error:
+            sys.exit(70)
+
+        try:
+            save_snapshot(interpreter.globals, args.save_snapshot)
+        except (OSError, SnapshotError) as error:
+            print(f"Can't save snapshot: {error}", file=sys.stderr)
+            sys.exit(74)
+
+
+def run_file(
+    file_path: str,
+    optimize: bool = False,
+    interpreter: Interpreter | None = None,
+    memory: MemoryReport | None = None,
+    lazy: bool = False,
+    verify_blocks: bool = False,
+    infer: bool = False,
+    type_check: bool = False,
+    use_profile: bool = False,
+    record_profile: bool = False,
+    parallel_scan: bool = False,
+) -> bool:
+    if not interpreter:
+        interpreter = Interpreter()
+
+    interpreter.directory = os.path.dirname(os.path.abspath(file_path))
+    profile_path = file_path + ".profile" if use_profile or record_profile else None
 
-def run_file(file_path: str) -> None:
     with open(file_path, "r") as file:
-        run(file.read())
+        return run(
+            file.read(),
+            interpreter,
+            optimize,
+            memory,
+            lazy,
+            verify_blocks,
+            infer,
+            type_check,
+            profile_path,
+            record_profile,
+            parallel_scan,
+        )
+
+
+def run_scheduled(file_paths: list[str], fuel: int | None = None, time_limit: float | None = None) -> bool:
+    scheduler = Scheduler()
+
+    for file_path in file_paths:
+        with open(file_path, "r") as file:
+            job = scheduler.add(file.read(), fuel, time_limit)
 
+        job.interpreter.directory = os.path.dirname(os.path.abspath(file_path))
 
-def run_prompt() -> None:
-    interpreter = Interpreter()
+    return any(job.had_error for job in scheduler.run())
+
+
+def run_prompt(
+    optimize: bool = False, interpreter: Interpreter | None = None, memory: MemoryReport | None = None
+) -> bool:
+    # Lines typed again, like a definition being redone, are run from the session's cache without parsing them again
+    session = Session(interpreter or Interpreter(), optimize, capture=False, memory=memory or MemoryReport())
 
     while True:
-        line = input("> ")
+        try:
+            line = input("> ")
+        except EOFError:
+            break
+
         if len(line) == 0:
             break
 
-        run(line, interpreter)
+        # Errors in the REPL only lose the line they happened on
+        session.evaluate(line)
 
+    return False
+
+
+def run(
+    source: str,
+    interpreter: Interpreter | None = None,
+    optimize: bool = False,
+    memory: MemoryReport | None = None,
+    lazy: bool = False,
+    verify_blocks: bool = False,
+    infer: bool = False,
+    type_check: bool = False,
+    profile_path: str | None = None,
+    record_profile: bool = False,
+    parallel_scan: bool = False,
+) -> bool:
+    """
+    :param profile_path: where the script's profile is, to record one there if record_profile is set or otherwise to
+                         load one from if it exists
+    :return: whether there was an error
+    """
 
-def run(source: str, interpreter: Interpreter | None = None) -> None:
     if not interpreter:
         interpreter = Interpreter()
 
-    scanner = Scanner(source, [])
-    tokens = scanner.scan_tokens()
-    parser = Parser(tokens)
+    # Phases only measure anything once the report has started tracing
+    if not memory:
+        memory = MemoryReport()
+
+    with memory.phase("scan"):
+        scanner = ShardedScanner(source) if parallel_scan else Scanner(source, [])
+        tokens = scanner.scan_tokens()
+
+    with memory.phase("parse"):
+        parser = Parser(tokens, lazy)
+        statements = parser.parse()
+
+        # The optimizer and type inference need every block's statements, and profiles number the sites among all of
+        # them, so they parse the lazy ones up front too
+        needs_blocks = verify_blocks or optimize or infer or type_check or profile_path is not None
+        if lazy and needs_blocks and not verify(statements):
+            return True
+
+    if optimize:
+        with memory.phase("optimize"):
+            statements = Optimizer().optimize(statements)
+
+    if infer or type_check:
+        with memory.phase("infer"):
+            # Functions left by an earlier script or a snapshot could assign this one's globals when called
+            closed = all(isinstance(value, NativeFunction) for value in interpreter.globals.values.values())
+
+            inference = TypeInference(closed)
+            inference.analyze(statements)
+
+        if type_check:
+            diagnostics = inference.diagnostics()
+
+            for diagnostic in diagnostics:
+                warning(diagnostic.token, diagnostic.message)
+
+            return bool(diagnostics)
+
+        inference.specialize()
+
+    if record_profile:
+        interpreter.specialize = True
+    elif profile_path is not None:
+        use_profile(profile_path, source, optimize, statements, interpreter)
+
+    memory.keep(source, tokens, statements)
+
+    with memory.phase("interpret"):
+        had_error = interpreter.interpret(statements)
+
+    # A run that stopped with an error still says what ran before it
+    if record_profile:
+        try:
+            Profile.record(statements, source, optimize).save(profile_path)
+        except OSError as error:
+            print(f"Can't save profile: {error}", file=sys.stderr)
+
+    return had_error
+
+
+def use_profile(
+    profile_path: str, source: str, optimize: bool, statements: list[Stmt], interpreter: Interpreter
+) -> None:
+    try:
+        profile = Profile.load(profile_path, source, optimize)
+    except FileNotFoundError:
+        print(f"No profile at '{profile_path}', record one with --record-profile.", file=sys.stderr)
+        return
+    except (OSError, ProfileError) as error:
+        print(f"Can't use profile: {error}", file=sys.stderr)
+        return
 
-    interpreter.interpret(parser.parse())
+    profile.apply(statements, interpreter.specializations)
 
 
 if __name__ == "__main__":